@@ -22,8 +22,26 @@ GCAM_YEARS = [1975, 1990, 2005] + [year for year in range(LAST_HISTORICAL_YEAR,
 States = []
 
 # Oddly, we must re-parse the XML to get the formatting right.
-def write_xml(tree, filename):
+def write_xml(tree, filename, streaming=None):
+    """
+    Write the `tree` to `filename`, pretty-printed.
+
+    :param tree: (lxml.etree.ElementTree) the tree to write
+    :param filename: (str) the pathname of the file to create
+    :param streaming: (bool) if True, write the file one region at a time using
+        write_xml_streaming, rather than re-parsing the entire document. If None,
+        the value of config variable GCAM.PolicyXmlStreaming is used.
+    :return: none
+    """
     from io import StringIO
+    from .config import getParamAsBoolean
+
+    if streaming is None:
+        streaming = getParamAsBoolean('GCAM.PolicyXmlStreaming')
+
+    if streaming:
+        write_xml_streaming(tree.getroot(), filename)
+        return
 
     parser = ET.XMLParser(remove_blank_text=True)
     xml = ET.tostring(tree.getroot())
@@ -32,25 +50,118 @@ def write_xml(tree, filename):
 
     tree.write(filename, pretty_print=True, xml_declaration=True)
 
-# Surface level (tag and attribute) comparison of elements
-def match_element(elt1, elt2):
-    if elt1.tag != elt2.tag:
-        return False
-
-    attr1 = elt1.attrib
-    attr2 = elt2.attrib
+def _strip_blank_text(elt):
+    """
+    Remove whitespace-only text and tails, as parsing with remove_blank_text
+    would, from elements with children.
+    """
+    for node in elt.iter():
+        if len(node):
+            if node.text is not None and not node.text.strip():
+                node.text = None
+            for child in node:
+                if child.tail is not None and not child.tail.strip():
+                    child.tail = None
+
+def write_xml_streaming(root, filename, indent='  '):
+    """
+    Write the policy document `root` (a ``<scenario>`` element containing a ``<world>``)
+    to `filename` using an incremental ``lxml.etree.xmlfile`` writer, serializing one
+    ``<region>`` at a time. This produces the same output as write_xml without
+    serializing and re-parsing the entire document. N.B. The whitespace of the
+    elements in `root` is modified.
+
+    :param root: (lxml.etree.Element) the ``<scenario>`` element
+    :param filename: (str) the pathname of the file to create
+    :param indent: (str) the whitespace to use for each level of indentation
+    :return: none
+    """
+    def write_children(xf, elt, level):
+        for child in elt:
+            xf.write('\n' + indent * level)
+            if child.tag == 'world' and len(child):
+                with xf.element(child.tag, child.attrib):
+                    write_children(xf, child, level + 1)
+                    xf.write('\n' + indent * level)
+            else:
+                _strip_blank_text(child)
+                ET.indent(child, space=indent, level=level)
+                child.tail = None
+                xf.write(child)
+
+    # xmlfile doesn't allow text outside the root element, so we write the
+    # declaration and the final newline directly.
+    with open(filename, 'wb') as f:
+        f.write(b"<?xml version='1.0' encoding='ASCII'?>\n")
+        with ET.xmlfile(f, encoding='ASCII') as xf:
+            with xf.element(root.tag, root.attrib):
+                write_children(xf, root, 1)
+                xf.write('\n')
+        f.write(b'\n')
+
+def element_key(elt):
+    """
+    Return the key used to match elements when merging: the tag and the attributes,
+    which for GCAM input elements is usually just (tag, name).
+    """
+    return (elt.tag, tuple(sorted(elt.attrib.items())))
 
-    if len(attr1) != len(attr2):
-        return False
+class ElementIndex(object):
+    """
+    Wraps an element to support merging elements into it, finding the child matching
+    each new element (by tag and attributes) using a dict keyed by element_key(),
+    rather than by comparing each new element with all existing children. Indices
+    of children are created on demand, so merging n elements into a tree takes
+    time proportional to n, regardless of the number of siblings.
 
-    try:
-        for key, value in attr1.items():
-            if value != attr2[key]:
-                return False
-    except KeyError:
-        return False
+    :param elt: (lxml.etree.Element) the element to merge into
+    """
+    def __init__(self, elt):
+        self.elt = elt
+        self._children = None
+
+    def children(self):
+        """
+        Return the dict of ElementIndex instances for the children of this element,
+        keyed by element_key(). If several children have the same key, the first is used.
+        """
+        if self._children is None:
+            self._children = children = {}
+            for child in self.elt:
+                children.setdefault(element_key(child), ElementIndex(child))
+
+        return self._children
+
+    def _add(self, key, new_elt):
+        self.elt.append(new_elt)
+        index = self.children()[key] = ElementIndex(new_elt)
+        return index
+
+    def child(self, tag, **attrib):
+        """
+        Return the ElementIndex for the child with the given tag and attributes,
+        creating the child if it doesn't exist.
+        """
+        new_elt = Element(tag, **attrib)
+        key = element_key(new_elt)
+        return self.children().get(key) or self._add(key, new_elt)
+
+    def merge_element(self, new_elt):
+        """
+        Add a copy of `new_elt` if none of this element's children has the same tag
+        and attributes. If a match is found, merge new_elt's children with those of
+        the matching element, recursively.
+        """
+        key = element_key(new_elt)
+        index = self.children().get(key)
+        if index is None:
+            self._add(key, deepcopy(new_elt))
+        else:
+            index.merge_elements(new_elt)
 
-    return True
+    def merge_elements(self, elt_list):
+        for elt in elt_list:
+            self.merge_element(elt)
 
 def merge_element(parent, new_elt):
     """
@@ -58,22 +169,16 @@ def merge_element(parent, new_elt):
     as element. If a match is found, add element's children to those of the
     matching element.
     """
-    for sibling in parent:
-        if match_element(new_elt, sibling):
-            merge_elements(sibling, new_elt.getchildren())
-            return
-
-    # if it wasn't merged, append it to parent
-    parent.append(deepcopy(new_elt))
+    ElementIndex(parent).merge_element(new_elt)
 
 def merge_elements(parent, elt_list):
     """
     Add each element in elt_list to parent if none of parent's children has the same tag
     and attributes as element. If a match is found, merge element's children with those
-    of the matching element, recursively.
+    of the matching element, recursively. To merge repeatedly into the same parent, use
+    an ElementIndex to avoid re-indexing the parent's children each time.
     """
-    for elt in elt_list:
-        merge_element(parent, elt)
+    ElementIndex(parent).merge_elements(elt_list)
 
 def ElementWithText(tag, text, **kwargs):
     elt = Element(tag, **kwargs)
@@ -161,6 +266,10 @@ def create_supply_sectors(df, commodity, targets, elecPassThru,
                           outputRatio=1, pMultiplier=1):
     sector_list = []
 
+    # The periods are the same for all techs; create_tech() copies them
+    period_list = [create_supply_period(year, commodity, outputRatio, pMultiplier)
+                   for year, coefficient in targets]
+
     for sector in df.sector.unique():
         sectorTag = sector_tag(sector, elecPassThru)
         sub_df = df[df.sector == sector]
@@ -170,11 +279,6 @@ def create_supply_sectors(df, commodity, targets, elecPassThru,
             tech_df = sub_df[sub_df.subsector == subsector]
             tech_list = []
             for tech in tech_df.technology.unique():
-                period_list = []
-                for year, coefficient in targets:
-                    period = create_supply_period(year, commodity, outputRatio, pMultiplier)
-                    period_list.append(period)
-
                 tech_list.append(create_tech(tech, period_list))
 
             sub_list.append(create_subsector(subsector, tech_list))
@@ -224,6 +328,10 @@ def create_demand_sectors(df, commodity, targets, elecPassThru, priceUnitConv=0)
 
     coef_xml_dict = create_adjusted_coefficients(targets)
 
+    # The periods are the same for all techs; create_tech() copies them
+    period_list = [create_demand_period(year, commodity, coef_xml_dict[year], priceUnitConv=priceUnitConv)
+                   for year, coefficient in targets]
+
     for sector in df.sector.unique():
         sectorTag = sector_tag(sector, elecPassThru)
         sub_df = df[df.sector == sector]
@@ -233,12 +341,6 @@ def create_demand_sectors(df, commodity, targets, elecPassThru, priceUnitConv=0)
             tech_df = sub_df[sub_df.subsector == subsector]
             tech_list = []
             for tech in tech_df.technology.unique():
-                period_list = []
-                for year, coefficient in targets:
-                    period = create_demand_period(year, commodity, coef_xml_dict[year],
-                                                  priceUnitConv=priceUnitConv)
-                    period_list.append(period)
-
                 tech_list.append(create_tech(tech, period_list))
 
             sub_list.append(create_subsector(subsector, tech_list))
@@ -349,11 +451,12 @@ def find_techs(tree, tups):
     :return: (pandas.DataFrame) with three columns: sector, subsector, and technology,
       populated based on the given `tups`.
     """
-    import re
+    from .xml_edit import StructuralIndex
 
-    gtdb = tree.find('//global-technology-database')
+    # technologies in the global technology database are indexed under region None
+    index = StructuralIndex(tree, technologyTag=('technology', 'intermittent-technology'))
 
-    all_sectors = set(gtdb.xpath('./location-info/@sector-name'))
+    all_sectors = index.names(None)
     tech_triads = []
 
     for tup in tups:
@@ -366,7 +469,7 @@ def find_techs(tree, tups):
             continue
 
         for sect in sects:
-            all_subsects = set(gtdb.xpath('./location-info[@sector-name="{}"]/@subsector-name'.format(sect)))
+            all_subsects = index.names(None, sect)
 
             subsects = match_str_or_regex(all_subsects, subsector)
             if not subsects:
@@ -374,14 +477,12 @@ def find_techs(tree, tups):
                 continue
 
             for subsect in subsects:
-                locations = gtdb.xpath('./location-info[@sector-name="{}" and @subsector-name="{}"]'.format(sect, subsect))
-                for location in locations:
-                    # missing techs (with names above) => pass-through, so we ignore empty returns
-                    all_techs = location.xpath('./technology/@name') + location.xpath('./intermittent-technology/@name')
+                # missing techs (with names above) => pass-through, so we ignore empty returns
+                all_techs = index.names(None, sect, subsect)
 
-                    matching_techs = match_str_or_regex(all_techs, technology)
-                    for tech in matching_techs:
-                        tech_triads += [(sect, subsect, tech)]
+                matching_techs = match_str_or_regex(all_techs, technology)
+                for tech in matching_techs:
+                    tech_triads += [(sect, subsect, tech)]
 
     return tech_triads
 
@@ -402,7 +503,7 @@ def ref_pathname(basename):
 
 def ref_xmltree(basename):
     pathname = ref_pathname(basename)
-    tree = XMLFile(pathname).getTree()
+    tree = XMLFile(pathname, useCache=True).getTree()
     return tree
 
 def get_electricity_tech_df(useGcamUSA):
@@ -427,7 +528,7 @@ def read_state_names():
     global States
 
     xmlfile = pathjoin(getParam('GCAM.RefWorkspace'), 'input', 'gcamdata', 'xml', 'socioeconomics_USA.xml') # TBD: ref_pathname('socioeconomics_USA.xml')
-    tree = XMLFile(xmlfile).getTree()
+    tree = XMLFile(xmlfile, useCache=True).getTree()
     States = tree.xpath('//region/@name')
 
 def set_actor(tech_df, tech_tups, actor, value=1):
@@ -742,7 +843,7 @@ def resPolicyMain(args):
     # By default, all electricity techs consume RE certificates
     tech_df = get_electricity_tech_df(useGcamUSA)
 
-    root = None
+    root = None     # an ElementIndex, to merge the policies for all standards
 
     for std in resPolicy.standards:
         if useGcamUSA and 'USA' in std.regions:
@@ -764,11 +865,11 @@ def resPolicyMain(args):
             res = create_RES(tech_df, std.regions, std.market, cert.name, cert.targets, subsector_dict)
 
             if root is None:
-                root = res
+                root = ElementIndex(res)
             else:
-                merge_elements(root, res.getchildren())
+                root.merge_elements(res.getchildren())
 
-    tree = ET.ElementTree(root)
+    tree = ET.ElementTree(root.elt)
     mkdirs(os.path.dirname(outPath))    # ensure the location exists
 
     _logger.info("Writing '%s'", outPath)
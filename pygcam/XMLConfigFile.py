@@ -6,6 +6,7 @@ from lxml import etree as ET
 from pygcam.config import mkdirs
 from pygcam.log import getLogger
 from pygcam.XMLFile import XMLFile
+from pygcam.xml_cache import getDocumentCache
 from pygcam.mcs.error import PygcamMcsUserError
 
 _logger = getLogger(__name__)
@@ -34,7 +35,8 @@ class XMLConfigFile(XMLFile):
     '''
     Stores information about a GCAM config.xml file
     '''
-    instances = {}  # XMLConfigFile instances keyed by scenario name
+    # Instances are stored in the process-wide DocumentCache (see xml_cache.py) under this kind
+    kind = 'XMLConfigFile'
 
     def __init__(self, config_path):
         """
@@ -49,20 +51,17 @@ class XMLConfigFile(XMLFile):
 
     @classmethod
     def decache(cls):
-        cls.instances.clear()
+        getDocumentCache().clear(cls.kind, save=False)
 
     @classmethod
     def get_instance(cls, cfg_path):
         '''
-        Return a parsed version of the given config file.
+        Return a parsed version of the given config file, which is re-read if
+        the file has changed since it was cached.
         '''
-        key = os.path.abspath(os.path.normpath(cfg_path))
-        try:
-            return cls.instances[key]
-
-        except KeyError:
-            cls.instances[key] = obj = XMLConfigFile(cfg_path)
-            return obj
+        # Load using the given path rather than the real path so that we write to
+        # the given path, which may be a symlink, rather than through it.
+        return getDocumentCache().get(cfg_path, cls.kind, lambda _: XMLConfigFile(cfg_path))
 
     # Deprecated
     # def copyOriginal(self, config_path):
@@ -104,6 +103,7 @@ class XMLConfigFile(XMLFile):
         _logger.debug("XMLConfigFile writing '%s'", path)
         self.tree.write(path, xml_declaration=True, pretty_print=True)
         self.dirty = False
+        getDocumentCache().written(path, self.kind, self)
 
     def get_config_element(self, name, group):
         '''
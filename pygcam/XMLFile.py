@@ -51,14 +51,18 @@ class XMLFile(object):
        prior to validation.
     :param varDict: (dict) A dictionary to use in place of the configuration dictionary
        when processing Conditional XML.
+    :param useCache: (bool) If True, the parsed tree is shared with other users of the
+       same file through the process-wide DocumentCache (see xml_cache.py), so the
+       caller must not modify the tree. Ignored if ``conditionalXML`` is True.
     """
     def __init__(self, filename, load=True, schemaPath=None,
-                 removeComments=True, conditionalXML=False, varDict=None):
+                 removeComments=True, conditionalXML=False, varDict=None, useCache=False):
         self.filename = filename
         self.tree = None
         self.conditionalXML = conditionalXML
         self.varDict = varDict or getConfigDict(section=getParam('GCAM.DefaultProject'))
         self.removeComments = removeComments
+        self.useCache = useCache and not conditionalXML
 
         self.schemaPath   = schemaPath
         self.schemaStream = None
@@ -81,7 +85,22 @@ class XMLFile(object):
     def read(self):
         """
         Read the XML file, and if validate if ``self.schemaFile`` is not None.
+        If ``self.useCache`` is True, a cached tree is used if available.
         """
+        if not self.useCache:
+            return self._read()
+
+        from .xml_cache import getDocumentCache, XMLDocument
+
+        def load(filename):
+            return XMLDocument(filename, self._read())
+
+        # Files parsed with different options or schemas are cached separately
+        kind = ('XMLFile', self.removeComments, self.schemaPath)
+        tree = self.tree = getDocumentCache().get(self.filename, kind, load).tree
+        return tree
+
+    def _read(self):
         filename = self.filename
 
         _logger.debug("Reading '%s'", filename)
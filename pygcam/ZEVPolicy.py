@@ -76,7 +76,7 @@ def zevPolicyMain(args):
         xpaths.append(xpath)
 
     transportXML = scenarioXML(args.scenario, args.tag) # read the file associated with the given tag
-    xml = XMLFile(transportXML)
+    xml = XMLFile(transportXML, useCache=True)
     root = xml.getRoot()
 
     if args.regions:
@@ -133,7 +133,7 @@ def generate_zev_xml(scenario, csvPath, xmlPath, transportTag, pMultiplier, outp
     import os
     import pandas as pd
     from .file_utils import mkdirs
-    from .RESPolicy import write_xml
+    from .RESPolicy import write_xml, ElementIndex
     from .xmlScenario import scenarioXML
 
     df = pd.read_csv(csvPath, index_col=None)
@@ -152,27 +152,34 @@ def generate_zev_xml(scenario, csvPath, xmlPath, transportTag, pMultiplier, outp
 
     # we use the indicated transportation XML file to extract load factors
     transportXML = scenarioXML(scenario, transportTag) # read the file associated with the given tag
-    xml = XMLFile(transportXML)
+    xml = XMLFile(transportXML, useCache=True)
     trans_root = xml.getRoot()
 
+    # Index the load factors by (region, sector, subsector, tech, year) in a single pass
+    load_factors = {}
+    for node in trans_root.xpath('//region/supplysector/tranSubsector/stub-technology/period/loadFactor'):
+        period = node.getparent()
+        tech = period.getparent()
+        subsector = tech.getparent()
+        sector = subsector.getparent()
+        region = sector.getparent()
+        key = (region.get('name'), sector.get('name'), subsector.get('name'), tech.get('name'), period.get('year'))
+        load_factors.setdefault(key, node.text)
+
     def load_factor(region, sector, subsector, tech, year):
-        xpath = "//region[@name='{}']/supplysector[@name='{}']/tranSubsector[@name='{}']/stub-technology[@name='{}']/period[@year='{}']/loadFactor".format(
-            region, sector, subsector, tech, year)
-        nodes = trans_root.xpath(xpath)
-        if len(nodes) == 0:
+        value = load_factors.get((region, sector, subsector, tech, year))
+        if value is None:
+            xpath = "//region[@name='{}']/supplysector[@name='{}']/tranSubsector[@name='{}']/stub-technology[@name='{}']/period[@year='{}']/loadFactor".format(
+                region, sector, subsector, tech, year)
             raise Exception('ZEVPolicy: Failed to find loadFactor for "{}"'.format(xpath))
 
-        return float(nodes[0].text)
+        return float(value)
 
     def find_or_create(parent, tag, name):
-        elt = parent.find('{}[@name="{}"]'.format(tag, name))
-        if elt is None:
-            elt = ET.SubElement(parent, tag, name=name)
-
-        return elt
+        return parent.child(tag, name=name)
 
     root = ET.Element('scenario')
-    world = ET.SubElement(root, 'world')
+    world = ElementIndex(ET.SubElement(root, 'world'))
 
     # If the standard is zero in some years, emit no policy-portfolio-standard, no
     # coefficients, and no secondary-res-outputs for that year.
@@ -180,7 +187,8 @@ def generate_zev_xml(scenario, csvPath, xmlPath, transportTag, pMultiplier, outp
     for region in sorted(df.region.unique()):
         region_df = df.query('region == @region')
 
-        region_elt = find_or_create(world, 'region', region)
+        region_idx = find_or_create(world, 'region', region)
+        region_elt = region_idx.elt
 
         for idx, row in region_df.iterrows():
             sector    = row.supplysector
@@ -221,10 +229,10 @@ def generate_zev_xml(scenario, csvPath, xmlPath, transportTag, pMultiplier, outp
                     if not target:
                         continue
 
-                    sect_elt = sect_elt if sect_elt is not None else find_or_create(region_elt, 'supplysector', sector)
+                    sect_elt = sect_elt if sect_elt is not None else find_or_create(region_idx, 'supplysector', sector)
                     subsect_elt = find_or_create(sect_elt, 'tranSubsector', subsector)
 
-                    tech_elt = find_or_create(subsect_elt, 'stub-technology', tech)
+                    tech_elt = find_or_create(subsect_elt, 'stub-technology', tech).elt
                     period_elt = ET.SubElement(tech_elt, 'period', year=year)
                     name = rec_name(market, subsector, year)
 
@@ -240,9 +248,9 @@ def generate_zev_xml(scenario, csvPath, xmlPath, transportTag, pMultiplier, outp
                         set_text(ET.SubElement(sec_input_elt, 'pMultiplier'), pMultiplier)
 
     # delete empty regions
-    emptyRegs = [reg for reg in world if len(reg) == 0]
+    emptyRegs = [reg for reg in world.elt if len(reg) == 0]
     for reg in emptyRegs:
-        world.remove(reg)
+        world.elt.remove(reg)
 
     _logger.info("Writing '%s'", xmlPath)
     mkdirs(os.path.dirname(xmlPath))    # ensure the location exists
@@ -71,7 +71,7 @@ def save_template(f, args, years, xml_file, xpath, which):
     pathname = pathjoin(gcamDir, 'input', 'gcamdata', 'xml', xml_file)
 
     _logger.info("Reading {}".format(pathname))
-    xml = XMLFile(pathname)
+    xml = XMLFile(pathname, useCache=True)
     root = xml.getRoot()
 
     nodes = root.xpath(xpath)
@@ -34,6 +34,11 @@ class ProtectLandCommand(SubcommandABC):
                             help=clean_help('''Edit the file in place. This must be given explicitly, to avoid overwriting
                             files by mistake.'''))
 
+        parser.add_argument('-j', '--jobs', type=int, default=None,
+                            help=clean_help('''The number of land files to process in parallel, in separate
+                            processes. If 0, all files (for all scenarios) are processed at once. Default is
+                            the value of configuration file parameter GCAM.LandProtectionJobs.'''))
+
         parser.add_argument('-l', '--landClasses', action='append',
                             help=clean_help('''The land class or classes to protect in the given regions. Multiple,
                             comma-delimited land types can be given in a single argument, or the -l flag can
@@ -70,9 +75,12 @@ class ProtectLandCommand(SubcommandABC):
                             additional regions. By default, all regions are protected.
                             This option is ignored if a scenario file is specified.'''))
 
-        parser.add_argument('-s', '--scenario', default=None,
+        parser.add_argument('-s', '--scenario', dest='scenarios', action='append',
                             help=clean_help('''The name of a land-protection scenario defined in the file given by the --scenarioFile
-                            argument or it's default value.'''))
+                            argument or it's default value. Multiple, comma-delimited scenarios can be given in a
+                            single argument, or the -s flag can be repeated to indicate additional scenarios, in
+                            which case the files for each scenario are written to a subdirectory of the output
+                            directory named for the scenario.'''))
 
         parser.add_argument('-S', '--scenarioFile', default=None,
                             help=clean_help('''An XML file defining land-protection scenarios. Default is the value
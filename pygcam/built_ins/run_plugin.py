@@ -40,6 +40,16 @@ class RunCommand(SubcommandABC):
         parser.add_argument('-G', '--listGroups', action='store_true',
                             help=clean_help('''List the scenario groups defined in the project file and exit.'''))
 
+        parser.add_argument('-j', '--jobs', type=int, default=1,
+                            help=clean_help('''Run up to the given number of steps in parallel in separate
+                            processes on the local computer. Each step starts as soon as the steps it depends
+                            on have completed, as set by the "dependsOn" attribute of the <step> element. By
+                            default, a step depends on the prior step for the same scenario and, for policy
+                            scenarios, on the baseline's step of the same name. The output of each step is
+                            written to "{group}-{scenario}-{step}.log" in the directory given by config
+                            variable GCAM.BatchLogDir. Ignored with --distribute or --noRun. Default is 1,
+                            i.e., run steps sequentially.'''))
+
         parser.add_argument('-k', '--skipStep', dest='skipSteps', action='append',
                             help=clean_help('''Steps to skip. These must be names of steps defined in the
                             project.xml file. Multiple steps can be given in a single (comma-delimited)
@@ -66,6 +76,11 @@ class RunCommand(SubcommandABC):
                             help=clean_help('''Don't quit if an error occurs when processing a scenario, just
                             move on to processing the next scenario, if any.'''))
 
+        parser.add_argument('-r', '--resume', action='store_true',
+                            help=clean_help('''Skip the steps that completed in the previous run of the same
+                            scenario group with --jobs or --resume, e.g., to continue after a failure. Steps
+                            are run in dependency order, as with --jobs.'''))
+
         parser.add_argument('-s', '--step', dest='steps', action='append',
                             help=clean_help('''The steps to run. These must be names of steps defined in the
                             project.xml file. Multiple steps can be given in a single (comma-delimited)
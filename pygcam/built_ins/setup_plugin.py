@@ -45,6 +45,10 @@ class SetupCommand(SubcommandABC):
                             help=clean_help('''Re-create the sandbox, even if it already exists. 
                             Implies --createSandbox.'''))
 
+        parser.add_argument('-F', '--force', action='store_true',
+                            help=clean_help('''Run the scenario setup even if its inputs are unchanged since the
+                            last setup of the scenario. Implied by --force-create.'''))
+
         parser.add_argument('-g', '--group',
                             help=clean_help('The scenario group to process. Defaults to the group labeled default="1".'))
 
@@ -112,10 +116,28 @@ class SetupCommand(SubcommandABC):
 
     def run_scenario_setup(self, mapper, args):
         """
-        Run the setup steps indicated in scenarios.xml.
+        Run the setup steps indicated in scenarios.xml, unless GCAM.SkipUnchangedSetup
+        is True and the fingerprint of the scenario's setup inputs matches the one saved
+        by the last successful setup of the scenario.
         """
+        from ..config import getParamAsBoolean, pathjoin
+        from ..manifest import readFingerprint, writeFingerprint, SETUP_FINGERPRINT_FILE
+        from ..xmlScenario import setupFingerprint
+
         editor_cls = mapper.editor_class(mapper.scenario, moduleSpec=args.moduleSpec, modulePath=args.modulePath)
 
+        fingerprint = None
+        if getParamAsBoolean('GCAM.SkipUnchangedSetup'):
+            fingerprint = setupFingerprint(mapper, editor_cls, args)
+
+        # Saved in the scenario's local-xml directory, which is emptied when setup runs
+        fingerprint_file = pathjoin(mapper.sandbox_scenario_xml, SETUP_FINGERPRINT_FILE)
+
+        if fingerprint and not args.force and readFingerprint(fingerprint_file) == fingerprint:
+            _logger.info(f"Skipping setup of scenario '{mapper.scenario}': inputs are unchanged. "
+                         f"Use --force to run setup anyway.")
+            return
+
         # TBD: this seems incorrect now
         # When called in 'trial' mode, we only run dynamic setup.
         # When run in 'gensim' mode, we do only static setup.
@@ -128,12 +150,16 @@ class SetupCommand(SubcommandABC):
         obj = editor_cls(mapper)
         obj.setup(args)
 
+        if fingerprint:
+            writeFingerprint(fingerprint_file, fingerprint)
+
     def run(self, args, tool):
         from ..error import CommandlineError
         from ..mcs.sim_file_mapper import get_mapper
 
         if args.force_create:
-            args.create_sandbox = True  # implied argument
+            args.create_sandbox = True  # implied arguments
+            args.force = True
 
         if not (args.create_sandbox or args.run_scenario_setup):
             raise CommandlineError("Specified both --no-create-sandbox and --no-run-scenario-setup so there's nothing to do.")
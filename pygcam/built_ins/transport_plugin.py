@@ -49,7 +49,7 @@ def save_transport_techs(f, args, years):
     pathname = pathjoin(gcamDir, 'input', 'gcamdata', 'xml', 'transportation_UCD_CORE.xml')
     _logger.info("Reading {}".format(pathname))
 
-    xml = XMLFile(pathname)
+    xml = XMLFile(pathname, useCache=True)
     root = xml.getRoot()
 
     if args.regions:
@@ -10,6 +10,8 @@ LOCAL_XML_NAME = 'local-xml'
 DYN_XML_NAME   = 'dyn-xml'
 APP_XML_NAME   = 'app-xml'
 TRIAL_XML_NAME = 'trial-xml'
+TRIAL_XML_CACHE_NAME = 'trial-xml-cache'
+PREGEN_XML_NAME = 'pregen-xml'
 XML_SRC_NAME   = 'xmlsrc'
 PARAMETERS_XML = "parameters.xml"
 RESULTS_XML    = "results.xml"
@@ -12,9 +12,11 @@ from .config import getParam, getParamAsBoolean, getParamAsPath, pathjoin, mkdir
 from .constants import (CONFIG_XML, LOCAL_XML_NAME, QRESULTS_DIRNAME, DIFFS_DIRNAME,
                         OUTPUT_DIRNAME, FileVersions)
 from .error import SetupException, PygcamException, FileMissingError
-from .file_utils import removeTreeSafely, removeFileOrTree, copyFileOrTree, symlinkOrCopyFile
+from .file_utils import (removeTreeSafely, removeFileOrTree, copyFileOrTree, symlinkOrCopyFile,
+                         filecopy, lockFile)
 from .gcam_path import makeDirPath, GcamPath
 from .log import getLogger
+from .manifest import FileManifest, MANIFEST_FILE
 from .XMLConfigFile import XMLConfigFile
 from .xmlScenario import XMLScenario
 
@@ -199,8 +201,24 @@ class AbstractFileMapper(object):
             if e.errno != errno.ENOENT:  # ENOENT => no such file exists
                 raise
 
+        # Allows override from SimFileMapper when calling super().__init__()
+        files_to_link_param = files_to_link_param or 'GCAM.WorkspaceFilesToLink'
+        filesToCopy, filesToLink = getFilesToCopyAndLink(files_to_link_param)
+
+        use_manifest = getParamAsBoolean('GCAM.WorkspaceManifest')
+
         if sandbox_workspace_exists and not force_create:
-            _logger.debug("Sandbox workspace already exists and force_create is False")
+            if use_manifest:
+                # Policy scenarios may be set up concurrently (e.g., "run --jobs"), so the
+                # update is guarded by a lock rather than the creation semaphore, whose
+                # presence causes the workspace to be recreated. Processes wait for an
+                # update in progress, then compare against the manifest it saved, so they
+                # find nothing left to copy. An interrupted update needs no marker since
+                # the manifest is saved only when it completes.
+                with lockFile(pathjoin(sandbox_workspace, '.update_lock')):
+                    self.update_ref_workspace(filesToCopy, filesToLink)
+            else:
+                _logger.debug("Sandbox workspace already exists and force_create is False")
             return
 
         version = getParam('GCAM.VersionNumber')
@@ -213,10 +231,6 @@ class AbstractFileMapper(object):
         mkdirs(sandbox_workspace)
         open(semaphore_file, 'w').close()  # create empty semaphore file
 
-        # Allows override from SimFileMapper when calling super().__init__()
-        files_to_link_param = files_to_link_param or 'GCAM.WorkspaceFilesToLink'
-        filesToCopy, filesToLink = getFilesToCopyAndLink(files_to_link_param)
-
         for filename in filesToCopy:
             workspaceLinkOrCopy(filename, ref_workspace, sandbox_workspace, copyFiles=True)
 
@@ -227,9 +241,99 @@ class AbstractFileMapper(object):
         #     dirname = pathjoin(sandbox_workspace, filename)
         #     mkdirs(dirname)
 
+        if use_manifest:
+            manifest = self.ref_workspace_manifest(filesToCopy, filesToLink)
+            manifest.save(pathjoin(sandbox_workspace, MANIFEST_FILE))
+
         # if successful, remove semaphore
         os.remove(semaphore_file)
 
+    def _copied_workspace_files(self, filesToCopy, filesToLink):
+        """
+        Return the relative pathnames of the entries that are physically copied (rather
+        than linked) into the sandbox workspace. Absolute pathnames are excluded since
+        they are not located in the reference workspace.
+        """
+        copied = filesToCopy + (filesToLink if getParamAsBoolean('GCAM.CopyAllFiles') else [])
+        return sorted(name for name in copied if not os.path.isabs(name))
+
+    def ref_workspace_manifest(self, filesToCopy, filesToLink):
+        """
+        Create a manifest of the reference workspace files that are copied to the
+        sandbox workspace.
+
+        :param filesToCopy: (list of str) files that are always copied
+        :param filesToLink: (list of str) files that are linked unless GCAM.CopyAllFiles is True
+        :return: (FileManifest) the manifest
+        """
+        relpaths = self._copied_workspace_files(filesToCopy, filesToLink)
+        use_hash = getParamAsBoolean('GCAM.WorkspaceManifestHash')
+        return FileManifest.from_tree(self.ref_workspace, relpaths, use_hash=use_hash)
+
+    def update_ref_workspace(self, filesToCopy, filesToLink):
+        """
+        Bring an existing sandbox workspace up to date with the reference workspace by
+        copying only the files that were added or changed since the workspace's manifest
+        was written, deleting files that were removed, and recreating links. If the
+        workspace has no manifest (e.g., it was created by an older version of pygcam),
+        one is computed from the files in the sandbox workspace.
+
+        :param filesToCopy: (list of str) files that are always copied
+        :param filesToLink: (list of str) files that are linked unless GCAM.CopyAllFiles is True
+        :return: nothing
+        """
+        ref_workspace = self.ref_workspace
+        sandbox_workspace = self.sandbox_workspace
+        manifest_path = pathjoin(sandbox_workspace, MANIFEST_FILE)
+
+        relpaths = self._copied_workspace_files(filesToCopy, filesToLink)
+        new_manifest = self.ref_workspace_manifest(filesToCopy, filesToLink)
+        old_manifest = (FileManifest.load(manifest_path) or
+                        FileManifest.from_tree(sandbox_workspace, relpaths,
+                                               use_hash=new_manifest.use_hash))
+
+        # Entries that are missing or were previously linked are copied in full
+        recopied = []
+        for relpath in relpaths:
+            dst = pathjoin(sandbox_workspace, relpath)
+            if os.path.islink(dst) or not os.path.lexists(dst):
+                workspaceLinkOrCopy(relpath, ref_workspace, sandbox_workspace, copyFiles=True)
+                recopied.append(relpath)
+
+        def recopied_entry(relpath):
+            return any(relpath == entry or relpath.startswith(entry + os.sep) for entry in recopied)
+
+        changed, removed = new_manifest.diff(old_manifest)
+        changed = [relpath for relpath in changed if not recopied_entry(relpath)]
+        removed = [relpath for relpath in removed if not recopied_entry(relpath)]
+
+        for relpath in removed:
+            _logger.debug(f"Removing '{relpath}' from sandbox workspace")
+            removeFileOrTree(pathjoin(sandbox_workspace, relpath), raiseError=False)
+
+        for relpath in changed:
+            dst = pathjoin(sandbox_workspace, relpath)
+            mkdirs(os.path.dirname(dst))
+            filecopy(pathjoin(ref_workspace, relpath), dst)
+
+        # Links are cheap to recreate, and this repairs any that were removed or broken
+        for filename in filesToLink:
+            if filename not in relpaths:
+                workspaceLinkOrCopy(filename, ref_workspace, sandbox_workspace, copyFiles=False)
+
+        # Absolute paths aren't in the manifest; these are copied only if missing
+        for filename in filesToCopy:
+            if os.path.isabs(filename):
+                workspaceLinkOrCopy(filename, ref_workspace, sandbox_workspace, copyFiles=True)
+
+        if changed or removed or recopied:
+            _logger.info(f"Updated sandbox workspace '{sandbox_workspace}': {len(changed)} files copied, "
+                         f"{len(removed)} removed, {len(recopied)} entries recopied")
+        else:
+            _logger.debug(f"Sandbox workspace '{sandbox_workspace}' is up to date")
+
+        new_manifest.save(manifest_path)
+
     def copy_sandbox_workspace(self):
         """
         Copy/link the sandbox's Workspace copy to the given sandbox scenario directory.
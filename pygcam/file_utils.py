@@ -26,6 +26,30 @@ def pushd(directory):
         _logger.debug(f"pushd: returning to '{directory}'")
         os.chdir(owd)
 
+@contextmanager
+def lockFile(path):
+    """
+    Context manager that takes an exclusive lock on the file `path`, which is
+    created if necessary, waiting until any other process holding it releases it.
+    The lock is released on exit, and by the OS if the process dies. On platforms
+    without ``fcntl`` (i.e., Windows), no lock is taken.
+
+    :param path: (str) the pathname of the lock file
+    :return: none
+    """
+    try:
+        import fcntl
+    except ImportError:
+        yield
+        return
+
+    with open(path, 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
 
 def deleteFile(filename):
     """
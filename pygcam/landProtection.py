@@ -8,10 +8,11 @@ import copy
 import os
 from semver import VersionInfo
 import sys
+import time
 
 from lxml import etree as ET
 
-from .config import getParam, parse_gcam_version, pathjoin, mkdirs
+from .config import getParam, getParamAsBoolean, getParamAsInt, parse_gcam_version, pathjoin, mkdirs
 from .constants import UnmanagedLandClasses
 from .error import FileFormatError, CommandlineError, PygcamException
 from .log import getLogger
@@ -24,6 +25,10 @@ Verbose = False
 
 PROTECTED = 'Protected'
 
+# The (function, args, outFile) tuples run by _runProtectionTask, which is
+# set before forking worker processes so that they inherit it.
+_protectionTasks = None
+
 def pp(elt):
     print(ET.tostring(elt, pretty_print=True))
 
@@ -94,7 +99,8 @@ class LandProtection(object):
                 createProtected(tree, prot.fraction, landClasses=prot.landClasses, regions=regions)
 
     # TBD: test this
-    def protectLand(self, infile, outfile, scenarioName, backup=True, unprotectFirst=False):
+    def protectLand(self, infile, outfile, scenarioName, backup=True, unprotectFirst=False,
+                    streaming=None):
         """
         Generate a copy of `infile` with land protected according to `scenarioName`,
         writing the output to `outfile`.
@@ -105,18 +111,29 @@ class LandProtection(object):
         :param backup: if True, create a backup `outfile`, with a '~' appended to the name,
           before writing a new file.
         :param unprotectFirst: (bool) if True, make all land "unprotected" before protecting.
+        :param streaming: (bool) if True, read and write the file one region at a time
+          (see protectLandStreaming) rather than parsing the entire file. If None, the
+          value of config variable GCAM.LandProtectionStreaming is used.
         :return: none
         """
-        parser = ET.XMLParser(remove_blank_text=True)
-        tree = ET.parse(infile, parser)
+        if streaming is None:
+            streaming = getParamAsBoolean('GCAM.LandProtectionStreaming')
+
+        if streaming:
+            # write to a temporary file since infile and outfile may be the same
+            tmpFile = outfile + '.tmp'
+            protectLandStreaming(infile, tmpFile, scenarioName)
+        else:
+            parser = ET.XMLParser(remove_blank_text=True)
+            tree = ET.parse(infile, parser)
 
-        # TBD: eliminate this for v5.0
-        # Remove any existing land protection, if so requested
-        # if unprotectFirst:
-        #     unProtectLand(tree, otherArable=True)
+            # TBD: eliminate this for v5.0
+            # Remove any existing land protection, if so requested
+            # if unprotectFirst:
+            #     unProtectLand(tree, otherArable=True)
 
-        # self.protectLandTree(tree, scenarioName)
-        protectLandTree(tree, scenarioName)
+            # self.protectLandTree(tree, scenarioName)
+            protectLandTree(tree, scenarioName)
 
         if backup:
             try:
@@ -127,7 +144,10 @@ class LandProtection(object):
                 PygcamException(f'Failed to create backup file "{backupFile}": {e}')
 
         _logger.info("Writing '%s'...", outfile)
-        tree.write(outfile, xml_declaration=True, pretty_print=True)
+        if streaming:
+            os.replace(tmpFile, outfile)
+        else:
+            tree.write(outfile, xml_declaration=True, pretty_print=True)
 
 
 class Group(object):
@@ -409,9 +429,63 @@ def parseLandProtectionFile(scenarioFile=None):
     obj = LandProtection(xmlFile.getRoot())
     return obj
 
+def _runProtectionTask(index):
+    """
+    Run the task at ``index`` in ``_protectionTasks``. Runs in a pool worker (or
+    in the main process if no pool is used).
+
+    :return: (tuple) the pathname of the file written and the elapsed seconds
+    """
+    func, args, outFile = _protectionTasks[index]
+    start = time.time()
+    func(*args)
+    return outFile, time.time() - start
+
+def _runProtectionTasks(tasks, jobs=None):
+    """
+    Run the given land-protection tasks, each of which reads and writes a separate
+    land file, in up to `jobs` worker processes.
+
+    :param tasks: (list of tuples) (function, args, outFile) where ``function(*args)``
+        writes the file ``outFile``.
+    :param jobs: (int) the maximum number of worker processes to use. If None, the
+        value of config variable `GCAM.LandProtectionJobs` is used. If 0, one process
+        is used per task. Tasks are run in the calling process if `jobs` is 1 or on
+        platforms that don't support forking.
+    :return: (list of tuples) the pathname of each file written and the seconds
+        it took, in the order of `tasks`.
+    """
+    import multiprocessing as mp
+    from concurrent.futures import ProcessPoolExecutor
+
+    global _protectionTasks
+
+    if not tasks:
+        return []
+
+    if jobs is None:
+        jobs = getParamAsInt('GCAM.LandProtectionJobs')
+
+    jobs = min(jobs or len(tasks), len(tasks))
+
+    _protectionTasks = tasks
+    try:
+        if jobs == 1 or 'fork' not in mp.get_all_start_methods():
+            results = [_runProtectionTask(i) for i in range(len(tasks))]
+        else:
+            with ProcessPoolExecutor(max_workers=jobs, mp_context=mp.get_context('fork')) as pool:
+                results = list(pool.map(_runProtectionTask, range(len(tasks))))
+    finally:
+        _protectionTasks = None
+
+    for outFile, seconds in results:
+        _logger.info("Wrote '%s' in %.1f seconds", outFile, seconds)
+
+    return results
+
 def runProtectionScenario(scenarioName, outputDir=None, workspace=None,
                           scenarioFile=None, xmlFiles=None, inPlace=False,
-                          unprotectFirst=False):
+                          unprotectFirst=False, jobs=None):
     """
     Run the protection named by `scenarioName`, found in `scenarioFile` if given,
     or the value of config variable `GCAM.LandProtectionXmlFile` otherwise. The source
@@ -432,24 +506,58 @@ def runProtectionScenario(scenarioName, outputDir=None, workspace=None,
     :param inPlace: (bool) if True, input and output files may be the same (output overwrites input).
     :param unprotectFirst: (bool) if True, make all land "unprotected" before
            protecting.
-    :return: none
+    :param jobs: (int) the number of files to process in parallel (see _runProtectionTasks)
+    :return: (list of tuples) the pathname of each file written and the seconds it took
+    """
+    return runProtectionScenarios([scenarioName], outputDir=outputDir, workspace=workspace,
+                                  scenarioFile=scenarioFile, xmlFiles=xmlFiles, inPlace=inPlace,
+                                  unprotectFirst=unprotectFirst, jobs=jobs)
+
+def runProtectionScenarios(scenarioNames, outputDir=None, workspace=None,
+                           scenarioFile=None, xmlFiles=None, inPlace=False,
+                           unprotectFirst=False, jobs=None):
+    """
+    Run the protections named by `scenarioNames`, as in runProtectionScenario, processing
+    the land files for all the scenarios in up to `jobs` worker processes. If more than
+    one scenario is given, the files for each are written to a subdirectory of `outputDir`
+    named for the scenario, and `inPlace` may not be used. Other arguments are as for
+    runProtectionScenario.
+
+    :param scenarioNames: (list of str) the names of scenarios defined in the `scenarioFile`
+    :return: (list of tuples) the pathname of each file written and the seconds it took
     """
-    _logger.debug("Land-protection scenario '%s'", scenarioName)
+    _logger.debug("Land-protection scenarios %s", scenarioNames)
+
+    multiple = len(scenarioNames) > 1
+    if multiple and inPlace:
+        raise CommandlineError("Only one land-protection scenario can be applied in place")
 
     landProtection = parseLandProtectionFile(scenarioFile=scenarioFile)
 
     workspace = workspace or getParam('GCAM.SandboxWorkspace')
     xmlFiles = xmlFiles or _landXmlPaths(workspace)
 
-    for inFile in xmlFiles:
-        basename = os.path.basename(inFile)
-        outFile = inFile if inPlace else pathjoin(outputDir, basename)
+    tasks = []
+    for scenarioName in scenarioNames:
+        if not Scenario.getScenario(scenarioName):
+            raise FileFormatError(f"Protection scenario '{scenarioName}' was not found")
+
+        outDir = pathjoin(outputDir, scenarioName) if multiple else outputDir
+        if multiple:
+            mkdirs(outDir)
+
+        for inFile in xmlFiles:
+            basename = os.path.basename(inFile)
+            outFile = inFile if inPlace else pathjoin(outDir, basename)
 
-        # check that we're not clobbering the input file
-        if not inPlace and os.path.lexists(outFile) and os.path.samefile(inFile, outFile):
-            raise CommandlineError(f"Attempted to overwrite '{inFile}' but --inPlace was not specified.")
+            # check that we're not clobbering the input file
+            if not inPlace and os.path.lexists(outFile) and os.path.samefile(inFile, outFile):
+                raise CommandlineError(f"Attempted to overwrite '{inFile}' but --inPlace was not specified.")
 
-        landProtection.protectLand(inFile, outFile, scenarioName, unprotectFirst=unprotectFirst)
+            args = (inFile, outFile, scenarioName, True, unprotectFirst)
+            tasks.append((landProtection.protectLand, args, outFile))
+
+    return _runProtectionTasks(tasks, jobs=jobs)
 
 def protectLandMain(args):
 
@@ -457,7 +565,7 @@ def protectLandMain(args):
     Verbose = args.verbose
     regions      = args.regions and flatten(map(lambda s: s.split(','), args.regions))
     scenarioFile = args.scenarioFile or getParam('GCAM.LandProtectionXmlFile')
-    scenarioName = args.scenario
+    scenarioNames = args.scenarios and flatten(map(lambda s: s.split(','), args.scenarios))
     outDir    = args.outDir
     workspace = args.workspace or getParam('GCAM.RefWorkspace')
     template  = args.template
@@ -471,11 +579,11 @@ def protectLandMain(args):
     xmlFiles = _landXmlPaths(workspace)
 
     # Process instructions from protection XML file
-    if scenarioName:
+    if scenarioNames:
         if not scenarioFile:
-            raise CommandlineError(f'Scenario "{scenarioName}" was specified, but a scenario file was not identified')
-        runProtectionScenario(scenarioName, outDir, workspace=workspace,
-                              scenarioFile=scenarioFile, xmlFiles=xmlFiles, inPlace=args.inPlace)
+            raise CommandlineError(f'Scenarios {scenarioNames} were specified, but a scenario file was not identified')
+        runProtectionScenarios(scenarioNames, outDir, workspace=workspace, scenarioFile=scenarioFile,
+                               xmlFiles=xmlFiles, inPlace=args.inPlace, jobs=args.jobs)
         return
 
     # If no scenario name given, process command-line args
@@ -491,6 +599,7 @@ def protectLandMain(args):
                     'regions'  : '-'.join(regions) if regions else 'global',
                     'classes'  : '-'.join(landClasses) if args.landClasses else 'unmanaged'}
 
+    tasks = []
     for path in xmlFiles:
         filename = os.path.basename(path)
         templateDict['filename'] = filename
@@ -499,7 +608,9 @@ def protectLandMain(args):
         outFile = template.format(**templateDict)
         outPath = pathjoin(outDir, outFile)
         _logger.debug("protectLand(%s, %s, %0.2f, %s, %s)", path, outFile, fraction, landClasses, regions)
-        protectLand(path, outPath, fraction, landClasses=landClasses, regions=regions)
+        tasks.append((protectLand, (path, outPath, fraction, landClasses, False, regions), outPath))
+
+    _runProtectionTasks(tasks, jobs=args.jobs)
 
 # Revised version for GCAM > 5.0
 
@@ -521,49 +632,6 @@ def eltname(elt):
 def _compose_land_basin(landtype, basin, protection):
     return "{}{}_{}".format(protection, landtype, basin)
 
-def _set_land_values(land_leaf, vals):
-    """
-    Update allocation and landAllocation nodes with the values
-    computed for each year.
-    """
-    nodes = land_leaf.xpath('.//allocation|.//landAllocation')
-    for node in nodes:
-        year = node.get('year')
-        node.text = str(vals[year])
-
-def _update_protection(reg_dict, landtype, basin, prot_vals, unprot_vals):
-    def _upd(protected, vals):
-        leaf_name = _compose_land_basin(landtype, basin, protected)
-        land_leaf = reg_dict[leaf_name]
-        _set_land_values(land_leaf, vals)
-
-    _upd(PROTECTED, prot_vals)
-    _upd('', unprot_vals)
-
-def _get_allocation(reg_dict, landtype, basin, protected=None):
-    import pandas as pd
-
-    prefix = PROTECTED if protected else ''
-    land_key = prefix + landtype + '_' + basin
-
-    # TBD: probably don't need this once file is correct...
-    try:
-        land_leaf = reg_dict[land_key]
-    except KeyError:
-        return 0
-
-    nodes = land_leaf.xpath('.//allocation[@year<1975]|.//landAllocation')
-    [(node.get('year'), float(node.text)) for node in nodes]
-    values = [(node.get('year'), float(node.text)) for node in nodes]
-    ind, val = zip(*values)
-    s = pd.Series(val, index=ind)
-    return s
-
-def _get_total_area(reg_dict, landtype, basin):
-    unprot = _get_allocation(reg_dict, landtype, basin, protected=False)
-    prot   = _get_allocation(reg_dict, landtype, basin, protected=True)
-    return prot + unprot
-
 def _landtype_basin_pairs(reg_dict):
     """
     Return the landtype and basin name, ignoring the protected field
@@ -572,26 +640,128 @@ def _landtype_basin_pairs(reg_dict):
     return pairs
 
 def _cache_land_nodes(tree, regions):
-    d = {}
-    for reg in regions:
-        nodes = tree.xpath(f'//region[@name="{reg}"]//UnmanagedLandLeaf')
-        d[reg] = {eltname(node) : node for node in nodes}
+    """
+    Return a dict, keyed by region name, of dicts of the UnmanagedLandLeaf elements
+    in each of the given regions, keyed by leaf name. The tree is traversed once.
+    """
+    d = {reg: {} for reg in regions}
+    for region in tree.iter('region'):
+        reg_dict = d.get(region.get('name'))
+        if reg_dict is not None:
+            reg_dict.update((eltname(node), node) for node in region.iter('UnmanagedLandLeaf'))
     return d
 
+def _allocation_nodes(land_leaf):
+    """
+    Return a list of the (node, year, isValue) for the allocation and landAllocation
+    nodes of `land_leaf`, where isValue indicates whether the node's value is used
+    in computing the land area (historical allocations before 1975 and all landAllocations).
+    Allocations from 1975 on are set to the area computed for the landAllocation of
+    the same year.
+    """
+    nodes = []
+    for node in land_leaf.iter('allocation', 'landAllocation'):
+        year = node.get('year')
+        nodes.append((node, year, node.tag == 'landAllocation' or float(year) < 1975))
+    return nodes
+
+def _protect_region(reg_dict, prot_tups):
+    """
+    Apply the protections in `prot_tups`, a list of (landtype, basin, fraction), to the
+    UnmanagedLandLeaf elements in `reg_dict`. For each land type and basin, the total
+    area of the protected and unprotected leaves is split between them according to
+    the protected fraction. The allocations of all affected leaves are gathered into
+    arrays indexed by (leaf pair, year), so each protection is applied to all matching
+    pairs in a single vectorized operation, in the order given.
+    """
+    import numpy as np
+    from collections import defaultdict
+
+    # Index the (landtype, basin) pairs by landtype
+    basins = defaultdict(list)
+    for (landtype, basin) in _landtype_basin_pairs(reg_dict):
+        basins[landtype].append(basin)
+
+    # The pairs affected by each protection; a basin of None matches all basins
+    updates = []
+    for (landtype, basin, prot_frac) in prot_tups:
+        pairs = [(landtype, b) for b in basins.get(landtype, ()) if basin == b or not basin]
+        if pairs:
+            updates.append((pairs, prot_frac))
+
+    if not updates:
+        return
+
+    rows = {}           # (landtype, basin) -> row index
+    cols = {}           # year -> column index
+    leaves = []         # (row, isProtected, allocation nodes)
+
+    for pairs, _ in updates:
+        for (landtype, basin) in pairs:
+            if (landtype, basin) in rows:
+                continue
+
+            row = rows[(landtype, basin)] = len(rows)
+            for protected in (PROTECTED, ''):
+                leaf_name = _compose_land_basin(landtype, basin, protected)
+                land_leaf = reg_dict.get(leaf_name)
+                if land_leaf is None:
+                    raise FileFormatError(f"UnmanagedLandLeaf '{leaf_name}' was not found, but is required "
+                                          f"to protect '{_compose_land_basin(landtype, basin, PROTECTED)}'")
+
+                nodes = _allocation_nodes(land_leaf)
+                leaves.append((row, bool(protected), nodes))
+                for (_, year, isValue) in nodes:
+                    if isValue:
+                        cols.setdefault(year, len(cols))
+
+    # Years missing for a leaf are NaN
+    prot   = np.full((len(rows), len(cols)), np.nan)
+    unprot = np.full((len(rows), len(cols)), np.nan)
+
+    for (row, isProtected, nodes) in leaves:
+        values = prot if isProtected else unprot
+        for (node, year, isValue) in nodes:
+            if isValue:
+                values[row, cols[year]] = float(node.text)
+
+    for pairs, prot_frac in updates:
+        idx = [rows[pair] for pair in pairs]
+        total = prot[idx] + unprot[idx]
+        prot[idx] = total * prot_frac
+        unprot[idx] = total - prot[idx]
+
+    for (row, isProtected, nodes) in leaves:
+        values = (prot if isProtected else unprot)[row]
+        for (node, year, _) in nodes:
+            node.text = str(values[cols[year]])
+
 def _protect_land(tree, prot_dict):
     node_dict = _cache_land_nodes(tree, prot_dict.keys())
     for (reg, prot_tups) in prot_dict.items():
-        reg_dict = node_dict[reg]
-        land_basin_pairs = _landtype_basin_pairs(reg_dict)
-
-        for (landtype, basin, prot_frac) in prot_tups:
-            for (l, b) in land_basin_pairs:
-                if landtype == l and (basin == b or not basin):
-                    _logger.debug(f"Processing {reg}, {landtype}, {b}")
-                    total = _get_total_area(reg_dict, landtype, b)
-                    prot_vals   = total * prot_frac
-                    unprot_vals = total - prot_vals
-                    _update_protection(reg_dict, landtype, b, prot_vals, unprot_vals)
+        _logger.debug(f"Processing {reg}")
+        _protect_region(node_dict[reg], prot_tups)
+
+def _protection_dict(scenarioName):
+    """
+    Return a dict of lists of (landtype, basin, fraction) tuples, keyed by region name,
+    for the protection scenario `scenarioName`.
+    """
+    from collections import defaultdict
+
+    scenario = Scenario.getScenario(scenarioName)
+    if not scenario:
+        raise FileFormatError(f"Protection scenario '{scenarioName}' was not found")
+
+    prot_dict = defaultdict(list)
+
+    for reg, protReg in scenario.protRegDict.items():
+        for prot in protReg.protections:
+            fraction = prot.fraction
+            basin = prot.basin
+            prot_dict[reg] += [(landtype, basin, fraction) for landtype in prot.landClasses]
+
+    return prot_dict
 
 #
 # Modified from landProtection.py method of same name
@@ -606,20 +776,99 @@ def protectLandTree(tree, scenarioName):
     :param scenarioName: (str) the name of the scenario to apply
     :return: none
     """
-    from collections import defaultdict
-
     _logger.info("Applying protection scenario %s", scenarioName)
 
-    scenario = Scenario.getScenario(scenarioName)
-    if not scenario:
-        raise FileFormatError(f"Protection scenario '{scenarioName}' was not found")
+    prot_dict = _protection_dict(scenarioName)
+    _protect_land(tree, prot_dict)
 
-    prot_dict = defaultdict(list)
+def transformRegions(infile, outfile, regionFunc):
+    """
+    Copy the GCAM XML input file `infile` to `outfile`, reading and writing one
+    ``<region>`` element at a time so that memory use is bounded by the size of
+    the largest region rather than that of the file. Elements other than regions
+    that are children of the root or of ``<world>`` are copied unchanged, as are
+    comments and processing instructions, and the namespace declarations of the
+    root and ``<world>`` elements.
+
+    :param infile: (str) the pathname of the XML file to read
+    :param outfile: (str) the pathname of the XML file to write
+    :param regionFunc: (callable) called as ``regionFunc(tree, regionName)`` with an
+        ``lxml.etree.ElementTree`` holding just the region, which it may modify.
+    :return: none
+    """
+    def isContainer(elt, parent):
+        return parent is None or (elt.tag == 'world' and parent is containers[-1])
+
+    containers = []     # the root and <world> elements currently open in the output
+    contexts = []       # the corresponding xmlfile.element() contexts
+    trailing = []       # comments and PIs after the root, which xmlfile can't write
+    closed = False      # whether the root element has been written
+
+    with ET.xmlfile(outfile, encoding='UTF-8') as xf:
+        xf.write_declaration()
+
+        for event, elt in ET.iterparse(infile, events=('start', 'end', 'comment', 'pi'), remove_blank_text=True):
+            parent = elt.getparent()
+
+            if event in ('comment', 'pi') and parent is None:
+                if closed:
+                    trailing.append(elt)
+                else:
+                    xf.write(elt, pretty_print=True)
+                continue
+
+            if event == 'start':
+                if isContainer(elt, parent):
+                    # declare only the namespaces not inherited from the parent
+                    nsmap = {prefix: uri for prefix, uri in elt.nsmap.items()
+                             if parent is None or parent.nsmap.get(prefix) != uri}
+                    ctx = xf.element(elt.tag, dict(elt.attrib), nsmap=nsmap)
+                    ctx.__enter__()
+                    xf.write('\n')
+                    containers.append(elt)
+                    contexts.append(ctx)
+                continue
+
+            if containers and elt is containers[-1]:
+                containers.pop()
+                contexts.pop().__exit__(None, None, None)
+                if containers:
+                    xf.write('\n')     # text isn't allowed after the root element
+                else:
+                    closed = True
+
+            elif containers and parent is containers[-1]:
+                # Detach the completed element so it can be processed as a
+                # separate tree and released once it's written.
+                parent.remove(elt)
+
+                if elt.tag == 'region':
+                    regionFunc(ET.ElementTree(elt), elt.get('name'))
+
+                xf.write(elt, pretty_print=True)
+
+    if trailing:
+        with open(outfile, 'ab') as f:
+            f.write(b'\n' + b''.join(ET.tostring(elt) + b'\n' for elt in trailing))
+
+def protectLandStreaming(infile, outfile, scenarioName):
+    """
+    Generate a copy of `infile` with land protected according to `scenarioName`,
+    processing one region at a time (see transformRegions). The results are the same
+    as from protectLandTree, but the entire file is never held in memory.
 
-    for reg, protReg in scenario.protRegDict.items():
-        for prot in protReg.protections:
-            fraction = prot.fraction
-            basin = prot.basin
-            prot_dict[reg] += [(landtype, basin, fraction) for landtype in prot.landClasses]
+    :param infile: (str) the pathname of a GCAM land input XML file
+    :param outfile: (str) the pathname of the XML file to write
+    :param scenarioName: (str) the name of the scenario to apply
+    :return: none
+    """
+    _logger.info("Applying protection scenario %s to '%s'", scenarioName, infile)
 
-    _protect_land(tree, prot_dict)
+    prot_dict = _protection_dict(scenarioName)
+
+    def protectRegion(tree, regionName):
+        prot_tups = prot_dict.get(regionName)
+        if prot_tups:
+            _protect_land(tree, {regionName: prot_tups})
+
+    transformRegions(infile, outfile, protectRegion)
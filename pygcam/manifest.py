@@ -0,0 +1,206 @@
+'''
+.. Support for incremental updates of sandbox workspaces using a file manifest,
+   and for skipping scenario setup when its inputs are unchanged.
+
+.. Copyright (c) 2023 Richard Plevin
+   See the https://opensource.org/licenses/MIT for license details.
+'''
+import json
+import os
+
+from .log import getLogger
+
+_logger = getLogger(__name__)
+
+MANIFEST_FILE = '.workspace_manifest.json'
+MANIFEST_VERSION = 1
+
+SETUP_FINGERPRINT_FILE = '.setup_fingerprint'
+
+_HASH_BLOCK_SIZE = 1 << 20
+
+
+def fileHash(path):
+    """
+    Compute a SHA-1 digest of the contents of the file at ``path``.
+
+    :param path: (str) the pathname of a file
+    :return: (str) the hex digest
+    """
+    import hashlib
+
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK_SIZE), b''):
+            h.update(block)
+
+    return h.hexdigest()
+
+
+class FileManifest(object):
+    """
+    Records the relative path, size, modification time, and (optionally) content
+    hash of every file below a set of top-level entries in a directory. Two manifests
+    can be compared to find the files that were added, changed, or removed.
+    """
+    def __init__(self, entries=None, use_hash=False):
+        self.entries = entries or {}   # relpath -> {'size': int, 'mtime': float, 'hash': str or None}
+        self.use_hash = use_hash
+
+    @classmethod
+    def from_tree(cls, root, relpaths, use_hash=False):
+        """
+        Create a manifest of the files under ``root`` identified by ``relpaths``,
+        which may name files or directories. Directories are walked recursively,
+        following symlinks, so linked sub-trees are recorded file by file.
+
+        :param root: (str) the directory to which ``relpaths`` are relative
+        :param relpaths: (iterable of str) top-level files or directories to record
+        :param use_hash: (bool) whether to compute a content hash for each file
+        :return: (FileManifest) the new manifest
+        """
+        entries = {}
+
+        def add(path, relpath):
+            st = os.stat(path)
+            entries[relpath] = {'size': st.st_size,
+                                'mtime': st.st_mtime,
+                                'hash': fileHash(path) if use_hash else None}
+
+        for relpath in relpaths:
+            path = os.path.join(root, relpath)
+            if not os.path.exists(path):
+                _logger.debug(f"FileManifest: skipping missing path '{path}'")
+                continue
+
+            if not os.path.isdir(path):
+                add(path, relpath)
+                continue
+
+            for dirpath, dirnames, filenames in os.walk(path, followlinks=True):
+                dirnames.sort()
+                reldir = os.path.relpath(dirpath, root)
+                for name in sorted(filenames):
+                    add(os.path.join(dirpath, name), os.path.join(reldir, name))
+
+        return cls(entries=entries, use_hash=use_hash)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Read a manifest previously written by ``save()``.
+
+        :param path: (str) the pathname of the manifest file
+        :return: (FileManifest) the manifest, or None if the file is missing,
+            unreadable, or written by an incompatible version.
+        """
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            _logger.debug(f"Can't read manifest '{path}': {e}")
+            return None
+
+        if data.get('version') != MANIFEST_VERSION:
+            return None
+
+        return cls(entries=data['entries'], use_hash=data.get('use_hash', False))
+
+    def save(self, path):
+        """
+        Write the manifest as JSON to ``path``, replacing it atomically.
+
+        :param path: (str) the pathname of the manifest file
+        :return: none
+        """
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'version': MANIFEST_VERSION,
+                       'use_hash': self.use_hash,
+                       'entries': self.entries}, f)
+
+        os.replace(tmp, path)
+
+    def _same(self, ours, theirs):
+        if ours['size'] != theirs['size']:
+            return False
+
+        if ours.get('hash') and theirs.get('hash'):
+            return ours['hash'] == theirs['hash']
+
+        return ours['mtime'] == theirs['mtime']
+
+    def diff(self, other):
+        """
+        Compare this manifest (the "new" state) to ``other`` (the "old" state).
+
+        :param other: (FileManifest) the manifest to compare against
+        :return: (tuple of lists of str) the relative paths that were changed
+            (including added) and those that were removed, each sorted.
+        """
+        changed = [relpath for relpath, info in self.entries.items()
+                   if relpath not in other.entries or not self._same(info, other.entries[relpath])]
+
+        removed = [relpath for relpath in other.entries if relpath not in self.entries]
+
+        return sorted(changed), sorted(removed)
+
+
+def fileStamps(paths):
+    """
+    Return the size and modification time of each of the given files.
+
+    :param paths: (iterable of str) pathnames of files
+    :return: (dict) ``[size, mtime]`` keyed by pathname, or None for missing files
+    """
+    stamps = {}
+    for path in paths:
+        try:
+            st = os.stat(path)
+            stamps[path] = [st.st_size, st.st_mtime]
+        except OSError:
+            stamps[path] = None
+
+    return stamps
+
+
+def fingerprint(data):
+    """
+    Compute a SHA-1 digest of ``data``, which must be serializable as JSON.
+
+    :param data: (dict, list, str, ...) the data to fingerprint
+    :return: (str) the hex digest
+    """
+    import hashlib
+
+    text = json.dumps(data, sort_keys=True, default=str)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def readFingerprint(path):
+    """
+    Read a fingerprint written by ``writeFingerprint()``.
+
+    :param path: (str) the pathname of the fingerprint file
+    :return: (str) the fingerprint, or None if the file is missing or unreadable
+    """
+    try:
+        with open(path) as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def writeFingerprint(path, value):
+    """
+    Write the fingerprint ``value`` to ``path``, replacing it atomically.
+
+    :param path: (str) the pathname of the fingerprint file
+    :param value: (str) the fingerprint
+    :return: none
+    """
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        f.write(value + '\n')
+
+    os.replace(tmp, path)
@@ -17,24 +17,35 @@ import numpy as np
 from scipy import stats
 from pandas import DataFrame
 
+from ..log import getLogger
+
+_logger = getLogger(__name__)
+
+def rankColumns(m):
+    """
+    Rank the values in each column of a 2-D array, all columns at once, using
+    the argsort of the argsort. Ties are broken by position rather than averaged,
+    which is appropriate for continuous values.
+
+    :param m: (numpy.ndarray) a 2-D array of values
+    :return: (numpy.ndarray of int) 1-relative ranks with the same shape as ``m``
+    """
+    return np.argsort(np.argsort(m, axis=0, kind='stable'), axis=0, kind='stable') + 1
+
+
 def rankCorrCoef(m):
     '''
     Take a 2-D array of values and produce a array of rank correlation
     coefficients representing the rank correlation among the columns.
+    This is computed as the Pearson correlation of the columns' ranks,
+    i.e., the Spearman correlation, in a single matrix operation.
     '''
-    dummy, cols = m.shape
-    corrCoef = np.zeros((cols, cols))  # @UndefinedVariable
-
-    for i in range(cols):
-        corrCoef[i, i] = 1.  # All columns are perfectly correlated with themselves
-        for j in range(i + 1, cols):
-            corr = stats.spearmanr(m[:, i], m[:, j])[0]
-            corrCoef[i, j] = corrCoef[j, i] = corr
+    ranks = stats.rankdata(m, axis=0)   # average ranks for ties, as in spearmanr
+    corrCoef = np.corrcoef(ranks, rowvar=False)
+    return np.atleast_2d(corrCoef)
 
-    return corrCoef
 
-
-def genRankValues(params, trials, corrMat):
+def genRankValues(params, trials, corrMat, rng=None):
     '''
     Generate a data set of 'trials' ranks for 'params'
     parameters that obey the given correlation matrix.
@@ -58,42 +69,205 @@ def genRankValues(params, trials, corrMat):
      [6,5,2],
      [5,2,1],
      [3,6,4]]
+
+    rng: optional numpy.random.Generator to use rather than the
+    global numpy random state.
     '''
+    from scipy.linalg import solve_triangular
+
     # Create van der Waarden scores
     strata = np.arange(1.0, trials + 1) / (trials + 1)
     vdwScores = stats.norm().ppf(strata)
 
-    S = np.zeros((trials, params))
-    for i in range(params):
-        np.random.shuffle(vdwScores)
-        S[:, i] = vdwScores
+    # An independent random permutation of the scores for each column
+    uniform = rng.random((trials, params)) if rng is not None else np.random.random_sample((trials, params))
+    S = vdwScores[np.argsort(uniform, axis=0)]
 
     P = np.linalg.cholesky(corrMat)
 
-    E = rankCorrCoef(S)
-    Q = np.array(np.linalg.cholesky(E))
-    final = np.dot(np.dot(S, np.linalg.inv(Q).T), P.T)
+    # The scores have no ties, so the Spearman correlation is the Pearson
+    # correlation of their ranks.
+    E = np.atleast_2d(np.corrcoef(rankColumns(S), rowvar=False))
+    Q = np.linalg.cholesky(E)
 
-    ranks = np.zeros((trials, params), dtype='i')
-    for i in range(params):
-        ranks[:, i] = stats.rankdata(final[:, i])
+    # Equivalent to S * inv(Q).T * P.T, without computing the inverse
+    final = np.dot(solve_triangular(Q, S.T, lower=True).T, P.T)
 
+    ranks = rankColumns(final).astype('i')
     return ranks
 
 
-def getPercentiles(trials=100):
+def correlationBlocks(corrMat):
+    """
+    Find the groups of parameters that are correlated with one another, directly
+    or through other parameters, i.e., the connected components of the graph
+    whose edges are the non-zero off-diagonal elements of ``corrMat``.
+
+    :param corrMat: (numpy.ndarray) a square correlation matrix
+    :return: (list of numpy.ndarray of int) the indices of the parameters in each
+        group of two or more parameters. Parameters not in any group are uncorrelated.
+    """
+    from scipy.sparse import csr_matrix
+    from scipy.sparse.csgraph import connected_components
+
+    adjacency = corrMat != 0
+    np.fill_diagonal(adjacency, False)
+
+    count, labels = connected_components(csr_matrix(adjacency), directed=False)
+    sizes = np.bincount(labels, minlength=count)
+
+    return [np.flatnonzero(labels == label) for label in range(count) if sizes[label] > 1]
+
+
+def nearestCorrelationMatrix(corrMat, tol=1e-8, maxIter=100, minEigenvalue=1e-6):
+    """
+    Find a positive definite correlation matrix near ``corrMat`` using Higham's
+    (2002) alternating projections method, which alternately projects onto the
+    positive semidefinite matrices and the matrices with a unit diagonal.
+
+    :param corrMat: (numpy.ndarray) a symmetric matrix with a unit diagonal
+    :param tol: (float) stop when the relative change between iterations is below this
+    :param maxIter: (int) the maximum number of iterations
+    :param minEigenvalue: (float) the eigenvalues of the result are at least
+        (approximately) this large, so the result can be Cholesky-factored.
+    :return: (numpy.ndarray) the repaired matrix
+    """
+    Y = np.array(corrMat, dtype=float)
+    dS = np.zeros_like(Y)
+
+    for _ in range(maxIter):
+        R = Y - dS
+        w, V = np.linalg.eigh(R)
+        X = (V * np.maximum(w, 0)) @ V.T
+        dS = X - R
+
+        prev = Y
+        Y = X.copy()
+        np.fill_diagonal(Y, 1.0)
+
+        if np.linalg.norm(Y - prev) / np.linalg.norm(Y) < tol:
+            break
+
+    # Make the result strictly positive definite, restoring the unit diagonal
+    w, V = np.linalg.eigh(Y)
+    Y = (V * np.maximum(w, minEigenvalue)) @ V.T
+    d = np.sqrt(np.diag(Y))
+    Y = Y / np.outer(d, d)
+    return (Y + Y.T) / 2
+
+
+def repairCorrMatrix(corrMat):
+    """
+    Return ``corrMat`` if it is positive definite, otherwise the nearest
+    correlation matrix that is, as computed by nearestCorrelationMatrix().
+    """
+    try:
+        np.linalg.cholesky(corrMat)
+        return corrMat
+
+    except np.linalg.LinAlgError:
+        repaired = nearestCorrelationMatrix(corrMat)
+        _logger.warning(f"Correlation matrix of {len(corrMat)} parameters is not positive definite; "
+                        f"using nearest valid matrix (max change {np.abs(repaired - corrMat).max():.3f})")
+        return repaired
+
+
+def getPercentiles(trials=100, rng=None):
     '''
     Generate a list of 'trials' values, one from each of 'trials' equal-size
     segments from a uniform distribution. These are used with an RV's ppf
     (percent point function = inverse cumulative function) to retrieve the
-    values for that RV at the corresponding percentiles.
+    values for that RV at the corresponding percentiles. If 'rng' (a
+    numpy.random.Generator) is given, it is used rather than the global
+    numpy random state.
     '''
     segmentSize = float(1. / trials)
-    points = stats.uniform.rvs(size=trials) * segmentSize + np.arange(trials) * segmentSize  # @UndefinedVariable
+    uniform = rng.random(trials) if rng is not None else stats.uniform.rvs(size=trials)  # @UndefinedVariable
+    points = uniform * segmentSize + np.arange(trials) * segmentSize
     return points
 
 
-def lhs(paramList, trials, corrMat=None, columns=None, skip=None):
+def _streamKeys(names):
+    """
+    Convert names to stable integers for use in a SeedSequence's spawn_key.
+    Repeated names (e.g., a parameter with independent RVs) are numbered.
+    """
+    import zlib
+
+    counts = {}
+    keys = []
+    for name in names:
+        n = counts[name] = counts.get(name, -1) + 1
+        keys.append(zlib.crc32(f"{name}#{n}".encode('utf-8')))
+
+    return keys
+
+
+def randomStreams(seed, names, start=0):
+    """
+    Create an independent random number generator for each of ``names``,
+    derived from the simulation-level ``seed``. Each stream is the child of
+    ``SeedSequence(seed)`` (as created by ``SeedSequence.spawn``) identified
+    by the starting trial number and the name, rather than by position, so
+    adding or reordering parameters doesn't change the values of the others,
+    and each block of trials appended to a simulation gets new streams.
+
+    :param seed: (int) the simulation's random seed
+    :param names: (list of str) a name (e.g., a parameter name) for each stream
+    :param start: (int) the number of the first trial to be generated
+    :return: (list of numpy.random.Generator) a generator for each name
+    """
+    root = np.random.SeedSequence(seed)
+    return [np.random.default_rng(np.random.SeedSequence(root.entropy, spawn_key=(start, key)))
+            for key in _streamKeys(names)]
+
+
+def _mapColumns(func, count, jobs):
+    """
+    Call func(i) for each column i in range(count), using ``jobs`` threads.
+    """
+    if jobs > 1 and count > 1:
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            return list(pool.map(func, range(count)))
+
+    return [func(i) for i in range(count)]
+
+
+def correlationRanks(corrMat, trials, names, seed=None, start=0):
+    """
+    Generate ranks that impose the correlations in ``corrMat``. Each group of
+    correlated parameters is rank-ordered separately, which is much faster than
+    processing the full matrix when few parameters are correlated.
+
+    :param corrMat: (numpy.ndarray or None) the correlation matrix
+    :param trials: (int) the number of trials
+    :param names: (list of str) the names of the parameters, used to identify
+        the random stream for each group if ``seed`` is given
+    :param seed: (int or None) the simulation's random seed
+    :param start: (int) the number of the first trial generated
+    :return: (dict) maps the index of each correlated parameter to an array of
+        1-relative ranks. Uncorrelated parameters are not included.
+    """
+    ranks = {}
+    if corrMat is None:
+        return ranks
+
+    blocks = correlationBlocks(corrMat)
+    blockRngs = ([None] * len(blocks) if seed is None else
+                 randomStreams(seed, ['corr:' + ','.join(names[i] for i in block) for block in blocks],
+                               start=start))
+
+    for block, rng in zip(blocks, blockRngs):
+        blockCorr = repairCorrMatrix(corrMat[np.ix_(block, block)])
+        blockRanks = genRankValues(len(block), trials, blockCorr, rng=rng)
+        ranks.update(zip(block.tolist(), blockRanks.T))
+
+    return ranks
+
+
+def lhs(paramList, trials, corrMat=None, columns=None, skip=None, seed=None, start=0, jobs=1):
     """
     Produce an ndarray or DataFrame of 'trials' rows of values for the given parameter
     list, respecting the correlation matrix 'corrMat' if one is specified, using Latin
@@ -107,39 +281,63 @@ def lhs(paramList, trials, corrMat=None, columns=None, skip=None):
     :param trials: (int) number of trials to generate for each parameter.
     :param corrMat: a numpy matrix representing the correlation between the parameters.
            corrMat[i,j] should give the correlation between the i'th and j'th
-           entries of paramlist.
+           entries of paramlist. Each group of correlated parameters is sampled
+           separately, and a group's matrix that isn't positive definite is replaced
+           by the nearest matrix that is.
     :param columns: (None or list(str)) Column names to use to return a DataFrame.
     :param skip: (list of params)) Parameters to process later because they are
            dependent on other parameter values (e.g., they're "linked"). These
            cannot be correlated.
+    :param seed: (int or None) If given, each column (and each group of correlated
+           columns) is generated from its own stream derived from this seed (see
+           randomStreams()), so results are reproducible. Otherwise, the global numpy
+           random state is used.
+    :param start: (int) the number of the first trial generated, used to select the
+           random streams when adding trials to an existing simulation.
+    :param jobs: (int) the number of threads to generate columns with. Ignored
+           unless ``seed`` is given, since the global random state is shared.
     :return: ndarray or DataFrame with `trials` rows of values for the `paramList`.
     """
-    ranks = genRankValues(len(paramList), trials, corrMat) if corrMat is not None else None
+    count = len(paramList)
+    names = columns or [str(i) for i in range(count)]
+
+    if seed is None:
+        rngs = [None] * count
+        jobs = 1
+    else:
+        rngs = randomStreams(seed, names, start=start)
 
-    samples = np.zeros((trials, len(paramList)))  # @UndefinedVariable
+    # Parameters without ranks are uncorrelated and are simply shuffled.
+    ranks = correlationRanks(corrMat, trials, names, seed=seed, start=start)
+
+    samples = np.zeros((trials, count))  # @UndefinedVariable
 
     skip = skip or []
 
-    for i, param in enumerate(paramList):
+    def genColumn(i):
+        param = paramList[i]
         if param in skip:
-            continue    # process later
+            return    # process later
 
-        values = param.ppf(getPercentiles(trials))  # extract values from the RV for these percentiles
+        rng = rngs[i]
+        values = param.ppf(getPercentiles(trials, rng=rng))  # extract values from the RV for these percentiles
 
-        if corrMat is None:
+        if i not in ranks:
             # Sequence is a special case for which we don't shuffle (and we ignore stratified sampling)
             dataSrc = param.param.dataSrc
             if hasattr(dataSrc, 'distroName') and dataSrc.distroName != 'sequence':
-                np.random.shuffle(values)  # randomize the stratified samples
+                (rng or np.random).shuffle(values)  # randomize the stratified samples
         else:
-            indices = ranks[:, i] - 1  # make them 0-relative
+            indices = ranks[i] - 1     # make them 0-relative
             values = values[indices]   # reorder to respect correlations
 
         samples[:, i] = values
 
+    _mapColumns(genColumn, count, jobs)
+
     return DataFrame(samples, columns=columns) if columns else samples
 
-def lhsAmend(df, rvList, trials, shuffle=True):
+def lhsAmend(df, rvList, trials, shuffle=True, seed=None, start=0):
     """
     Amend the DataFrame with LHS data by adding columns for the given parameters.
     This allows "linked" parameters to refer to values of other parameters.
@@ -149,17 +347,20 @@ def lhsAmend(df, rvList, trials, shuffle=True):
     :param trials: (int) the number of trials to generate for each parameter
     :param shuffle (bool): if True, shuffle the values. Set this to false for
         linked params.
+    :param seed: (int or None) If given, use a random stream for each parameter
+        derived from this seed, as in lhs(). Otherwise use the global random state.
+    :param start: (int) the number of the first trial generated
     :return: none
     """
-    for rv in rvList:
-        values = rv.ppf(getPercentiles(trials))  # extract values from the RV for these percentiles
+    paramNames = [rv.getParameter().getName() for rv in rvList]
+    rngs = randomStreams(seed, paramNames, start=start) if seed is not None else [None] * len(rvList)
+
+    for rv, paramName, rng in zip(rvList, paramNames, rngs):
+        values = rv.ppf(getPercentiles(trials, rng=rng))  # extract values from the RV for these percentiles
         if not isinstance(values, np.ndarray):
             values = values.values               # convert pandas Series if needed
 
         if shuffle:
-            np.random.shuffle(values)            # randomize the stratified samples
+            (rng or np.random).shuffle(values)   # randomize the stratified samples
 
-        param = rv.getParameter()
-        paramName = param.getName()
         df[paramName] = values
-        #continue
@@ -0,0 +1,116 @@
+'''
+Quasi-Monte Carlo sampling of parameter values using scrambled Sobol or
+Halton low-discrepancy sequences, which cover the parameter space more
+evenly than random or Latin Hypercube samples, so statistics converge
+with fewer trials.
+
+Copyright (c) 2023 Richard Plevin. See the file COPYRIGHT.txt for details.
+'''
+import warnings
+
+import numpy as np
+from pandas import DataFrame
+
+from ..log import getLogger
+from .error import PygcamMcsUserError
+from .LHS import correlationRanks
+
+_logger = getLogger(__name__)
+
+QMC_METHODS = ('sobol', 'halton')
+
+# Keep points away from 0 and 1, where the ppf of unbounded distributions is infinite
+_EPSILON = 1e-10
+
+
+def qmcPoints(method, dims, trials, seed=None, start=0):
+    """
+    Generate ``trials`` points of a scrambled low-discrepancy sequence in the
+    unit hypercube of dimension ``dims``.
+
+    :param method: (str) 'sobol' or 'halton'
+    :param dims: (int) the number of dimensions, i.e., of uncorrelated parameters
+    :param trials: (int) the number of points to generate
+    :param seed: (int or None) the seed for the scrambling. The same seed and
+        dimension produce the same sequence.
+    :param start: (int) the index of the first point to return, allowing trials to
+        be added by continuing the sequence used for earlier trials.
+    :return: (numpy.ndarray) an array of shape (trials, dims)
+    """
+    from scipy.stats import qmc
+
+    rng = np.random.default_rng(np.random.SeedSequence(seed) if seed is not None else None)
+
+    if method == 'sobol':
+        sampler = qmc.Sobol(dims, scramble=True, seed=rng)
+
+        # Sobol sequences are balanced only for powers of 2
+        if (start + trials) & (start + trials - 1):
+            _logger.warning(f"Sobol sampling works best when the total number of trials is a power "
+                            f"of 2; {start + trials} trials were requested")
+
+    elif method == 'halton':
+        sampler = qmc.Halton(dims, scramble=True, seed=rng)
+
+    else:
+        raise PygcamMcsUserError(f"Unknown quasi-Monte Carlo method '{method}'")
+
+    if start:
+        sampler.fast_forward(start)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', UserWarning)    # we issue our own warning, above
+        points = sampler.random(trials)
+
+    return np.clip(points, _EPSILON, 1 - _EPSILON)
+
+
+def qmcSample(paramList, trials, method='sobol', corrMat=None, columns=None, skip=None, seed=None, start=0):
+    """
+    Produce an ndarray or DataFrame of 'trials' rows of values for the given parameter
+    list by mapping the points of a scrambled Sobol or Halton sequence through each
+    parameter's ppf function. This is the quasi-Monte Carlo analogue of LHS.lhs(),
+    which it mirrors.
+
+    Parameters that are correlated (per ``corrMat``) are handled as in lhs(): their
+    values, sampled from the low-discrepancy sequence, are reordered using the
+    Iman-Conover method to impose the rank correlations. Those parameters retain their
+    marginal distributions, but not the joint low-discrepancy property.
+
+    :param paramList: (list of rv-like objects representing parameters) Only requirement
+           on parameter objects is that they must implement the ppf function.
+    :param trials: (int) number of trials to generate for each parameter.
+    :param method: (str) 'sobol' or 'halton'
+    :param corrMat: a numpy matrix representing the correlation between the parameters,
+           or None.
+    :param columns: (None or list(str)) Column names to use to return a DataFrame.
+    :param skip: (list of params)) Parameters to process later because they are
+           dependent on other parameter values (e.g., they're "linked").
+    :param seed: (int or None) the seed for scrambling the sequence and for the
+           random streams used for correlation.
+    :param start: (int) the number of the first trial generated. The sequence is
+           continued from this point, so appended trials extend the earlier ones.
+    :return: ndarray or DataFrame with `trials` rows of values for the `paramList`.
+    """
+    count = len(paramList)
+    names = columns or [str(i) for i in range(count)]
+    skip = skip or []
+
+    ranks = correlationRanks(corrMat, trials, names, seed=seed, start=start)
+
+    # Each parameter that isn't linked gets a dimension of the sequence
+    active = [i for i, param in enumerate(paramList) if param not in skip]
+    points = qmcPoints(method, len(active), trials, seed=seed, start=start) if active else None
+
+    samples = np.zeros((trials, count))
+
+    for dim, i in enumerate(active):
+        values = np.asarray(paramList[i].ppf(points[:, dim]), dtype=float)
+
+        if i in ranks:
+            # Impose rank correlation by reordering the sorted values
+            values = np.sort(values)[ranks[i] - 1]
+
+        samples[:, i] = values
+
+    return DataFrame(samples, columns=columns) if columns else samples
@@ -12,7 +12,7 @@ import os
 import pandas as pd
 
 from ..config import getParam, mkdirs, pathjoin, getParamAsBoolean
-from ..constants import TRIAL_XML_NAME, FileVersions
+from ..constants import TRIAL_XML_NAME, TRIAL_XML_CACHE_NAME, FileVersions
 from ..xml_edit import CachedFile
 from ..log import getLogger
 from ..utils import importFromDotSpec
@@ -96,13 +96,14 @@ class XMLCorrelation(XMLWrapper):
     def corrMatrix(cls):
         """
         Generate a correlation matrix representing the correlation definitions,
-        or None if no Correlation definitions were found.
+        or None if no Correlation definitions were found. Rows and columns are
+        indexed by random variable number. The matrix is usually sparse; the
+        LHS code samples each group of correlated variables separately.
         """
         if not cls.instances:
             return None
 
-        params = XMLParameter.getInstances()
-        count  = len(params)
+        count = len(XMLRandomVar.getInstances())
 
         corrMat = np.zeros((count, count), dtype=float)
 
@@ -596,6 +597,7 @@ class XMLParameter(XMLWrapper):
         XMLParameter.saveInstance(self)
 
         self.vars    = []    # the list of XMLVariable or XMLRandomVar wrapping Elements from query
+        self.updatePlan = None  # an UpdatePlan, compiled on demand from self.vars
         self.rv      = None  # stored here only if the distro is shared across Elements from query
         self.query   = None  # XMLQuery instance
         self.dataSrc = None  # A subclass of XMLTrialData instance
@@ -698,12 +700,14 @@ class XMLParameter(XMLWrapper):
         into this parameter's elements.
         """
         instances = cls.getInstances()
+        row = df.loc[trialNum]      # fetch the trial's values once for all parameters
+
         for param in instances:
             if isinstance(param.parent, XMLInputFile) and param.parent.fileType != 'xml':
                 _logger.debug(f"Skipping parameter {param.name} (non-XML file)")
                 continue
 
-            param.updateElements(simId, trialNum, df)
+            param.updateElements(simId, trialNum, df, row=row)
 
     def getMode(self):
         s = self.element.get('mode', 'shared')
@@ -772,11 +776,31 @@ class XMLParameter(XMLWrapper):
 
         # Add these to the list since we might be called for multiple scenarios
         self.vars.extend(vars)
+        self.updatePlan = None      # recompiled on next use
+
+    def getUpdatePlan(self):
+        """
+        Return the UpdatePlan for this parameter's variables, compiling it if needed.
+        """
+        if self.updatePlan is None:
+            if not self.vars:
+                raise PygcamMcsSystemError("Called updateElements with no variables defined in self.vars")
 
-    def updateElements(self, simId, trialNum, df):
+            self.updatePlan = UpdatePlan(self)
+
+        return self.updatePlan
+
+    def updateElements(self, simId, trialNum, df, row=None):
         """
         Update an element's text (assuming it's a number) by multiplying
         it by a factor, adding a delta, or substituting a given value.
+
+        :param simId: (int) the simulation ID
+        :param trialNum: (int) the trial number
+        :param df: (pandas.DataFrame) the trial data, indexed by trial number
+        :param row: (pandas.Series) optional, the row of ``df`` for ``trialNum``,
+            so callers updating many parameters can fetch it once.
+        :return: none
         """
         dataSrc = self.dataSrc
         if dataSrc.isTrialFunc():
@@ -784,36 +808,60 @@ class XMLParameter(XMLWrapper):
             dataSrc.trialFunc(self, simId, trialNum, df, **otherArgs)
             return
 
-        if not self.vars:
-            raise PygcamMcsSystemError("Called updateElements with no variables defined in self.vars")
+        plan = self.getUpdatePlan()
+        randomValue = df.loc[trialNum, self.getName()] if row is None else row[self.getName()]
+        plan.apply(randomValue)
 
-        isFactor = dataSrc.isFactor()
-        isDelta  = dataSrc.isDelta()
 
-        # Update all elements referenced by our list of XMLVariables (or of their subclass, XMLRandomVar)
-        for var in self.vars:
-            if var.getElement() is None:    # Skip shared RVs, which don't point to an XML element
-                _logger.debug(f"Skipping shared element for {var}")
-                continue
+class UpdatePlan(object):
+    """
+    Precompiled form of the element updates performed by XMLParameter.updateElements():
+    the elements to set, an array of their original values, the operation to apply,
+    and the bounds to enforce. Applying a trial's value is then a single vectorized
+    computation followed by a loop that assigns element text.
+    """
+    def __init__(self, param):
+        dataSrc = param.getDataSrc()
+
+        # Skip shared RVs, which don't point to an XML element
+        vars = [var for var in param.getVars() if var.getElement() is not None]
+
+        self.elements = [var.getElement() for var in vars]
 
-            originalValue = var.getFloatValue()  # apply factor and delta to cached, original value
+        # apply factor and delta to cached, original value
+        self.originalValues = np.array([var.getFloatValue() for var in vars], dtype=float)
 
-            varName = var.getParameter().getName()
-            randomValue = df.loc[trialNum, varName]
+        self.isFactor = dataSrc.isFactor()
+        self.isDelta  = dataSrc.isDelta()
 
-            newValue = randomValue * originalValue if isFactor else \
-                ((randomValue + originalValue) if isDelta else randomValue)
+        modDict = getattr(dataSrc, 'modDict', None)
+        self.lowbound  = modDict['lowbound']  if modDict else None
+        self.highbound = modDict['highbound'] if modDict else None
 
-            if hasattr(dataSrc, 'modDict'):
-                modDict = dataSrc.modDict
-                if modDict['lowbound'] is not None:
-                    newValue = max(newValue, modDict['lowbound'])
+    def apply(self, randomValue):
+        """
+        Set the text of each element to the value computed from ``randomValue`` and
+        the element's original value.
+
+        :param randomValue: (float) the parameter's value for the current trial
+        :return: none
+        """
+        if self.isFactor:
+            values = self.originalValues * randomValue
+        elif self.isDelta:
+            values = self.originalValues + randomValue
+        else:
+            values = np.full(len(self.elements), randomValue, dtype=float)
 
-                if modDict['highbound'] is not None:
-                    newValue = min(newValue, modDict['highbound'])
+        if self.lowbound is not None:
+            values = np.maximum(values, self.lowbound)
 
-            # Set the value in the cached tree so it can be written to trial's local-xml dir
-            var.setValue(newValue)
+        if self.highbound is not None:
+            values = np.minimum(values, self.highbound)
+
+        # Set the value in the cached tree so it can be written to trial's local-xml dir
+        for elt, value in zip(self.elements, values.tolist()):
+            elt.text = str(value)
 
 
 class XMLRelFile(XMLFile):
@@ -837,9 +885,75 @@ class XMLRelFile(XMLFile):
         abs_path = pathjoin(mapper.sandbox_exe_dir, rel_path, abspath=True)
         super().__init__(abs_path)
 
+        self.modifiedElements = None    # computed on demand by trialDigest()
+
     def getRelPath(self):
         return self.relPath
 
+    def _findModifiedElements(self):
+        """
+        Return the list of elements in this file's tree that are set by the parameters
+        of our XMLInputFile, or None if the modifications can't be enumerated because
+        a trial function or write function may edit arbitrary elements.
+        """
+        inputFile = self.inputFile
+        if inputFile.writeFuncs:
+            return None
+
+        root = self.tree.getroot()
+        elements = []
+        for param in inputFile.parameters.values():
+            if not param.isActive():
+                continue
+
+            if param.dataSrc.isTrialFunc():
+                return None
+
+            elements.extend(elt for elt in (var.getElement() for var in param.getVars())
+                            if elt is not None and elt.getroottree().getroot() is root)
+
+        return elements
+
+    def trialDigest(self, compact=False):
+        """
+        Compute a digest that identifies the bytes that would be written for the
+        current trial: the source file's identity plus the text of every element
+        that trial data can modify. Trials with the same digest produce identical
+        files, so the file need be serialized only once.
+
+        :param compact: (bool) whether the file will be written without pretty-printing
+        :return: (str) hex digest, or None if the modified elements can't be enumerated
+        """
+        import hashlib
+
+        if self.modifiedElements is None:
+            self.modifiedElements = self._findModifiedElements()
+
+            if self.modifiedElements is None:
+                self.modifiedElements = False   # don't try again
+
+        if self.modifiedElements is False:
+            return None
+
+        st = os.stat(self.getAbsPath())
+        h = hashlib.sha1(f"{self.getAbsPath()}|{st.st_size}|{st.st_mtime}|{compact}".encode('utf-8'))
+        for elt in self.modifiedElements:
+            h.update(elt.text.encode('utf-8'))
+            h.update(b'\0')
+
+        return h.hexdigest()
+
+    def writeTrialFile(self, path, compact=False):
+        """
+        Write the (modified) XML tree to ``path``.
+
+        :param path: (str) the pathname to write
+        :param compact: (bool) if True, don't pretty-print the file, which is faster
+            and produces a smaller file that is equivalent as far as GCAM is concerned.
+        :return: none
+        """
+        self.tree.write(path, xml_declaration=True, pretty_print=not compact)
+
     def getAbsPath(self):
         return self.getFilename()
 
@@ -993,6 +1107,9 @@ class XMLInputFile(XMLWrapper):
                 tree = xmlFile.getTree()
                 param.runQuery(tree)        # accumulates elements from multiple files
 
+            if param.getVars() and not param.getDataSrc().isTrialFunc():
+                param.getUpdatePlan()       # compile once rather than on each trial
+
     def generateRandomVars(self):
         """
         Called during 'gensim' to generate XMLRandomVars, save variable names to
@@ -1031,12 +1148,64 @@ class XMLInputFile(XMLWrapper):
                 raise PygcamMcsUserError(f"Call to user WriteFunc '{fn}' failed: {e}")
 
 
+def _writeOrLinkTrialFile(xmlFile, abs_path, cached_path, compact):
+    """
+    Hard link ``abs_path`` to ``cached_path``, first writing ``xmlFile`` to
+    ``cached_path`` if no trial has yet produced a file with the same content.
+    Falls back to writing ``abs_path`` directly if links aren't supported.
+    """
+    if os.path.exists(cached_path):
+        _logger.info(f"Linking {abs_path} to identical {cached_path}")
+    else:
+        # Write to a temp file and rename so concurrent trials never see a partial file
+        tmp_path = f"{cached_path}.{os.getpid()}.tmp"
+        _logger.info(f"Writing {cached_path}")
+        xmlFile.writeTrialFile(tmp_path, compact=compact)
+        os.replace(tmp_path, cached_path)
+
+    try:
+        os.link(cached_path, abs_path)
+    except OSError as e:
+        _logger.debug(f"Can't link {abs_path} to {cached_path}: {e}")
+        _logger.info(f"Writing {abs_path}")
+        xmlFile.writeTrialFile(abs_path, compact=compact)
+
+
+def pruneTrialXmlCache(mapper):
+    """
+    Remove the files in the simulation's trial-xml-cache directory (see MCS.TrialXmlReuse)
+    that are no longer linked from any trial's trial-xml directory, e.g., because the
+    trials were re-run or their directories were removed. Trials being set up while
+    this runs fall back to writing their files directly.
+
+    :param mapper: (SimFileMapper) the mapper for the simulation
+    :return: (int) the number of files removed
+    """
+    cache_dir = pathjoin(mapper.sim_dir, TRIAL_XML_CACHE_NAME)
+    if not os.path.isdir(cache_dir):
+        return 0
+
+    count = 0
+    for entry in os.scandir(cache_dir):
+        try:
+            if entry.is_file(follow_symlinks=False) and entry.stat(follow_symlinks=False).st_nlink <= 1:
+                os.remove(entry.path)
+                count += 1
+        except OSError as e:
+            _logger.debug(f"Can't remove {entry.path}: {e}")
+
+    if count:
+        _logger.info(f"Removed {count} unused files from {cache_dir}")
+
+    return count
+
+
 class XMLParameterFile(XMLFile):
     """
     Represents the overall parameters.xml file.
     """
     def __init__(self, filename):
-        super().__init__(filename, schemaPath='mcs/etc/parameter-schema.xsd')
+        super().__init__(filename, schemaPath='mcs/etc/parameter-schema.xsd', useCache=True)
 
         # XMLInputFiles keyed by scenario component name
         inputFiles = self.inputFiles = OrderedDict()
@@ -1087,6 +1256,10 @@ class XMLParameterFile(XMLFile):
 
         xmlFiles = XMLInputFile.getModifiedXMLFiles()
 
+        compact = getParamAsBoolean('MCS.TrialXmlCompact')
+        reuse_dir = (pathjoin(mapper.sim_dir, TRIAL_XML_CACHE_NAME, create=True)
+                     if getParamAsBoolean('MCS.TrialXmlReuse') else None)
+
         for xmlFile in xmlFiles:
             rel_path = xmlFile.getRelPath()
             abs_path = pathjoin(scen_trial_dir, os.path.basename(rel_path), normpath=True)
@@ -1096,12 +1269,16 @@ class XMLParameterFile(XMLFile):
             inputFile = xmlFile.inputFile
             inputFile.callFileFunctions(xmlFile, trial_dir)
 
-            if os.path.exists(abs_path):
+            if os.path.lexists(abs_path):
                 # remove it to avoid writing through a symlink to the original file
                 os.unlink(abs_path)
 
-            _logger.info(f"Writing {abs_path}")
-            xmlFile.tree.write(abs_path, xml_declaration=True, pretty_print=True)
+            digest = reuse_dir and xmlFile.trialDigest(compact=compact)
+            if digest:
+                _writeOrLinkTrialFile(xmlFile, abs_path, pathjoin(reuse_dir, digest + '.xml'), compact)
+            else:
+                _logger.info(f"Writing {abs_path}")
+                xmlFile.writeTrialFile(abs_path, compact=compact)
 
             # update config file to reference the new path
             comp_name = inputFile.getComponentName()
@@ -1121,6 +1298,25 @@ class XMLParameterFile(XMLFile):
         for obj in self.inputFiles.values():
             obj.dump()
 
+def loadTrialData(mapper):
+    """
+    Read the trial data for the simulation and add columns for linked
+    parameters that aren't already present.
+
+    :param mapper: (SimFileMapper) the mapper for the current simulation
+    :return: (pandas.DataFrame) the trial data, indexed by trial number
+    """
+    df = mapper.read_trial_data_file()
+    columns = df.columns
+
+    # add data for linked columns if not present
+    linkPairs = XMLParameter.getParameterLinks()
+    for linkName, dataCol in linkPairs:
+        if linkName not in columns:
+            df[linkName] = df[dataCol]
+
+    return df
+
 def decache():
     '''
     Clear all instance caches so a new run can begin cleanly
@@ -0,0 +1,239 @@
+'''
+Running statistics of simulation results that are updated incrementally as
+batches of trial results are saved, so statistics and sensitivity measures can
+be reported mid-simulation at a cost proportional to the number of new trials.
+
+Batches are merged using the pairwise update of Chan, Golub, and LeVeque (1979)
+for means, sums of squared deviations, and co-moments. The contribution of a trial
+can't be removed exactly, so when trials are re-run, the accumulator is rebuilt
+from all saved results.
+
+Copyright (c) 2023 Richard Plevin. See the file COPYRIGHT.txt for details.
+'''
+import base64
+import json
+
+import numpy as np
+from scipy.stats import norm
+
+from ..log import getLogger
+
+_logger = getLogger(__name__)
+
+
+def _batchMoments(values):
+    """
+    Return the count, column means, and column sums of squared deviations of ``values``.
+    """
+    mean = values.mean(axis=0)
+    dev  = values - mean
+    return len(values), mean, (dev ** 2).sum(axis=0), dev
+
+
+class ResultAccumulator(object):
+    """
+    Running statistics for one output of one experiment: the output's mean and
+    variance, its co-moments with each input (for Pearson correlation), and its
+    co-moments with the inputs on a rank scale (for approximate Spearman rank
+    correlation).
+
+    For the rank-based measure, inputs are represented by their percentile rank
+    among all of the simulation's trials, which is known in advance. The rank of
+    an output value among all trials is not known until the simulation ends, so
+    it is approximated by its normal CDF score using the running mean and standard
+    deviation prior to each batch. Exact rank correlations are computed by the
+    "analyze" sub-command.
+    """
+    def __init__(self, inputNames):
+        self.inputNames = list(inputNames)
+        k = len(self.inputNames)
+
+        self.count = 0
+        self.included = np.zeros(0, dtype=bool)     # indexed by trialNum, so re-runs are detected
+
+        # Columns are: output, output score, inputs, input ranks
+        self.mean = np.zeros(2 + 2 * k)
+        self.m2   = np.zeros(2 + 2 * k)
+
+        # Co-moments of output with inputs, and output score with input ranks
+        self.coM2 = np.zeros(2 * k)
+
+    def _scores(self, values):
+        # Approximate the percentile rank of output values using the moments prior to this batch
+        if self.count > 1 and self.m2[0] > 0:
+            mean, std = self.mean[0], np.sqrt(self.m2[0] / self.count)
+        else:
+            mean, std = values.mean(), values.std()
+
+        return norm.cdf((values - mean) / std) if std > 0 else np.full(len(values), 0.5)
+
+    def includes(self, trialNums):
+        """
+        :param trialNums: (sequence of int) trial numbers
+        :return: (numpy.ndarray of bool) whether the result of each trial has been added
+        """
+        trialNums = np.asarray(trialNums, dtype=int)
+        found = np.zeros(len(trialNums), dtype=bool)
+        known = trialNums < len(self.included)
+        found[known] = self.included[trialNums[known]]
+        return found
+
+    def update(self, trialNums, values, inputs, inputRanks):
+        """
+        Add a batch of results to the running statistics. Results of trials that
+        have already been added are skipped; see updateAccumulators().
+
+        :param trialNums: (sequence of int) the trial numbers of the results
+        :param values: (sequence of float) the output values, per trial
+        :param inputs: (pandas.DataFrame) input values indexed by trialNum, with
+            a column for each name in ``self.inputNames``
+        :param inputRanks: (pandas.DataFrame) the percentile rank of each input value
+            among all trials, in the same form as ``inputs``
+        :return: (int) the number of results added
+        """
+        trialNums = np.asarray(trialNums, dtype=int)
+        values = np.asarray(values, dtype=float)
+
+        keep = ~self.includes(trialNums) & ~np.isnan(values)
+        if not keep.any():
+            return 0
+
+        trialNums, values = trialNums[keep], values[keep]
+        k = len(self.inputNames)
+
+        batch = np.empty((len(values), 2 + 2 * k))
+        batch[:, 0] = values
+        batch[:, 1] = self._scores(values)
+        batch[:, 2:2 + k] = inputs.loc[trialNums, self.inputNames].values
+        batch[:, 2 + k:]  = inputRanks.loc[trialNums, self.inputNames].values
+
+        m, bMean, bM2, dev = _batchMoments(batch)
+        bCoM2 = np.concatenate([dev[:, 0] @ dev[:, 2:2 + k], dev[:, 1] @ dev[:, 2 + k:]])
+
+        n = self.count
+        total = n + m
+        delta = bMean - self.mean
+
+        # co-moments use the deltas of the means prior to the update
+        deltaOut = np.repeat(delta[:2], k)
+        self.coM2 += bCoM2 + deltaOut * delta[2:] * n * m / total
+
+        self.m2   += bM2 + delta ** 2 * n * m / total
+        self.mean += delta * m / total
+        self.count = total
+
+        size = trialNums.max() + 1
+        if size > len(self.included):
+            self.included = np.concatenate([self.included, np.zeros(size - len(self.included), dtype=bool)])
+        self.included[trialNums] = True
+        return m
+
+    def stats(self):
+        """
+        :return: (dict) with keys 'count', 'mean', 'std' (the sample standard deviation)
+        """
+        n = self.count
+        std = np.sqrt(self.m2[0] / (n - 1)) if n > 1 else np.nan
+        return {'count': n, 'mean': self.mean[0] if n else np.nan, 'std': std}
+
+    def correlations(self):
+        """
+        :return: (pandas.DataFrame) indexed by input name, with columns 'pearson' and
+            'spearman', the latter approximated as described in the class docstring.
+        """
+        import pandas as pd
+
+        k = len(self.inputNames)
+        m2 = self.m2
+        with np.errstate(divide='ignore', invalid='ignore'):
+            pearson  = self.coM2[:k] / np.sqrt(m2[0] * m2[2:2 + k])
+            spearman = self.coM2[k:] / np.sqrt(m2[1] * m2[2 + k:])
+
+        return pd.DataFrame({'pearson': pearson, 'spearman': spearman}, index=self.inputNames)
+
+    def toJSON(self):
+        # The included trials are stored as a bitmap to keep the state compact
+        bitmap = base64.b64encode(np.packbits(self.included)).decode('ascii')
+        return json.dumps({'inputNames': self.inputNames,
+                           'count'     : self.count,
+                           'numTrials' : len(self.included),
+                           'trials'    : bitmap,
+                           'mean'      : self.mean.tolist(),
+                           'm2'        : self.m2.tolist(),
+                           'coM2'      : self.coM2.tolist()})
+
+    @classmethod
+    def fromJSON(cls, text):
+        d = json.loads(text)
+        obj = cls(d['inputNames'])
+        obj.count  = d['count']
+        bits = np.frombuffer(base64.b64decode(d['trials']), dtype=np.uint8)
+        obj.included = np.unpackbits(bits, count=d['numTrials']).astype(bool)
+        obj.mean   = np.array(d['mean'])
+        obj.m2     = np.array(d['m2'])
+        obj.coM2   = np.array(d['coM2'])
+        return obj
+
+
+def updateAccumulators(db, simId, batches, inputs, inputRanks):
+    """
+    Update the accumulators stored in the database with new results, which must
+    already have been saved. An accumulator is rebuilt from all saved results if
+    none has been saved or if any of the trials were re-run, since the results
+    they replace can't be removed from the running statistics.
+
+    :param db: (GcamDatabase) the database
+    :param simId: (int) the simulation ID
+    :param batches: (dict) lists of (trialNum, value) keyed by (expName, outputName)
+    :param inputs: (pandas.DataFrame) input values indexed by trialNum
+    :param inputRanks: (pandas.DataFrame) percentile ranks of ``inputs`` among all trials
+    :return: none
+    """
+    for (expName, outputName), pairs in batches.items():
+        state = db.getAccumulatorState(simId, expName, outputName)
+        acc = ResultAccumulator.fromJSON(state) if state else None
+
+        trialNums, values = zip(*pairs)
+        if acc is None or acc.includes(trialNums).any():
+            _buildAccumulator(db, simId, expName, outputName, inputs, inputRanks)
+
+        elif acc.update(trialNums, values, inputs, inputRanks):
+            db.saveAccumulatorState(simId, expName, outputName, acc.toJSON())
+
+
+def _buildAccumulator(db, simId, expName, outputName, inputs, inputRanks):
+    """
+    Build the accumulator for the given sim, exp, and output from all saved
+    results, and save it.
+
+    :return: (ResultAccumulator or None) None if there are no results
+    """
+    outputs = db.getOutValuesWide(simId, expName, [outputName])
+    if outputs is None or outputName not in outputs.columns:
+        return None
+
+    _logger.info(f"Building accumulator for simId={simId}, expName={expName}, output={outputName}")
+    acc = ResultAccumulator(inputs.columns)
+    values = outputs[outputName].reindex(inputs.index).dropna()
+    acc.update(values.index, values.values, inputs, inputRanks)
+    db.saveAccumulatorState(simId, expName, outputName, acc.toJSON())
+    return acc
+
+
+def getAccumulator(db, simId, expName, outputName):
+    """
+    Return the accumulator for the given sim, exp, and output. If none has been
+    saved, e.g., for results saved before accumulators were used, it is built
+    from all saved results and saved.
+
+    :return: (ResultAccumulator or None) None if there are no results
+    """
+    state = db.getAccumulatorState(simId, expName, outputName)
+    if state:
+        return ResultAccumulator.fromJSON(state)
+
+    inputs = db.getParameterValues2(simId)
+    if inputs is None:
+        return None
+
+    return _buildAccumulator(db, simId, expName, outputName, inputs, inputs.rank(pct=True))
@@ -361,6 +361,40 @@ def normalizeDF(df):
     df = (df - dfMin) / (df.max() - dfMin)
     return df
 
+def _standardizedRanks(df):
+    """
+    Rank each column of ``df`` (averaging ties, as in Spearman correlation) and
+    return the ranks centered and scaled to unit norm, as an ndarray.
+    """
+    ranks = df.rank().to_numpy(dtype=float, copy=True)    # values may be read-only with copy-on-write
+    ranks -= ranks.mean(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return ranks / np.sqrt((ranks ** 2).sum(axis=0))
+
+def rankCorrelationMatrix(inputs, outputs):
+    '''
+    Compute the Spearman rank correlation between each input and each output,
+    ranking each input and output column once and computing all correlations
+    with a single matrix product.
+
+    :param inputs: (pandas.DataFrame) input values for each parameter and trial
+    :param outputs: (pandas.DataFrame or pandas.Series) values of one or more model
+        results, per trial, with the same index as ``inputs``
+    :return: (pandas.DataFrame) rank correlations indexed by input name, with a
+        column for each output.
+    '''
+    if isinstance(outputs, pd.Series):
+        outputs = outputs.to_frame()
+
+    # use only trials with all values
+    outputs = outputs.reindex(inputs.index)
+    complete = inputs.notna().all(axis=1) & outputs.notna().all(axis=1)
+    if not complete.all():
+        inputs, outputs = inputs[complete], outputs[complete]
+
+    corr = _standardizedRanks(inputs).T @ _standardizedRanks(outputs)
+    return pd.DataFrame(corr, index=inputs.columns, columns=outputs.columns)
+
 def spearmanCorrelation(inputs, results):
     '''
     Compute Spearman ranked correlation and normalized Spearman ranked
@@ -371,11 +405,72 @@ def spearmanCorrelation(inputs, results):
     :param results: (pandas.Series) values for one model result, per trial
     :return: (pandas.Series) rank correlations of each input to the output vector.
     '''
-    corrList = [results.corr(inputs[col], method='spearman') for col in inputs.columns]
-    spearman = pd.Series(data=corrList, index=inputs.columns, name='spearman')
+    corr = rankCorrelationMatrix(inputs, results.rename('spearman'))
+    return corr['spearman']
+
+def cumulativeRankCorrelation(inputs, results, counts):
+    '''
+    Compute the rank correlation between each input and the results using the
+    first N trials, for each N in ``counts``, to show how the correlations
+    converge as trials are added. Values are ranked once, over all trials, and
+    the correlations for all counts are computed from cumulative sums, so the
+    values for N < len(results) approximate the Spearman correlation of the
+    first N trials, and the final value is exact.
 
-    return spearman
+    :param inputs: (pandas.DataFrame) input values for each parameter and trial
+    :param results: (pandas.Series) values for one model result, per trial
+    :param counts: (list of int) numbers of trials at which to compute correlations
+    :return: (pandas.DataFrame) with columns "paramName", "spearman", "abs",
+        and "count", with rows for each parameter at each count.
+    '''
+    x = inputs.rank().values
+    y = results.rank().values[:, np.newaxis]
+
+    # cumulative sums at each of the requested counts
+    idx = np.asarray(counts) - 1
+    n   = np.asarray(counts, dtype=float)[:, np.newaxis]
+    sx  = np.cumsum(x, axis=0)[idx]
+    sy  = np.cumsum(y, axis=0)[idx]
+    sxx = np.cumsum(x * x, axis=0)[idx]
+    syy = np.cumsum(y * y, axis=0)[idx]
+    sxy = np.cumsum(x * y, axis=0)[idx]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        corr = (n * sxy - sx * sy) / np.sqrt((n * sxx - sx ** 2) * (n * syy - sy ** 2))
+
+    numParams = inputs.shape[1]
+    df = pd.DataFrame({'paramName': np.tile(inputs.columns, len(counts)),
+                       'spearman' : corr.ravel(),
+                       'count'    : np.repeat(counts, numParams)})
+    df['abs'] = df.spearman.abs()
+    return df[['paramName', 'spearman', 'abs', 'count']]
+
+
+def printRunningStatistics(simId, expList, resultList, maxVars=None):
+    '''
+    Print the statistics and correlations with inputs maintained incrementally
+    in the database for each of the given experiments and results.
+    '''
+    from .accumulator import getAccumulator
 
+    db = getDatabase()
+
+    for expName in expList:
+        for resultName in resultList:
+            acc = getAccumulator(db, simId, expName, resultName)
+            if acc is None:
+                _logger.warning(f"No results for simId={simId}, expName={expName}, resultName={resultName}")
+                continue
+
+            stats = acc.stats()
+            corr = acc.correlations()
+            corr = corr.loc[corr.spearman.abs().sort_values(ascending=False).index]
+            if maxVars:
+                corr = corr.head(maxVars)
+
+            print(f"\n{resultName} ({expName}): count: {stats['count']} mean: {stats['mean']:.4g} "
+                  f"stdev: {stats['std']:.4g}")
+            print(corr.round(4).to_string())
 
 def plotSensitivityResults(varName, data, filename=None, extra=None, maxVars=None, printIt=True):
     '''
@@ -644,6 +739,61 @@ def saveForEMA(simId, expNames, resultNames, inputDF, filename):
 
     print("Results saved successfully to {}".format(filename))
 
+def exportSobolIndices(simId, expList, resultList, designFile, exportFile, bootstrap=1000, sep=','):
+    """
+    Compute first-order and total-effect Sobol indices, with bootstrap confidence
+    intervals, for the results of a simulation generated with "gensim --method saltelli",
+    and save them to a CSV file. All results for each experiment are read from the
+    database in one query and the indices for all results are computed together.
+    Blocks of trials in the design that are missing any result are dropped.
+
+    :param simId: (int) the id of the simulation
+    :param expList: (list of str) the names of the experiments to analyze
+    :param resultList: (list of str) the names of the results to analyze, or None for all
+    :param designFile: (str) the file written by gensim describing the design
+    :param exportFile: (str) the CSV file to write
+    :param bootstrap: (int) the number of bootstrap resamples
+    :param sep: (str) the CSV separator
+    :return: (pandas.DataFrame) the data written to ``exportFile``
+    """
+    from .sensitivity import readDesignInfo, sobolIndicesDF
+
+    baseSamples, paramNames = readDesignInfo(designFile)
+    blockSize = len(paramNames) + 2
+
+    db = getDatabase()
+    dfs = []
+
+    for expName in expList:
+        resultDF = db.getOutValuesWide(simId, expName, resultList)
+        if resultDF is None:
+            _logger.warning(f'No results were found for sim {simId}, experiment {expName}')
+            continue
+
+        resultDF = resultDF.reindex(range(baseSamples * blockSize))
+        values = resultDF.values.reshape(baseSamples, blockSize, -1)
+
+        complete = ~np.isnan(values).any(axis=(1, 2))
+        if not complete.all():
+            _logger.warning(f"Dropping {np.sum(~complete)} of {baseSamples} blocks of trials with missing results "
+                            f"for experiment {expName}")
+
+        values = values[complete].reshape(-1, values.shape[2])
+        if not len(values):
+            raise PygcamMcsUserError(f"No complete blocks of trials for experiment {expName}")
+
+        df = sobolIndicesDF(values, paramNames, list(resultDF.columns), bootstrap=bootstrap)
+        df.insert(0, 'expName', expName)
+        dfs.append(df)
+
+    if not dfs:
+        raise PygcamMcsUserError(f'No results were found for sim {simId}')
+
+    df = pd.concat(dfs, ignore_index=True)
+    _logger.info(f"Exporting Sobol indices to '{exportFile}'")
+    df.to_csv(exportFile, sep=sep, index=False)
+    return df
+
 def getCorrDF(inputs, output):
     '''
     Generate a DataFrame with rank correlations between each input vector
@@ -1072,10 +1222,11 @@ def analyzeSimulation(args):
     exportAll   = args.exportAll
     minimum     = args.min
     maximum     = args.max
+    sobolFile   = args.sobol
 
     # Determine which inputs are required for each option
     requireInputs   = (exportAll or exportEMA or groups or importance or plotInputs or inputsFile)
-    requireScenario = (exportAll or exportEMA or groups or importance or resultFile or plotHist or convergence or stats)
+    requireScenario = (exportAll or exportEMA or sobolFile or groups or importance or resultFile or plotHist or convergence or stats)
     requireResult   = (groups or importance or resultFile or plotHist or convergence or stats)
 
     if requireResult and not resultName:
@@ -1120,6 +1271,10 @@ def analyzeSimulation(args):
         resultList = resultName.split(',')
         saveForEMA(simId, expList, resultList, inputDF, exportEMA)
 
+    if sobolFile:
+        resultList = resultName.split(',') if resultName else None
+        exportSobolIndices(simId, expList, resultList, args.designFile, sobolFile, bootstrap=args.bootstrap)
+
     if not (requireScenario and requireResult):
         return
 
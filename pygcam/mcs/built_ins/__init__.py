@@ -4,6 +4,7 @@ from .cluster_plugin import ClusterCommand
 from .defresults_plugin import DefResultsCommand
 from .delsim_plugin import DelSimCommand
 from .discrete_plugin import DiscreteCommand
+from .emulate_plugin import EmulateCommand
 from .engine_plugin import EngineCommand
 from .explore_plugin import ExploreCommand
 from .gensim_plugin import GensimCommand
@@ -15,6 +16,6 @@ from .runsim_plugin import RunSimCommand
 
 MCSBuiltins = [AddExpCommand, AnalyzeCommand, ClusterCommand,
                DelSimCommand, DefResultsCommand, DiscreteCommand,
-               EngineCommand, ExploreCommand, GensimCommand,
+               EmulateCommand, EngineCommand, ExploreCommand, GensimCommand,
                IppSetupCommand, IterateCommand, MoiraiCommand,
                ParallelPlotCommand, RunSimCommand]
@@ -98,12 +98,29 @@ def driver(args, tool):
         # if doing timeseries plot, none of the other options are relevant
         return
 
+    if args.running:
+        from ..analysis import printRunningStatistics
+
+        if not (args.expName and args.resultName):
+            raise PygcamMcsUserError("expName and resultName must be specified with --running")
+
+        printRunningStatistics(args.simId, args.expName.split(','), args.resultName.split(','),
+                               maxVars=args.maxVars)
+        return
+
     if not (args.exportInputs or args.resultFile or args.plot or args.importance or
             args.groups or args.plotInputs or args.stats or args.convergence or
-            args.exportEMA, args.exportAll):
-        msg = 'Must specify at least one of: --export, --resultFile, --plot, --importance, --groups, --distros, --stats, --convergence, --exportEMA, --exportAll'
+            args.exportEMA or args.exportAll or args.sobol):
+        msg = 'Must specify at least one of: --export, --resultFile, --plot, --importance, --groups, --distros, --stats, --convergence, --exportEMA, --exportAll, --sobol'
         raise PygcamMcsUserError(msg)
 
+    if args.sobol:
+        from ...config import getParam
+        from ..sim_file_mapper import SimFileMapper
+
+        mapper = SimFileMapper(project_name=getParam('GCAM.ProjectName'), sim_id=args.simId)
+        args.designFile = mapper.saltelli_file
+
     analyzeSimulation(args)
 
 
@@ -116,6 +133,10 @@ class AnalyzeCommand(McsSubcommandABC):
     def addArgs(self, parser):
         from ..analysis import DEFAULT_MAX_TORNADO_VARS
 
+        parser.add_argument('-b', '--bootstrap', type=int, default=1000,
+                            help=clean_help('''The number of bootstrap resamples used to compute confidence
+                            intervals for --sobol. Default is 1000.'''))
+
         parser.add_argument('-c', '--convergence', action='store_true', default=False,
                             help=clean_help('Generate convergence plots for mean, std dev, skewness, and 95%% coverage interval.'))
 
@@ -176,12 +197,26 @@ class AnalyzeCommand(McsSubcommandABC):
         parser.add_argument('-r', '--resultName', type=str, default=None,
                             help=clean_help('The name of the result variable to analyze.'))
 
+        parser.add_argument('--running', action='store_true',
+                            help=clean_help('''Print the running statistics of the results named by -r (--resultName),
+                            for the experiments named by -e (--expName), with the Pearson and approximate Spearman
+                            correlation of each with the inputs. These are updated by runsim as results are saved
+                            (see config variable MCS.UpdateAccumulators), so they're quick to report while a 
+                            simulation is running. Both -e and -r may be comma-delimited lists.'''))
+
         parser.add_argument('-s', '--simId', type=int, default=1,
                             help=clean_help('The id of the simulation'))
 
         parser.add_argument('-S', '--stats', action='store_true', default=False,
                             help=clean_help('Print mean, median, max, min, std dev, skewness, and 95%% coverage interval.'))
 
+        parser.add_argument('--sobol', type=str, default=None, metavar='CSVFILE',
+                            help=clean_help('''Compute first-order and total-effect Sobol sensitivity indices,
+                            with 95%% bootstrap confidence intervals, for a simulation generated using "gensim
+                            --method saltelli", and save them to the given CSV file. The -e (--expName) and -r
+                            (--resultName) flags can hold comma-delimited lists of experiments and results, 
+                            respectively. If -r is not given, all results are analyzed.'''))
+
         parser.add_argument('-t', '--timeseries', action='store_true',
                             help=clean_help('Plot a timeseries distribution'))
 
@@ -247,8 +247,9 @@ class DiscreteDist(object):
         """
         Takes in a list of (value, probability) tuples to initiate.
         Tolerance allows for distributions with a sum of probabilities close but
-        not equal to 1 due to rounding errors. precision determines how many entries
-        are in the fast ppf list; ppf values will be accurate within 1/precision
+        not equal to 1 due to rounding errors. The ppf is computed exactly from
+        a table of cumulative probabilities; precision is retained only for
+        compatibility.
         """
         import numpy as np
 
@@ -259,18 +260,11 @@ class DiscreteDist(object):
         self.probList = sorted(probList)
         self.values = [x[0] for x in self.probList]
         self.probs = [x[1] / totalProb for x in self.probList]
-
-        # Initialize the lookup table for fast ppf
         self.precision = precision
-        self.fastPPF = np.zeros(precision)
 
-        index = 0
-        cumProb = 0
-        for i in range(precision):
-            if i / float(precision) > self.probs[index] + cumProb:
-                cumProb += self.probs[index]
-                index += 1
-            self.fastPPF[i] = self.values[index]
+        # Lookup tables for ppf
+        self._valueArray = np.array(self.values)
+        self._cdf = np.cumsum(self.probs)
 
     def __eq__(self, comp):
         return self.values == comp.values and self.probs == comp.probs and self.precision == comp.precision
@@ -285,13 +279,15 @@ class DiscreteDist(object):
         The percentiles parameter must be 'array-like' to match (some) of the
         behavior of scipy.stats.rv_continuous.ppf
         """
-        from functools import reduce
+        import numpy as np
 
-        if not reduce(lambda x, y: x and 0 < y < 1, percentiles):
+        q = np.asarray(percentiles)
+        if not np.all((q > 0) & (q < 1)):
             raise DistributionSpecError('Percentiles must all be > 0 and < 1')
 
-        return [self.fastPPF[int(x * self.precision)] for x in percentiles]
-        #return map(lambda x: self.fastPPF[int(x * self.precision)], percentiles)
+        # index of the first value whose cumulative probability is >= q
+        indices = np.searchsorted(self._cdf, q, side='left')
+        return self._valueArray[np.minimum(indices, len(self._cdf) - 1)]
 
     def rvs(self, n=1):
         """Returns one or more random values, according to the RV's distribution."""
@@ -0,0 +1,136 @@
+# Copyright (c) 2023  Richard Plevin
+# See the https://opensource.org/licenses/MIT for license details.
+
+from ...log import getLogger
+from .McsSubcommandABC import McsSubcommandABC, clean_help
+
+_logger = getLogger(__name__)
+
+def driver(args):
+    """
+    Train emulators of simulation results, report their cross-validated error, and
+    use them to produce synthetic output distributions and sensitivity indices.
+    """
+    import time
+    import pandas as pd
+    from ...config import getParam
+    from ..analysis import printStats
+    from ..database import getDatabase
+    from ..emulator import Emulator, ParameterSampler, emulatorSobolIndices
+    from ..error import PygcamMcsUserError
+    from ..sim_file_mapper import SimFileMapper
+
+    simId = args.simId
+    expName = args.expName
+    resultNames = args.resultName.split(',')
+
+    db = getDatabase()
+    inputs = db.getParameterValues2(simId)
+    outputs = db.getOutValuesWide(simId, expName, resultNames)
+
+    if inputs is None or outputs is None:
+        raise PygcamMcsUserError(f"No trial data or results found for simId={simId}, expName={expName}")
+
+    missing = set(resultNames) - set(outputs.columns)
+    if missing:
+        raise PygcamMcsUserError(f"No results found for {sorted(missing)} in simId={simId}, expName={expName}")
+
+    emulators = {}
+    for name in resultNames:
+        start = time.time()
+        emulator = Emulator(kind=args.model, seed=args.seed)
+
+        if args.folds > 1:
+            err = emulator.crossValidate(inputs, outputs[name], folds=args.folds)
+            print(f"{name}: {args.folds}-fold cross-validation: R^2={err['r2']:.4f} RMSE={err['rmse']:.4g} "
+                  f"RMSE/stdev={err['nrmse']:.4f}")
+
+        emulators[name] = emulator.fit(inputs, outputs[name])
+        _logger.info(f"Trained '{args.model}' emulator for {name} in {time.time() - start:.1f} seconds")
+
+    if not (args.samples or args.sobol):
+        return
+
+    mapper = SimFileMapper(project_name=getParam('GCAM.ProjectName'), sim_id=simId)
+    sampler = ParameterSampler(mapper.get_app_xml_param_file())
+
+    if args.samples:
+        start = time.time()
+        synthetic = sampler.sample(args.samples, seed=args.seed)
+        results = pd.DataFrame({name: emulator.predict(synthetic) for name, emulator in emulators.items()})
+        _logger.info(f"Emulated {args.samples} trials in {time.time() - start:.1f} seconds")
+
+        for name in resultNames:
+            printStats(results[name])
+
+        if args.outputFile:
+            _logger.info(f"Writing '{args.outputFile}'")
+            pd.concat([synthetic, results], axis=1).to_csv(args.outputFile, index_label='trialNum')
+
+    if args.sobol:
+        start = time.time()
+        df = emulatorSobolIndices(emulators, sampler, args.baseSamples, seed=args.seed, bootstrap=args.bootstrap)
+        _logger.info(f"Computed Sobol indices from {args.baseSamples} base samples "
+                     f"in {time.time() - start:.1f} seconds")
+        _logger.info(f"Writing '{args.sobol}'")
+        df.to_csv(args.sobol, index=False)
+
+
+class EmulateCommand(McsSubcommandABC):
+    def __init__(self, subparsers):
+        kwargs = {'help' : '''Train emulators (surrogate models) of simulation results from completed trials,
+            and use them to produce large synthetic output distributions and sensitivity indices.'''}
+        super(EmulateCommand, self).__init__('emulate', subparsers, kwargs)
+
+    def addArgs(self, parser):
+        from ...config import getParam
+        from ..emulator import EMULATOR_MODELS
+
+        defaultModel = getParam('MCS.EmulatorModel')
+
+        parser.add_argument('-b', '--bootstrap', type=int, default=100,
+                            help=clean_help('''The number of bootstrap resamples used to compute confidence
+                            intervals for --sobol. Default is 100.'''))
+
+        parser.add_argument('-e', '--expName', type=str, required=True,
+                            help=clean_help('The name of the experiment (scenario) whose results are emulated.'))
+
+        parser.add_argument('-k', '--folds', type=int, default=5,
+                            help=clean_help('''The number of folds to use to compute the cross-validated error
+                            of each emulator. Use 0 to skip cross-validation. Default is 5.'''))
+
+        parser.add_argument('-m', '--model', choices=EMULATOR_MODELS, default=defaultModel,
+                            help=clean_help(f'''The type of emulator: "gp" (Gaussian process) or "gbt"
+                            (gradient-boosted trees). Default is the value of config variable
+                            MCS.EmulatorModel, currently "{defaultModel}".'''))
+
+        parser.add_argument('-N', '--baseSamples', type=int, default=4096,
+                            help=clean_help('''The number of base samples in the Saltelli design used with
+                            --sobol. Default is 4096.'''))
+
+        parser.add_argument('-n', '--samples', type=int, default=50000,
+                            help=clean_help('''The number of synthetic trials to emulate. Statistics of the emulated
+                            results are printed. Use 0 to skip. Default is 50000.'''))
+
+        parser.add_argument('-o', '--outputFile', type=str, default=None, metavar='CSVFILE',
+                            help=clean_help('''Write the synthetic inputs and emulated results to the given CSV file.'''))
+
+        parser.add_argument('-r', '--resultName', type=str, required=True,
+                            help=clean_help('The name of the result to emulate, or a comma-delimited list of names.'))
+
+        parser.add_argument('-s', '--simId', type=int, default=1,
+                            help=clean_help('The id of the simulation. Default is 1.'))
+
+        parser.add_argument('-S', '--seed', type=int, default=None,
+                            help=clean_help('''The random seed used to train emulators and to generate synthetic
+                            trials.'''))
+
+        parser.add_argument('--sobol', type=str, default=None, metavar='CSVFILE',
+                            help=clean_help('''Compute first-order and total-effect Sobol sensitivity indices
+                            using the emulators and save them to the given CSV file.'''))
+
+        return parser   # for auto-doc generation
+
+
+    def run(self, args, tool):
+        driver(args)
@@ -85,15 +85,17 @@ def genFullFactorialData(trials, paramFileObj):
     return inputsDF
 
 
-def genTrialData(mapper : SimFileMapper, paramFileObj, method):
+def genTrialData(mapper : SimFileMapper, paramFileObj, method, seed=None, start=0, jobs=1):
     """
     Generate the given number of trials for the given simId, using the objects created
-    by parsing parameters.xml. Return a DataFrame of values.
+    by parsing parameters.xml. Return a DataFrame of values. If ``start`` is > 0, the
+    trials are appended to the simulation's existing trial data, which is unchanged.
     """
     from pandas import DataFrame
     from ..error import PygcamMcsUserError
     from ..distro import linkedDistro
     from ..LHS import lhs, lhsAmend
+    from ..QMC import qmcSample, QMC_METHODS
     from ..XMLParameterFile import XMLRandomVar, XMLCorrelation
 
     trials = mapper.trial_count
@@ -113,18 +115,53 @@ def genTrialData(mapper : SimFileMapper, paramFileObj, method):
         # TBD: on integration with pygcam. (getName() will fail on XMLVariable instances)
 
         paramNames = [obj.getParameter().getName() for obj in rvList]
-        trialData = lhs(rvList, trials, corrMat=corrMatrix, columns=paramNames, skip=linked)
+        trialData = lhs(rvList, trials, corrMat=corrMatrix, columns=paramNames, skip=linked,
+                        seed=seed, start=start, jobs=jobs)
+
+    elif method in QMC_METHODS:
+        # Quasi-Monte Carlo: map points of a low-discrepancy sequence through each RV's ppf
+        corrMatrix = XMLCorrelation.corrMatrix()
+        paramNames = [obj.getParameter().getName() for obj in rvList]
+        trialData = qmcSample(rvList, trials, method=method, corrMat=corrMatrix, columns=paramNames,
+                              skip=linked, seed=seed, start=start)
+
+    elif method == 'saltelli':
+        # Design for estimating Sobol sensitivity indices; "trials" is the number of base samples
+        from ..sensitivity import saltelliDesign, saveDesignInfo
+
+        if start:
+            raise PygcamMcsUserError("Trials can't be appended to a Saltelli design")
+
+        if XMLCorrelation.instances:
+            _logger.warning("Correlations are ignored by the Saltelli design, which requires independent parameters")
+
+        paramNames = [obj.getParameter().getName() for obj in rvList]
+        trialData, active = saltelliDesign(rvList, trials, columns=paramNames, skip=linked, seed=seed)
+        saveDesignInfo(mapper.saltelli_file, trials, [paramNames[i] for i in active])
+
+        trials = len(trialData)
+        _logger.info(f"Saltelli design for {len(active)} parameters requires {trials} trials")
 
     elif method == 'full-factorial':
+        if start:
+            raise PygcamMcsUserError("Trials can't be appended to a full-factorial simulation")
+
         trialData = genFullFactorialData(trials, paramFileObj)
     else:
         raise PygcamMcsUserError(f"'{method}' is not a supported method of simulation data generation")
 
     linkedDistro.storeTrialData(trialData)  # stores trial data in class so its ppf() can access linked values
-    lhsAmend(trialData, linked, trials, shuffle=False)
+    lhsAmend(trialData, linked, trials, shuffle=False, seed=seed, start=start)
 
-    if method in ('montecarlo', 'full-factorial'):
-        mapper.write_trial_data_file(trialData)
+    if method in ('montecarlo', 'full-factorial', 'saltelli') + QMC_METHODS:
+        fileData = trialData
+        if start:
+            from pandas import concat
+
+            fileData = trialData.set_axis(range(start, start + trials))
+            fileData = concat([mapper.read_trial_data_file(), fileData])
+
+        mapper.write_trial_data_file(fileData)
 
     df = DataFrame(data=trialData)
     return df
@@ -153,7 +190,7 @@ def saveTrialData(mapper : SimFileMapper, df, start=0):
             varNum = var.getVarNum()
             param = var.getParameter()
             pname = param.getName()
-            value = df[pname][trial]
+            value = df[pname].iloc[trial]
             paramId = db.getParamId(pname)
             paramValues.append((trialNum, paramId, value, varNum))
 
@@ -164,8 +201,8 @@ def saveTrialData(mapper : SimFileMapper, df, start=0):
 
     # SALib methods may not create exactly the number of trials requested,
     # so we update the database to set the record straight.
-    db.updateSimTrials(sim_id, trials)
-    _logger.info(f'Saved {trials} trials for sim_id {sim_id}')
+    db.updateSimTrials(sim_id, start + trials)
+    _logger.info(f'Saved {trials} trials starting at {start} for sim_id {sim_id}')
 
 # Deprecated? Or may need to be called by runsim
 # def runStaticSetup(mapper : SimFileMapper, project : Project):
@@ -218,13 +255,46 @@ def saveTrialData(mapper : SimFileMapper, df, start=0):
 #
 #     return status
 
-def genSimulation(mapper : SimFileMapper, data_file, method):
+def _simulationSeed(mapper : SimFileMapper, seed, append):
+    """
+    Return the seed to use for the simulation: the saved seed when appending,
+    otherwise ``seed``, the value of MCS.RandomSeed, or a new random seed.
+    """
+    from ..error import PygcamMcsUserError
+
+    if append:
+        saved = mapper.read_seed()
+        if saved is None:
+            raise PygcamMcsUserError(f"Can't append trials: no seed was saved in '{mapper.seed_file}'")
+
+        if seed is not None and seed != saved:
+            raise PygcamMcsUserError(f"Can't append trials using seed {seed}; the simulation was created with seed {saved}")
+
+        return saved
+
+    if seed is None:
+        import numpy as np
+
+        seed = getParam('MCS.RandomSeed')
+        seed = int(seed) if seed else np.random.SeedSequence().entropy
+
+    mapper.write_seed(seed)
+    return seed
+
+def genSimulation(mapper : SimFileMapper, data_file, method, seed=None, append=False, jobs=1):
     '''
-    Generate a simulation based on the given parameters.
+    Generate a simulation based on the given parameters. If ``append`` is True,
+    add ``mapper.trial_count`` trials to the simulation's existing trials.
     '''
-    from ..database import getDatabase
-    from ..XMLParameterFile import XMLParameterFile
+    from ...file_utils import removeTreeSafely
     from ...xmlScenario import XMLScenario
+    from ..database import getDatabase
+    from ..pregenerate import pregenRoot
+    from ..XMLParameterFile import XMLParameterFile, decache, pruneTrialXmlCache
+
+    # Parameters loaded previously in this process (e.g., by extendSimulation()
+    # or a runsim worker) would otherwise be redefined when the file is loaded.
+    decache()
 
     # TBD: this structure needs to be reconsidered
     # Add symlink to workspace's input dir so we can find XML files using rel paths in config files
@@ -244,10 +314,13 @@ def genSimulation(mapper : SimFileMapper, data_file, method):
     scenarioNames = xml_scenario.scenariosInGroup(group_name)
     baseline = xml_scenario.baselineForGroup(group_name)
 
-    # Copy the project's parameters.xml and results.xml files to {simDir}/app-xml
-    mapper.copy_app_xml_files()
-
-    paramFileObj = XMLParameterFile(mapper.get_param_file())
+    # Copy the project's parameters.xml and results.xml files to {simDir}/app-xml,
+    # unless we're adding trials, which must use the same parameter definitions.
+    if append:
+        paramFileObj = XMLParameterFile(mapper.get_app_xml_param_file())
+    else:
+        mapper.copy_app_xml_files()
+        paramFileObj = XMLParameterFile(mapper.get_param_file())
 
     # TBD: Do we really need to load input files at this point? Commenting this out seems ok.
     # context = McsContext(projectName=mapper.project_name, simId=mapper.sim_id, groupName=group_name)
@@ -264,17 +337,85 @@ def genSimulation(mapper : SimFileMapper, data_file, method):
 
     paramFileObj.generateRandomVars()
 
+    start = 0
+
     if data_file:
         from pandas import read_table
         df = read_table(data_file, sep=',', index_col='trialNum')
         rows = df.shape[0]
         _logger.info(f"Loaded data for {rows} trials from {data_file}")
     else:
-        _logger.info(f"Generating {mapper.trial_count} trials to {mapper.sim_dir}")
-        df = genTrialData(mapper, paramFileObj, method)
+        seed = _simulationSeed(mapper, seed, append)
+
+        if append:
+            start = mapper.read_trial_data_file().index.max() + 1
+
+        _logger.info(f"Generating {mapper.trial_count} trials starting at {start} to {mapper.sim_dir} using seed {seed}")
+        df = genTrialData(mapper, paramFileObj, method, seed=seed, start=start, jobs=jobs)
+
+    # Pre-generated trial XML files no longer correspond to the trial data, and
+    # cached trial XML files that no trial links to won't be reused.
+    removeTreeSafely(pregenRoot(mapper))
+    pruneTrialXmlCache(mapper)
 
     # Save generated values to the database for post-processing
-    saveTrialData(mapper, df)
+    saveTrialData(mapper, df, start=start)
+
+    if append:
+        _saveTrialCount(mapper, start + df.shape[0])
+
+def _savedArgs(mapper : SimFileMapper):
+    """
+    Return a dict of the arguments (as strings) saved when the simulation was
+    created, or an empty dict if none were saved.
+    """
+    args = {}
+    if os.path.exists(mapper.args_save_file):
+        with open(mapper.args_save_file) as f:
+            for line in f:
+                key, _, value = line.rstrip('\n').partition('=')
+                args[key] = value
+
+    return args
+
+def _savedMethod(mapper : SimFileMapper):
+    """
+    Return the trial data generation method recorded in the arguments saved
+    when the simulation was created, or 'montecarlo' if none was recorded.
+    """
+    return _savedArgs(mapper).get('method') or 'montecarlo'
+
+def _saveTrialCount(mapper : SimFileMapper, trials):
+    """
+    Update the number of trials in the saved arguments after trials are appended,
+    leaving the other arguments as they were when the simulation was created.
+    """
+    args = _savedArgs(mapper)
+    if args:
+        args['trials'] = trials
+        saveDict(args, mapper.args_save_file)
+
+def extendSimulation(simId, trials, groupName=None, jobs=1):
+    """
+    Add ``trials`` trials to an existing simulation, as with "gt gensim --append",
+    using the method and seed with which the simulation was created. Used by
+    "gt runsim --adaptive" to add trials until results converge.
+
+    :param simId: (int) the simulation ID
+    :param trials: (int) the number of trials to add
+    :param groupName: (str) the scenario group of the simulation
+    :param jobs: (int) the number of threads to use to generate parameter values
+    :return: (list of int) the trial numbers added
+    """
+    from ..database import getDatabase
+
+    project_name = getParam("GCAM.ProjectName")
+    mapper = SimFileMapper(project_name=project_name, scenario_group=groupName or None,
+                           sim_id=simId, trial_count=trials)
+
+    start = getDatabase().getTrialCount(simId)
+    genSimulation(mapper, None, _savedMethod(mapper), append=True, jobs=jobs)
+    return list(range(start, getDatabase().getTrialCount(simId)))
 
 def _simplifyDistro(dataSrc):
     '''
@@ -435,6 +576,40 @@ def _exportVars(paramFile, outputFile, plotsDir):
                              clean(p.evidence), clean(p.rationale), notes])
 
 
+def _pregenerate(args):
+    """
+    Write the modified XML input files for the trials given by ``args.pregenerate``
+    so that runsim needn't apply trial data. The first trial in the range serves as
+    the template, and must already have been set up.
+    """
+    from ...xmlScenario import XMLScenario
+    from ..context import McsContext
+    from ..error import PygcamMcsUserError
+    from ..pregenerate import pregenerateTrialXml
+    from ..util import get_trial_list
+
+    try:
+        trialNums = sorted(get_trial_list(args.pregenerate))
+    except ValueError as e:
+        raise PygcamMcsUserError(f"Bad trial string '{args.pregenerate}': {e}")
+
+    project_name = getParam("GCAM.ProjectName")
+    project = Project.readProjectFile(project_name, groupName=args.group)
+    group_name = args.group or project.scenarioSetup.defaultGroup
+
+    mapper = SimFileMapper(project_name=project_name, scenario_group=group_name,
+                           sim_id=args.simId, param_file=args.paramFile)
+
+    xml_scenario = XMLScenario.get_instance(mapper.get_scenarios_file())
+    baseline = xml_scenario.baselineForGroup(group_name)
+
+    ctx = McsContext(projectName=project_name, scenario=baseline, groupName=group_name,
+                     simId=args.simId, trialNum=trialNums[0])
+
+    mapper = SimFileMapper(ctx, sim_id=args.simId, param_file=args.paramFile, create_dirs=False)
+    pregenerateTrialXml(mapper, trialNums, jobs=args.jobs)
+
+
 def driver(args):
     '''
     Generate a simulation. Do generic setup, then call genSimulation().
@@ -445,6 +620,10 @@ def driver(args):
     desc   = args.desc
     trials = args.trials
 
+    if args.pregenerate:
+        _pregenerate(args)
+        return
+
     if trials < 0 and not args.exportVars:
         raise PygcamMcsUserError("Trials argument is required: must be an integer >= 0")
 
@@ -457,6 +636,21 @@ def driver(args):
         _exportVars(mapper.get_param_file(), args.exportVars, args.paramPlots)
         return
 
+    method = args.method or 'montecarlo'
+
+    if args.append:
+        if not trials or args.delete or args.dataFile:
+            raise PygcamMcsUserError("--append requires a number of trials (-t) > 0 and can't be used "
+                                     "with --delete or --dataFile")
+
+        if not os.path.exists(mapper.trial_data_file):
+            raise PygcamMcsUserError(f"Can't append trials: trial data file '{mapper.trial_data_file}' doesn't exist")
+
+        method = _savedMethod(mapper)
+        if args.method and args.method != method:
+            raise PygcamMcsUserError(f"Can't append trials using method '{args.method}'; the simulation "
+                                     f"was created with method '{method}'")
+
     if args.delete:
         removeTreeSafely(mapper.sandbox_dir, ignore_errors=False)
 
@@ -467,15 +661,16 @@ def driver(args):
             mapper.create_database()
 
     # Called with trials == 0 when setting up a local run directory on /scratch
-    if trials:
+    if trials and not args.append:
         # The simId can be provided on command line, in which case we need
         # to delete existing parameter entries for this app and simId.
         mapper.create_sim(desc=desc)
 
-    genSimulation(mapper, args.dataFile, args.method)
+    genSimulation(mapper, args.dataFile, method, seed=args.seed, append=args.append, jobs=args.jobs)
 
-    if trials:
+    if trials and not args.append:
         # Save a copy of the arguments used to create this simulation
+        args.method = method
         saveDict(vars(args), mapper.args_save_file)
 
 
@@ -486,6 +681,11 @@ class GensimCommand(McsSubcommandABC):
         super(GensimCommand, self).__init__('gensim', subparsers, kwargs)
 
     def addArgs(self, parser):
+        parser.add_argument('-a', '--append', action='store_true',
+                            help=clean_help('''Add the number of trials given by -t/--trials to an existing 
+                                simulation, without changing its existing trials. The new trials are generated
+                                using the seed saved when the simulation was created.'''))
+
         parser.add_argument('--delete', action='store_true',
                             help=clean_help('''DELETE and recreate the simulation "run" directory.'''))
 
@@ -502,12 +702,21 @@ class GensimCommand(McsSubcommandABC):
         parser.add_argument('-g', '--group', default='',
                             help=clean_help('''The name of a scenario group to process.'''))
 
-        methods = ['montecarlo', 'full-factorial']
-        parser.add_argument('-m', '--method', choices=methods,
-                            default='montecarlo',
+        parser.add_argument('-j', '--jobs', type=int, default=1,
+                            help=clean_help('''The number of processes to use with --pregenerate, or of threads 
+                                to use to generate parameter values. Default is 1.'''))
+
+        methods = ['montecarlo', 'full-factorial', 'sobol', 'halton', 'saltelli']
+        parser.add_argument('-m', '--method', choices=methods, default=None,
                             help=clean_help('''Use the specified method to generate trial data. Default is "montecarlo".
                                 Note that the only supported distribution types for the 'full-factorial' method are: 
-                                Constant, Binary, Integer, Grid, and Sequence'''))
+                                Constant, Binary, Integer, Grid, and Sequence. The 'sobol' and 'halton' methods
+                                use scrambled quasi-Monte Carlo sequences, which usually require fewer trials than
+                                'montecarlo' for the same accuracy; use a power of 2 trials with 'sobol'. When
+                                using --append, the method used to create the simulation is used by default. The 
+                                'saltelli' method generates a design for computing Sobol sensitivity indices
+                                with "gt analyze --sobol"; in this case, -t gives the number of base samples 
+                                (ideally a power of 2), and N * (d + 2) trials are generated for d parameters.'''))
 
         # TBD: drop this since it can be set from .pygcam.cfg and runsim has no method to process it
         paramFile = getParam('MCS.ProjectParametersFile')
@@ -520,6 +729,14 @@ class GensimCommand(McsSubcommandABC):
                             help=clean_help('''Export plots of values returned by XPath queries for each parameter 
                                 defined by --paramFile or config variable MCS.ProjectParametersFile.'''))
 
+        parser.add_argument('--pregenerate', default='', metavar="TRIALS",
+                            help=clean_help('''Write the modified XML input files for the given trials (e.g.,
+                                "0-999" or "1-6,7,9") to the simulation's "pregen-xml" directory and exit. Each
+                                input file is parsed once and the XPath queries are run once, rather than
+                                once per trial. Trials run by runsim then use these files rather than applying
+                                trial data. The first trial given is used as a template and must already have 
+                                been set up, e.g., using "gt runsim -t N --noGCAM". See also --jobs.'''))
+
         runRoot = getParam('MCS.SandboxRoot')
         parser.add_argument('-r', '--runRoot', default=None,
                             help=clean_help(f'''Root of the run-time directory for running user programs. Defaults to
@@ -528,6 +745,11 @@ class GensimCommand(McsSubcommandABC):
         parser.add_argument('-s', '--simId', type=int, default=1,
                             help=clean_help('The id of the simulation. Default is 1.'))
 
+        parser.add_argument('-S', '--seed', type=int, default=None,
+                            help=clean_help('''The random seed to use to generate trial data. Defaults to the
+                                value of config parameter MCS.RandomSeed, or if that is empty, a random seed.
+                                The seed used is saved in the simulation directory.'''))
+
         # TBD: make this '-N', '--num-trials' to differentiate from runsim's -t / --trials (which is a trial string)
         parser.add_argument('-t', '--trials', type=int, default=-1,
                             help=clean_help('''The number of trials to create for this simulation (REQUIRED). If a
@@ -77,6 +77,14 @@ class RunSimCommand(McsSubcommandABC):
         scenarioHelp = 'Default value is "%s".' % defaultScenario \
                             if defaultScenario else "No default has been set."
 
+        parser.add_argument('-a', '--adaptive', action='store_true',
+                            help=clean_help('''After running the given trials, compare running estimates of
+                            the outputs named by config var MCS.AdaptiveOutputs (their mean, percentiles,
+                            and most highly rank-correlated inputs) to those computed after the prior batch.
+                            If the estimates are not yet stable within MCS.AdaptiveTolerance, add a batch 
+                            of trials to the simulation (as with "gt gensim --append") and run them. 
+                            See the MCS.Adaptive* config variables for details.'''))
+
         parser.add_argument('-B', '--noBatchQueries', action='store_true',
                             help=clean_help('Skip running batch queries.'))
 
@@ -182,6 +190,10 @@ class RunSimCommand(McsSubcommandABC):
             args.noGCAM = args.noBatchQueries = True
             args.noPostProcessor = args.runLocal = args.noSetup = True
 
+        if args.adaptive and args.noDatabase:
+            from ...error import CommandlineError
+            raise CommandlineError("--adaptive requires results to be saved in the database; it can't be used with --noDatabase")
+
         if args.statuses:
             from ..database import RUN_STATUSES
             from ...error import CommandlineError
@@ -0,0 +1,137 @@
+'''
+Running estimates of simulation results used to decide whether a simulation
+has run enough trials. Used by "gt runsim --adaptive" to stop queueing trials
+once the estimates are stable, or to add trials to the simulation if not.
+
+Copyright (c) 2023 Richard Plevin. See the file COPYRIGHT.txt for details.
+'''
+import numpy as np
+
+from ..config import getParam, getParamAsInt, getParamAsFloat
+from ..log import getLogger
+from .error import PygcamMcsUserError
+
+_logger = getLogger(__name__)
+
+
+def runningEstimates(inputs, outputs, percentiles=(5, 50, 95), topK=5):
+    """
+    Compute the estimates used to test for convergence of each output: the mean,
+    the given percentiles, and the names of the ``topK`` inputs with the largest
+    absolute Spearman rank correlation with the output.
+
+    :param inputs: (pandas.DataFrame or None) input values indexed by trialNum;
+        if None, no rank correlations are computed.
+    :param outputs: (pandas.DataFrame) output values indexed by trialNum, with a
+        column per output
+    :param percentiles: (sequence of float) the percentiles to compute, in [0, 100]
+    :param topK: (int) the number of most-correlated inputs to identify
+    :return: (dict) keyed by output name, of dicts with keys 'mean', 'std',
+        'percentiles' (ndarray), and 'top' (frozenset of input names).
+    """
+    from .analysis import rankCorrelationMatrix
+
+    outputs = outputs.dropna(how='all')
+    values = outputs.values
+
+    means = np.nanmean(values, axis=0)
+    stds  = np.nanstd(values, axis=0)
+    pcts  = np.nanpercentile(values, percentiles, axis=0)
+
+    corr = None
+    if inputs is not None and topK > 0:
+        corr = rankCorrelationMatrix(inputs.loc[inputs.index.intersection(outputs.index)], outputs).abs()
+
+    estimates = {}
+    for i, name in enumerate(outputs.columns):
+        top = frozenset(corr[name].nlargest(topK).index) if corr is not None else frozenset()
+        estimates[name] = {'mean': means[i], 'std': stds[i], 'percentiles': pcts[:, i], 'top': top}
+
+    return estimates
+
+
+class ConvergenceMonitor(object):
+    """
+    Tracks running estimates of outputs across successive checks. The estimates
+    are considered stable when, for every output, the mean and each percentile
+    changed since the prior check by no more than ``tolerance`` times the output's
+    standard deviation, and the set of top-ranked inputs is unchanged. The
+    simulation has converged once this holds for ``stableChecks`` consecutive checks.
+    """
+    def __init__(self, outputNames, tolerance=0.02, percentiles=(5, 50, 95), topK=5,
+                 stableChecks=2, minTrials=0):
+        if not outputNames:
+            raise PygcamMcsUserError("Adaptive sampling requires at least one output to monitor")
+
+        self.outputNames  = list(outputNames)
+        self.tolerance    = tolerance
+        self.percentiles  = list(percentiles)
+        self.topK         = topK
+        self.stableChecks = stableChecks
+        self.minTrials    = minTrials
+
+        self.estimates = None
+        self.stableCount = 0
+
+    @classmethod
+    def fromConfig(cls, outputNames=None):
+        """
+        Create a ConvergenceMonitor using the values of the MCS.Adaptive* config
+        variables, monitoring ``outputNames`` if given, else MCS.AdaptiveOutputs.
+        """
+        outputNames = outputNames or getParam('MCS.AdaptiveOutputs').split()
+        percentiles = [float(p) for p in getParam('MCS.AdaptivePercentiles').split()]
+
+        return cls(outputNames,
+                   tolerance=getParamAsFloat('MCS.AdaptiveTolerance'),
+                   percentiles=percentiles,
+                   topK=getParamAsInt('MCS.AdaptiveTopK'),
+                   stableChecks=getParamAsInt('MCS.AdaptiveStableChecks'),
+                   minTrials=getParamAsInt('MCS.AdaptiveMinTrials'))
+
+    def _isStable(self, old, new):
+        for name, est in new.items():
+            prior = old.get(name)
+            if prior is None or est['top'] != prior['top']:
+                return False
+
+            limit = self.tolerance * est['std']
+            if abs(est['mean'] - prior['mean']) > limit:
+                return False
+
+            if np.any(np.abs(est['percentiles'] - prior['percentiles']) > limit):
+                return False
+
+        return True
+
+    def update(self, inputs, outputs):
+        """
+        Compute new estimates from the results saved so far and compare them to the
+        estimates computed at the prior check.
+
+        :param inputs: (pandas.DataFrame or None) input values indexed by trialNum
+        :param outputs: (pandas.DataFrame or None) output values indexed by trialNum
+        :return: (bool) True if the estimates have converged
+        """
+        missing = [name for name in self.outputNames if outputs is None or name not in outputs.columns]
+        if missing:
+            _logger.info(f"Adaptive sampling: no results yet for {missing}")
+            return False
+
+        outputs = outputs[self.outputNames]
+        count = len(outputs.dropna(how='all'))
+        estimates = runningEstimates(inputs, outputs, percentiles=self.percentiles, topK=self.topK)
+
+        stable = self.estimates is not None and self._isStable(self.estimates, estimates)
+        self.stableCount = self.stableCount + 1 if stable else 0
+        self.estimates = estimates
+
+        converged = self.stableCount >= self.stableChecks and count >= self.minTrials
+
+        for name, est in estimates.items():
+            _logger.info(f"Adaptive sampling: {name}: mean={est['mean']:.4g} std={est['std']:.4g} "
+                         f"top={sorted(est['top'])} ({count} trials)")
+
+        _logger.info(f"Adaptive sampling: {count} trials; estimates stable for {self.stableCount} "
+                     f"of {self.stableChecks} checks{'; converged' if converged else ''}")
+        return converged
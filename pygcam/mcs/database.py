@@ -29,7 +29,7 @@ from ..log import getLogger
 
 from .error import PygcamMcsUserError, PygcamMcsSystemError
 from .schema import (ORMBase, Run, Sim, Input, Output, InValue, OutValue, Experiment,
-                     Program, Code, TimeSeries)
+                     Program, Code, TimeSeries, Accumulator)
 
 _logger = getLogger(__name__)
 
@@ -583,6 +583,62 @@ class CoreDatabase(object):
         resultDF = DataFrame.from_records(rslt, columns=['trialNum', outputName], index='trialNum')
         return resultDF
 
+    def getOutValuesWide(self, simId, expName, outputNames=None):
+        '''
+        Return a pandas DataFrame indexed by trialNum with a column for each of
+        the given output variables (or all outputs if outputNames is None), for
+        the given sim and exp, using a single query.
+        '''
+        from pandas import DataFrame
+
+        with self.sessionScope() as session:
+            query = session.query(Run.trialNum, Output.name, OutValue.value).select_from(Run).\
+                filter(Run.simId == simId).join(Experiment).filter(Experiment.expName == expName).\
+                join(OutValue).join(Output)
+
+            if outputNames:
+                query = query.filter(Output.name.in_(outputNames))
+
+            rslt = query.all()
+
+        if not rslt:
+            return None
+
+        df = DataFrame.from_records(rslt, columns=['trialNum', 'name', 'value'])
+        return df.pivot_table(index='trialNum', columns='name', values='value', aggfunc='last')
+
+    def _createAccumulatorTable(self):
+        # The table is created on first use so databases created before it was defined can be used
+        if not getattr(self, '_accumulatorTableExists', False):
+            Accumulator.__table__.create(bind=self.engine, checkfirst=True)
+            self._accumulatorTableExists = True
+
+    def getAccumulatorState(self, simId, expName, outputName):
+        '''
+        Return the saved state of the accumulator (see accumulator.py) for the
+        given sim, exp, and output, or None if there is none.
+        '''
+        self._createAccumulatorTable()
+
+        with self.sessionScope() as session:
+            row = session.query(Accumulator.state).select_from(Accumulator).\
+                filter(Accumulator.simId == simId).join(Experiment).filter(Experiment.expName == expName).\
+                join(Output).filter(Output.name == outputName).one_or_none()
+
+        return row.state if row else None
+
+    def saveAccumulatorState(self, simId, expName, outputName, state):
+        '''
+        Save the state of the accumulator for the given sim, exp, and output,
+        replacing any prior state.
+        '''
+        self._createAccumulatorTable()
+        outputId = self.getOutputIds([outputName])[0]
+
+        with self.sessionScope() as session:
+            expId = self.getExpId(expName, session=session)
+            session.merge(Accumulator(simId=simId, expId=expId, outputId=outputId, state=state))
+
     def deleteOutputs(self):
         # Delete all rows from outputs table, which cascades to delete all outValues, too
         with self.sessionScope() as session:
@@ -13,7 +13,7 @@ import re
 from inspect import getargspec
 
 import numpy as np
-from scipy.stats import lognorm, triang, uniform, norm, rv_discrete
+from scipy.stats import lognorm, triang, uniform, norm
 
 from ..log import getLogger
 from .error import PygcamMcsUserError
@@ -155,16 +155,30 @@ def triangleLogfactor(logfactor):
 
     return triangle(1.0/logfactor, 1, logfactor)
 
+class DiscreteRV(object):
+    """
+    A discrete distribution over the given values with the given probabilities.
+    The ppf looks up an array of percentiles in a precomputed table of cumulative
+    probabilities, returning the smallest value whose CDF is >= each percentile,
+    as for scipy.stats.rv_discrete.
+    """
+    def __init__(self, values, probs):
+        probs = np.asarray(probs, dtype=float)
+        self.values = np.asarray(values, dtype=float)
+        self.cdf = np.cumsum(probs / probs.sum())
+
+    def ppf(self, q):
+        indices = np.searchsorted(self.cdf, q, side='left')
+        return self.values[np.minimum(indices, len(self.values) - 1)]
+
 def binary():
-    return rv_discrete(name="binary", values=[(0, 1), (0.5, 0.5)])
+    return DiscreteRV([0, 1], [0.5, 0.5])
 
 def integers(min, max):
     min = int(min)
     max = int(max)
     count = max - min + 1
-    nums  = list(range(min, max + 1))
-    probs = [1.0/count] * count
-    return rv_discrete(name='integers', values=[nums, probs])
+    return DiscreteRV(np.arange(min, max + 1), np.full(count, 1.0 / count))
 
 class constant():
     """
@@ -175,9 +189,7 @@ class constant():
         self.value = value
 
     def ppf(self, q):
-        n = np.ndarray(len(q))
-        n[:] = self.value
-        return n
+        return np.full(len(q), self.value, dtype=float)
 
 class sequence():
     """
@@ -185,31 +197,23 @@ class sequence():
     of constant values. Useful for forcing parameters to given values.
     """
     def __init__(self, values):
-        self.values = [float(item) for item in values.split(',')]
+        self.values = np.array([float(item) for item in values.split(',')])
 
     def ppf(self, q):
-        n = len(q)  # length of array to return
-        count = len(self.values)    # items in the sequence
-
-        seq = ((int(n / count) + (1 if n % count else 0)) * self.values)
-
-        # truncate in case n wasn't a multiple of count
-        arr = np.array(seq[:n])
-        return arr
+        # repeat the sequence as needed to produce len(q) values
+        return np.resize(self.values, len(q))
 
 class Empirical():
     """
     Create an empirical distribution and ppf from an array of observations.
     """
     def __init__(self, values):
-        self.values = sorted(values)
+        self.values = np.sort(np.asarray(values, dtype=float))
         self.count = len(values)
 
     def ppf(self, q):
-        values = self.values
-        n = len(values)
-        result = [values[int(n * percentile)] for percentile in q]
-        return result
+        indices = (np.asarray(q) * self.count).astype(int)
+        return self.values[np.minimum(indices, self.count - 1)]
 
 class GridRV(object):
     '''
@@ -228,17 +232,13 @@ class GridRV(object):
         '''
         Return 'n' values from this object's list of values, repeating those values
         as many times as necessary to produce 'n' values, where 'n' is the length of
-        the percentile list given by 'q'. (We ignore the values, though.)
+        the percentile list given by 'q'. (We ignore the values, though.) The values
+        are returned in sorted order, like those of an RV for sorted percentiles;
+        LHS shuffles them, or orders them by rank, using the parameter's random stream.
         '''
-        n = len(q)
         values = self.values
         assert len(values.shape) == 1, "Grid values were converted to ndarray of > 1 dimension"
-        count  = values.shape[0]
-        reps   = 1 if n <= count else np.ceil(float(n) / count)
-        tiled  = np.tile(values, reps)[:n]
-        np.random.shuffle(tiled)                # TBD: might be redundant as shuffle is called from LHS
-        # _logger.debug("tiled=%s", tiled)
-        return tiled
+        return np.sort(np.resize(values, len(q)))
 
 class linkedDistro(object):
     def __init__(self, parameter):
@@ -257,7 +257,7 @@ class linkedDistro(object):
         return cls.trialData
 
     def ppf(self, q):
-        return self.trialData[self.parameter]    # TBD: return as an ndarray
+        return np.asarray(self.trialData[self.parameter])
 
 class DistroGen(object):
     '''
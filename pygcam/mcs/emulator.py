@@ -0,0 +1,186 @@
+'''
+Surrogate ("emulator") models of simulation results, trained on the input values
+and results of completed trials, and used to produce large synthetic output
+distributions and Sobol sensitivity indices without running the model. Requires
+scikit-learn, which is imported only when an emulator is created.
+
+Copyright (c) 2023 Richard Plevin. See the file COPYRIGHT.txt for details.
+'''
+import numpy as np
+
+from ..error import PygcamException
+from ..log import getLogger
+from .error import PygcamMcsUserError
+
+_logger = getLogger(__name__)
+
+EMULATOR_MODELS = ('gp', 'gbt')
+
+
+def _requireSklearn():
+    """
+    Raise a PygcamException if scikit-learn, which emulators require, can't be imported.
+    """
+    try:
+        import sklearn
+
+    except ImportError as e:
+        raise PygcamException(f"Emulators require the scikit-learn package, which could not be imported: {e}")
+
+
+def _makeModel(kind, dims, seed=None):
+    """
+    Create an (unfitted) scikit-learn regressor: a Gaussian process with an
+    anisotropic RBF kernel if ``kind`` is 'gp', or histogram-based gradient-boosted
+    trees if ``kind`` is 'gbt'.
+    """
+    _requireSklearn()
+
+    from sklearn.pipeline import make_pipeline
+    from sklearn.preprocessing import StandardScaler
+    from sklearn.gaussian_process import GaussianProcessRegressor
+    from sklearn.gaussian_process.kernels import ConstantKernel, RBF, WhiteKernel
+    from sklearn.ensemble import HistGradientBoostingRegressor
+
+    if kind == 'gp':
+        kernel = ConstantKernel() * RBF(length_scale=np.ones(dims)) + WhiteKernel()
+        model = GaussianProcessRegressor(kernel=kernel, normalize_y=True, random_state=seed)
+        return make_pipeline(StandardScaler(), model)
+
+    if kind == 'gbt':
+        return HistGradientBoostingRegressor(random_state=seed)
+
+    raise PygcamMcsUserError(f"Unknown emulator model '{kind}'; must be one of {EMULATOR_MODELS}")
+
+
+class Emulator(object):
+    """
+    A surrogate model of one simulation result as a function of the input parameters.
+    """
+    def __init__(self, kind='gbt', seed=None):
+        self.kind = kind
+        self.seed = seed
+        self.columns = None
+        self.model = None
+
+    @staticmethod
+    def _trainingData(inputs, output):
+        # use only trials with all values
+        output = output.reindex(inputs.index)
+        complete = inputs.notna().all(axis=1) & output.notna()
+        return inputs[complete].values, output[complete].values
+
+    def fit(self, inputs, output):
+        """
+        Fit the model to the values of ``output`` for the trials in ``inputs``.
+
+        :param inputs: (pandas.DataFrame) input values indexed by trialNum
+        :param output: (pandas.Series) values of one result, indexed by trialNum
+        :return: self
+        """
+        X, y = self._trainingData(inputs, output)
+        if len(y) < 2:
+            raise PygcamMcsUserError(f"Too few trials ({len(y)}) with results to train an emulator")
+
+        self.columns = list(inputs.columns)
+        self.model = _makeModel(self.kind, X.shape[1], seed=self.seed).fit(X, y)
+        return self
+
+    def predict(self, inputs):
+        """
+        Predict the result for each row of ``inputs``.
+
+        :param inputs: (pandas.DataFrame) input values, with a column for each of the
+            inputs the model was trained on
+        :return: (numpy.ndarray) the predicted values
+        """
+        return self.model.predict(inputs[self.columns].values)
+
+    def crossValidate(self, inputs, output, folds=5):
+        """
+        Estimate the emulator's prediction error using k-fold cross-validation.
+
+        :param inputs: (pandas.DataFrame) input values indexed by trialNum
+        :param output: (pandas.Series) values of one result, indexed by trialNum
+        :param folds: (int) the number of folds
+        :return: (dict) with keys 'r2' (coefficient of determination), 'rmse' (root
+            mean squared error), and 'nrmse' (rmse divided by the output's stdev).
+        """
+        _requireSklearn()
+
+        from sklearn.model_selection import KFold, cross_val_predict
+
+        X, y = self._trainingData(inputs, output)
+        model = _makeModel(self.kind, X.shape[1], seed=self.seed)
+        cv = KFold(n_splits=folds, shuffle=True, random_state=self.seed)
+        predicted = cross_val_predict(model, X, y, cv=cv)
+
+        rmse = np.sqrt(np.mean((predicted - y) ** 2))
+        std = np.std(y)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return {'r2': 1 - (rmse / std) ** 2, 'rmse': rmse, 'nrmse': rmse / std}
+
+
+class ParameterSampler(object):
+    """
+    Generates synthetic input values from the distributions defined in the
+    simulation's parameters.xml file.
+    """
+    def __init__(self, paramFile):
+        from .XMLParameterFile import XMLParameterFile, XMLRandomVar
+
+        XMLParameterFile(paramFile).generateRandomVars()
+
+        self.rvList = XMLRandomVar.getInstances()
+        self.names  = [rv.getParameter().getName() for rv in self.rvList]
+        self.linked = [rv for rv in self.rvList if rv.param.dataSrc.isLinked()]
+
+    def _amendLinked(self, df, seed):
+        from .distro import linkedDistro
+        from .LHS import lhsAmend
+
+        linkedDistro.storeTrialData(df)
+        lhsAmend(df, self.linked, len(df), shuffle=False, seed=seed)
+        return df
+
+    def sample(self, trials, seed=None):
+        """
+        Return a DataFrame of ``trials`` Latin Hypercube samples of all parameters,
+        with the correlations defined in parameters.xml.
+        """
+        from .LHS import lhs
+        from .XMLParameterFile import XMLCorrelation
+
+        df = lhs(self.rvList, trials, corrMat=XMLCorrelation.corrMatrix(), columns=self.names,
+                 skip=self.linked, seed=seed)
+        return self._amendLinked(df, seed)
+
+    def saltelliDesign(self, baseSamples, seed=None):
+        """
+        Return a Saltelli design (see sensitivity.saltelliDesign) as a DataFrame,
+        and the names of the parameters that are dimensions of the design.
+        """
+        from .sensitivity import saltelliDesign
+
+        df, active = saltelliDesign(self.rvList, baseSamples, columns=self.names, skip=self.linked, seed=seed)
+        return self._amendLinked(df, seed), [self.names[i] for i in active]
+
+
+def emulatorSobolIndices(emulators, sampler, baseSamples, seed=None, bootstrap=100):
+    """
+    Estimate Sobol sensitivity indices for each emulated result using a Saltelli
+    design evaluated by the emulators.
+
+    :param emulators: (dict) Emulator instances keyed by result name
+    :param sampler: (ParameterSampler) generates the design
+    :param baseSamples: (int) the number of base samples in the design
+    :param seed: (int or None) seed for the design and the bootstrap
+    :param bootstrap: (int) the number of bootstrap resamples for confidence intervals
+    :return: (pandas.DataFrame) as returned by sensitivity.sobolIndicesDF
+    """
+    from .sensitivity import sobolIndicesDF
+
+    design, paramNames = sampler.saltelliDesign(baseSamples, seed=seed)
+    names = list(emulators.keys())
+    Y = np.column_stack([emulators[name].predict(design) for name in names])
+    return sobolIndicesDF(Y, paramNames, names, bootstrap=bootstrap, seed=seed)
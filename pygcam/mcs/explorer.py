@@ -11,7 +11,7 @@ import plotly.subplots as subplots
 from scipy import stats
 
 from ..log import getLogger
-from ..mcs.analysis import getCorrDF
+from ..mcs.analysis import getCorrDF, cumulativeRankCorrelation
 from ..config import getConfig, DEFAULT_SECTION, getParam, setParam, setSection, getSections
 from ..mcs.database import getDatabase
 from ..gui.widgets import dataStore
@@ -385,14 +385,7 @@ class McsData(object):
         trialSteps = list(range(CORR_STEP, len(results), CORR_STEP))    # produce corrDF for increments of 100 trials
         trialSteps.append(len(results))                                 # final value is for however many trials there were
 
-        corrByTrials = pd.DataFrame()
-
-        for count in trialSteps:
-            corrDF = getCorrDF(inputsDF[:count], results[:count])
-            corrDF['count'] = count
-            corrByTrials = corrByTrials.append(corrDF)
-
-        corrByTrials.reset_index(inplace=True)
+        corrByTrials = cumulativeRankCorrelation(inputsDF, results, trialSteps)
         return corrByTrials
 
 
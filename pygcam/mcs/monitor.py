@@ -117,6 +117,18 @@ class Monitor(object):
         self.finished = False
         self.idleEngines = set()
 
+        # Input values and their percentile ranks, used to update accumulators
+        self.accumulate = getParamAsBoolean('MCS.UpdateAccumulators')
+        self.inputs = None
+        self.inputRanks = None
+
+        # In adaptive mode, a ConvergenceMonitor for each scenario whose results
+        # are checked before deciding whether to add trials to the simulation.
+        self.convergence = None
+        if getattr(args, 'adaptive', False):
+            from .convergence import ConvergenceMonitor
+            self.convergence = {scenario: ConvergenceMonitor.fromConfig() for scenario in args.scenarios}
+
         projectName = args.projectName      # "global" projectName argument added in tool.py
 
         # cache run definitions from the database and amend as necessary when creating runs
@@ -414,6 +426,9 @@ class Monitor(object):
             db.commitWithRetry(session)
             _logger.debug('Monitor saved results')
 
+            if self.accumulate:
+                self.updateAccumulators(results)
+
         except Exception as e:
             session.rollback()
             # TBD: distinguish database save errors from data access errors?
@@ -422,6 +437,91 @@ class Monitor(object):
         finally:
             db.endSession(session)
 
+    def updateAccumulators(self, results):
+        """
+        Update the running statistics stored in the database for each scalar
+        result of the successful trials in ``results``.
+        """
+        from collections import defaultdict
+        from .accumulator import updateAccumulators
+
+        batches = defaultdict(list)     # (trialNum, value) pairs keyed by (scenario, output)
+
+        for result in results:
+            context = result.context
+            if context.status != RUN_SUCCEEDED:
+                continue
+
+            for resultDict in (result.resultsList or []):
+                if resultDict['isScalar']:
+                    key = (context.scenario, resultDict['paramName'])
+                    batches[key].append((context.trialNum, resultDict['value']))
+
+        if not batches:
+            return
+
+        # (Re)load inputs on first use or if trials have been added to the simulation
+        trialNums = {trialNum for pairs in batches.values() for trialNum, _ in pairs}
+        if self.inputs is None or not trialNums.issubset(self.inputs.index):
+            self.inputs = self.db.getParameterValues2(self.args.simId)
+            self.inputRanks = self.inputs.rank(pct=True)
+
+        try:
+            updateAccumulators(self.db, self.args.simId, batches, self.inputs, self.inputRanks)
+
+        except Exception as e:
+            # Missing accumulators are rebuilt from saved results, so don't abort the simulation
+            _logger.warning(f'Failed to update accumulators: {e}')
+
+    def adaptiveTrials(self):
+        """
+        In adaptive mode, update the running estimates of the monitored outputs
+        using the results saved so far. If the estimates haven't converged for all
+        scenarios, add a batch of trials to the simulation.
+
+        :return: (list of int) the trial numbers added, or an empty list if not in
+            adaptive mode, the estimates have converged, or the maximum number of
+            trials (MCS.AdaptiveMaxTrials) has been reached.
+        """
+        if not self.convergence:
+            return []
+
+        args = self.args
+        simId = args.simId
+        db = self.db
+
+        inputs = db.getParameterValues2(simId)
+        converged = [monitor.update(inputs, db.getOutValuesWide(simId, scenario, monitor.outputNames))
+                     for scenario, monitor in self.convergence.items()]
+
+        if all(converged):
+            _logger.info('Adaptive sampling: estimates have converged; not adding trials')
+            self.convergence = None
+            return []
+
+        # By default, double the number of trials, which preserves the balance
+        # properties of Sobol sequences.
+        trialCount = db.getTrialCount(simId)
+        batchTrials = getParamAsInt('MCS.AdaptiveBatchTrials') or trialCount
+        trials = min(batchTrials, getParamAsInt('MCS.AdaptiveMaxTrials') - trialCount)
+
+        if trials <= 0:
+            _logger.warning(f'Adaptive sampling: estimates have not converged, but the simulation has '
+                            f'reached the maximum of {trialCount} trials (MCS.AdaptiveMaxTrials)')
+            self.convergence = None
+            return []
+
+        from .built_ins.gensim_plugin import extendSimulation
+
+        _logger.info(f'Adaptive sampling: adding {trials} trials to simulation {simId}')
+        try:
+            return extendSimulation(simId, trials, groupName=args.groupName)
+
+        except PygcamMcsUserError as e:
+            _logger.error(f'Adaptive sampling: failed to add trials: {e}')
+            self.convergence = None
+            return []
+
     def checkEngines(self):
         from .slurm import Slurm
 
@@ -460,8 +560,13 @@ class Monitor(object):
         args = self.args
 
         if args.runLocal:
-            self.runTrials()
-            return
+            trialNums = None
+            while True:
+                self.runTrials(trialNums)
+
+                trialNums = self.adaptiveTrials()
+                if not trialNums:
+                    return
 
         if args.redoListOnly and args.statuses:
             listTrialsToRedo(self.db, args.simId, args.scenarios, args.statuses)
@@ -523,6 +628,14 @@ class Monitor(object):
                 for ar in toDelete:
                     ars.remove(ar)
 
+                # In adaptive mode, queue more trials (before idle engines are
+                # shut down) if the results haven't converged.
+                if not pending:
+                    trialNums = self.adaptiveTrials()
+                    if trialNums:
+                        ars += self.runTrials(trialNums)
+                        pending = copy.copy(self.client.outstanding)
+
                 if shutdownWhenIdle:
                     self.shutdownIdleEngines()
 
@@ -544,7 +657,14 @@ class Monitor(object):
         # self.client.shutdown(hub=False, block=False)    # doesn't seem to work any more
         stopCluster()
 
-    def runTrials(self):
+    def runTrials(self, trialNums=None):
+        """
+        Queue (or if running locally, run) trials for all scenarios.
+
+        :param trialNums: (list of int) the trials to run. If None, the trials are
+            determined by the "trials" and "statuses" arguments.
+        :return: (list) async result objects for the queued trials
+        """
         from . import worker
 
         args = vars(self.args)
@@ -591,7 +711,10 @@ class Monitor(object):
 
         for scenario in scenarios:
 
-            if statuses:
+            if trialNums is not None:
+                contexts = self.createRuns(simId, scenario, trialNums)
+
+            elif statuses:
                 # Change this to return Run instances?
                 # If any of the "redo" options find trials, use these instead of args.trials
                 contexts = self.db.getRunsByStatus(simId, scenario, statuses,
@@ -611,16 +734,16 @@ class Monitor(object):
                     userTrials = len(trialList)
 
                     # remove nonsense values and warn user about them
-                    trialNums = [trial for trial in trialList if 0 <= trial < trialCount]
-                    goodTrials = len(trialNums)
+                    scenarioTrials = [trial for trial in trialList if 0 <= trial < trialCount]
+                    goodTrials = len(scenarioTrials)
                     if goodTrials != userTrials:
                         _logger.warn('Ignoring %d trial numbers that are out of range [0,%d]',
                                      userTrials - goodTrials, trialCount)
                 else:
                     # if trials aren't specified, queue all of them
-                    trialNums = list(range(trialCount))
+                    scenarioTrials = list(range(trialCount))
 
-                contexts = self.createRuns(simId, scenario, trialNums)
+                contexts = self.createRuns(simId, scenario, scenarioTrials)
 
             statusPairs = []
 
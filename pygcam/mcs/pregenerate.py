@@ -0,0 +1,212 @@
+#
+# Generate the modified XML input files for many trials at once, so that
+# trials running on compute nodes only need to link to pre-built files.
+#
+# Copyright (c) 2023 Richard Plevin
+# See the https://opensource.org/licenses/MIT for license details.
+#
+from copy import deepcopy
+import json
+import os
+import time
+
+from ..config import getParamAsBoolean, pathjoin, mkdirs
+from ..constants import PREGEN_XML_NAME, TRIAL_XML_NAME, FileVersions
+from ..file_utils import filecopy
+from ..log import getLogger
+from ..manifest import fileHash, fingerprint
+from ..XMLConfigFile import XMLConfigFile
+
+from .error import PygcamMcsUserError
+from .util import dirFromNumber
+from .XMLParameterFile import XMLParameter, XMLParameterFile, XMLInputFile, loadTrialData
+
+_logger = getLogger(__name__)
+
+PREGEN_MANIFEST = 'pregen.json'
+
+# State shared with forked pool workers, which inherit the parsed XML trees
+# and compiled update plans rather than receiving them by pickling.
+_pregenState = None
+
+
+def pregenRoot(mapper):
+    return pathjoin(mapper.sim_dir, PREGEN_XML_NAME)
+
+def pregenTrialDir(mapper, trialNum, create=False):
+    return dirFromNumber(trialNum, prefix=pregenRoot(mapper), create=create)
+
+def _inputDigest(mapper):
+    """
+    Compute a digest of the simulation's trial data and parameter file, which
+    identifies the inputs from which the pre-generated files were written.
+    """
+    return fingerprint([fileHash(mapper.trial_data_file),
+                        fileHash(mapper.get_app_xml_param_file())])
+
+
+def _generateTrials(trialNums):
+    """
+    Apply the trial data for each trial in ``trialNums`` to the parsed XML trees
+    and write the modified files to each trial's directory under "pregen-xml".
+    Runs in a pool worker (or in the main process if no pool is used).
+
+    :return: (int) the number of trials generated
+    """
+    simId, df, xmlFiles, mapper, compact = _pregenState
+
+    for trialNum in trialNums:
+        trialNum = int(trialNum)
+        XMLParameter.applyTrial(simId, trialNum, df)
+
+        outDir = pregenTrialDir(mapper, trialNum, create=True)
+        trialDir = dirFromNumber(trialNum, prefix=mapper.sim_dir)
+
+        for xmlFile in xmlFiles:
+            path = pathjoin(outDir, os.path.basename(xmlFile.getRelPath()))
+            tmp_path = path + '.tmp'
+
+            inputFile = xmlFile.inputFile
+            if inputFile.writeFuncs:
+                # WriteFuncs may edit arbitrary parts of the tree, so they operate on
+                # a copy to keep their edits from accumulating across trials.
+                tree = xmlFile.tree
+                xmlFile.tree = deepcopy(tree)
+                try:
+                    inputFile.callFileFunctions(xmlFile, trialDir)
+                    xmlFile.writeTrialFile(tmp_path, compact=compact)
+                finally:
+                    xmlFile.tree = tree
+            else:
+                xmlFile.writeTrialFile(tmp_path, compact=compact)
+
+            os.replace(tmp_path, path)  # so partially written files are never consumed
+
+    return len(trialNums)
+
+
+def pregenerateTrialXml(mapper, trialNums, jobs=1):
+    """
+    Parse each XML input file modified by parameters.xml once, and write the
+    modified version of each file for every trial in ``trialNums``. The XPath
+    queries are run once; each trial then applies the compiled update plans of
+    all parameters to the parsed trees. Trials are divided among ``jobs`` worker
+    processes, which inherit the parsed trees by forking.
+
+    The source files are those referenced by the baseline's config file for the
+    trial identified by ``mapper.context``, which must already have been set up,
+    e.g., using ``gt runsim --trials N --noGCAM``.
+
+    :param mapper: (SimFileMapper) a mapper for the baseline scenario of the template trial
+    :param trialNums: (list of int) the trials to generate
+    :param jobs: (int) the number of worker processes to use
+    :return: none
+    """
+    import multiprocessing as mp
+    import numpy as np
+    from concurrent.futures import ProcessPoolExecutor
+
+    global _pregenState
+
+    config_path = mapper.get_config_version(FileVersions.TRIAL_XML)
+    if not os.path.exists(config_path):
+        raise PygcamMcsUserError(f"Can't pre-generate trial XML: config file '{config_path}' for the template "
+                                 f"trial doesn't exist. Run setup for trial {mapper.context.trialNum} first.")
+
+    paramFile = XMLParameterFile(mapper.get_app_xml_param_file())
+    paramFile.loadInputFiles(mapper)
+    paramFile.runQueries()      # also compiles each parameter's update plan
+
+    xmlFiles = list(XMLInputFile.getModifiedXMLFiles())
+
+    # If trial data has been applied to the template trial, its config file refers
+    # to modified files, which would cause trial data to be applied twice.
+    trial_xml_dir = pathjoin(mapper.trial_dir(), TRIAL_XML_NAME, abspath=True) + os.sep
+    applied = [xmlFile.getAbsPath() for xmlFile in xmlFiles if xmlFile.getAbsPath().startswith(trial_xml_dir)]
+    if applied:
+        raise PygcamMcsUserError(f"Can't pre-generate trial XML: the config file for template trial "
+                                 f"{mapper.context.trialNum} refers to files modified by trial data, e.g., "
+                                 f"'{applied[0]}'. Run setup for the template trial using --noGCAM.")
+    df = loadTrialData(mapper)
+    compact = getParamAsBoolean('MCS.TrialXmlCompact')
+
+    # Record the file written for each config component so trials can install them,
+    # and the digest of the inputs so stale files are never installed.
+    mkdirs(pregenRoot(mapper))
+    components = {xmlFile.inputFile.getComponentName(): os.path.basename(xmlFile.getRelPath())
+                  for xmlFile in xmlFiles}
+
+    with open(pathjoin(pregenRoot(mapper), PREGEN_MANIFEST), 'w') as f:
+        json.dump({'digest': _inputDigest(mapper), 'components': components}, f, indent=2)
+
+    _pregenState = (mapper.sim_id, df, xmlFiles, mapper, compact)
+
+    start = time.time()
+    trialNums = sorted(trialNums)
+    jobs = max(1, min(jobs, len(trialNums)))
+
+    if jobs == 1 or 'fork' not in mp.get_all_start_methods():
+        count = _generateTrials(trialNums)
+    else:
+        chunks = np.array_split(np.array(trialNums), jobs)
+        with ProcessPoolExecutor(max_workers=jobs, mp_context=mp.get_context('fork')) as pool:
+            count = sum(pool.map(_generateTrials, chunks))
+
+    _pregenState = None
+    _logger.info(f"Pre-generated {len(xmlFiles)} XML files for {count} trials in {time.time() - start:.1f} seconds")
+
+
+def installPregeneratedFiles(mapper):
+    """
+    If XML files were pre-generated for the current trial, link them into the
+    trial's trial-xml directory and update the trial's config file to refer to
+    them. This replaces reading parameters.xml and applying trial data.
+
+    :param mapper: (SimFileMapper) the mapper for the current trial's baseline
+    :return: (bool) True if the pre-generated files were installed, False if none
+        (or not all of them) exist for this trial, or if they were generated from
+        trial data or a parameter file other than the simulation's current ones.
+    """
+    manifest = pathjoin(pregenRoot(mapper), PREGEN_MANIFEST)
+    if not os.path.exists(manifest):
+        return False
+
+    with open(manifest) as f:
+        info = json.load(f)
+
+    if not isinstance(info.get('components'), dict) or info.get('digest') != _inputDigest(mapper):
+        _logger.warning(f"Pre-generated XML files in '{pregenRoot(mapper)}' don't match the current trial "
+                        f"data and parameter file; applying trial data")
+        return False
+
+    components = info['components']
+
+    srcDir = pregenTrialDir(mapper, mapper.context.trialNum)
+    if not all(os.path.exists(pathjoin(srcDir, basename)) for basename in components.values()):
+        _logger.warning(f"Pre-generated XML files are missing in '{srcDir}'; applying trial data")
+        return False
+
+    config_path = mapper.get_config_version(FileVersions.TRIAL_XML)
+    config_file = XMLConfigFile.get_instance(config_path)
+    scen_trial_dir = pathjoin(mapper.trial_dir(), TRIAL_XML_NAME, mapper.scenario, create=True)
+
+    for comp_name, basename in components.items():
+        src = pathjoin(srcDir, basename)
+        dst = pathjoin(scen_trial_dir, basename)
+
+        if os.path.lexists(dst):
+            os.unlink(dst)      # avoid writing through a link to another file
+
+        _logger.info(f"Linking pre-generated {src} to {dst}")
+        try:
+            os.link(src, dst)
+        except OSError as e:
+            _logger.debug(f"Can't link {dst} to {src}: {e}")
+            filecopy(src, dst)
+
+        if not comp_name.lower().endswith('.xml'):
+            exe_rel_path = os.path.relpath(dst, start=mapper.sandbox_exe_dir)
+            config_file.update_component_pathname(comp_name, exe_rel_path)
+
+    config_file.write()
+    return True
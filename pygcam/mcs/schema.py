@@ -85,6 +85,17 @@ class Run(CoreMCSMixin, ORMBase):
     status    = Column(String,   nullable=True)
     __table_args__ = (Index("run_index1", "simId", "trialNum", "expId", unique=True),)
 
+class Accumulator(CoreMCSMixin, ORMBase):
+    """
+    Running statistics of an output for a simulation and experiment, stored as
+    JSON, which are updated as results are saved. See accumulator.py.
+    """
+    simId    = Column(Integer, ForeignKey('sim.simId', ondelete="CASCADE"), primary_key=True)
+    expId    = Column(Integer, ForeignKey('experiment.expId', ondelete="CASCADE"), primary_key=True)
+    outputId = Column(Integer, ForeignKey('output.outputId', ondelete="CASCADE"), primary_key=True)
+    state    = Column(String)
+    stamp    = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
 class Sim(CoreMCSMixin, ORMBase):
     simId       = Column(Integer, primary_key=True)
     trials      = Column(Integer)
@@ -0,0 +1,196 @@
+'''
+Variance-based global sensitivity analysis: generation of Saltelli sample
+designs and estimation of first-order and total-effect Sobol indices with
+bootstrap confidence intervals.
+
+References:
+  Saltelli, A., et al. (2010) Variance based sensitivity analysis of model output.
+  Design and estimator for the total sensitivity index. Comput. Phys. Commun. 181:259-270.
+
+Copyright (c) 2023 Richard Plevin. See the file COPYRIGHT.txt for details.
+'''
+import json
+
+import numpy as np
+from pandas import DataFrame
+
+from ..log import getLogger
+from .error import PygcamMcsUserError
+from .QMC import qmcPoints
+
+_logger = getLogger(__name__)
+
+
+def saltelliDesign(paramList, baseSamples, columns=None, skip=None, seed=None):
+    """
+    Generate a Saltelli sample design for ``d`` parameters (excluding those in
+    ``skip``) with ``baseSamples`` base samples, i.e., baseSamples * (d + 2) trials.
+    Two independent matrices A and B are drawn from a scrambled Sobol sequence of
+    dimension 2d, and the design is organized in blocks of d + 2 trials: A's row,
+    then the d rows of A with one column taken from B, then B's row.
+
+    :param paramList: (list of rv-like objects) objects that implement ppf()
+    :param baseSamples: (int) the number of base samples, ideally a power of 2
+    :param columns: (None or list(str)) Column names to use to return a DataFrame.
+    :param skip: (list of params) Parameters to process later because they are
+           dependent on other parameter values (e.g., they're "linked").
+    :param seed: (int or None) the seed for scrambling the Sobol sequence
+    :return: (ndarray or DataFrame, list of int) the design, and the indices of
+        the parameters that are dimensions of the design.
+    """
+    skip = skip or []
+    active = [i for i, param in enumerate(paramList) if param not in skip]
+    d = len(active)
+    if d == 0:
+        raise PygcamMcsUserError("A Saltelli design requires at least one parameter")
+
+    points = qmcPoints('sobol', 2 * d, baseSamples, seed=seed)
+    A = points[:, :d]
+    B = points[:, d:]
+
+    # Shape (baseSamples, d + 2, d): A, AB_1 ... AB_d, B
+    blocks = np.repeat(A[:, np.newaxis, :], d + 2, axis=1)
+    dims = np.arange(d)
+    blocks[:, 1 + dims, dims] = B[:, dims]
+    blocks[:, d + 1, :] = B
+
+    percentiles = blocks.reshape(-1, d)
+    samples = np.zeros((percentiles.shape[0], len(paramList)))
+
+    for dim, i in enumerate(active):
+        samples[:, i] = paramList[i].ppf(percentiles[:, dim])
+
+    result = DataFrame(samples, columns=columns) if columns else samples
+    return result, active
+
+
+def saveDesignInfo(filename, baseSamples, paramNames):
+    """
+    Save the information required to analyze results of a Saltelli design.
+    """
+    with open(filename, 'w') as f:
+        json.dump({'baseSamples': baseSamples, 'parameters': paramNames}, f, indent=2)
+
+
+def readDesignInfo(filename):
+    """
+    Read the information saved by saveDesignInfo().
+
+    :return: (int, list of str) the number of base samples and the parameter names
+    """
+    try:
+        with open(filename) as f:
+            info = json.load(f)
+    except OSError as e:
+        raise PygcamMcsUserError(f"Can't read Saltelli design info: {e}. Was the simulation "
+                                 f"generated using 'gensim --method saltelli'?")
+
+    return info['baseSamples'], info['parameters']
+
+
+def _sobolEstimates(fA, fB, fAB):
+    """
+    Compute first-order and total-effect indices from model outputs for the A and
+    B matrices, shape (..., N, K), and for the AB matrices, shape (..., N, d, K),
+    where N is the number of base samples, d the number of parameters, and K the
+    number of outputs. Leading dimensions (e.g., bootstrap replicates) are preserved.
+
+    :return: (S1, ST) arrays of shape (..., d, K)
+    """
+    var = np.var(np.concatenate([fA, fB], axis=-2), axis=-2)[..., np.newaxis, :]
+    fA = fA[..., np.newaxis, :]
+    fB = fB[..., np.newaxis, :]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        S1 = np.mean(fB * (fAB - fA), axis=-3) / var             # Saltelli et al. (2010)
+        ST = 0.5 * np.mean((fA - fAB) ** 2, axis=-3) / var       # Jansen (1999)
+
+    return S1, ST
+
+
+def sobolIndices(Y, numParams, bootstrap=1000, confLevel=0.95, seed=None, chunkSize=100):
+    """
+    Estimate first-order and total-effect Sobol indices for all outputs at once
+    from results of a Saltelli design (see saltelliDesign()), with bootstrap
+    confidence intervals.
+
+    :param Y: (array-like) model outputs with shape (N * (numParams + 2), K), in the
+        order of trials in the design, for K outputs. Rows with missing values are
+        not allowed; drop incomplete blocks of trials first.
+    :param numParams: (int) the number of parameters, d, in the design
+    :param bootstrap: (int) the number of bootstrap resamples; 0 to skip
+    :param confLevel: (float) the confidence level of the intervals
+    :param seed: (int or None) seed for the bootstrap resampling
+    :param chunkSize: (int) the number of bootstrap replicates to draw at once
+    :return: (dict of numpy.ndarray) keys 'S1', 'ST', and if bootstrap > 0, 'S1_lo',
+        'S1_hi', 'ST_lo', 'ST_hi', each with shape (d, K).
+    """
+    Y = np.asarray(Y, dtype=float)
+    if Y.ndim == 1:
+        Y = Y[:, np.newaxis]
+
+    d = numParams
+    rows, K = Y.shape
+    if rows % (d + 2):
+        raise PygcamMcsUserError(f"Number of results ({rows}) is not a multiple of the block size of the "
+                                 f"Saltelli design ({d + 2})")
+
+    Y = Y.reshape(-1, d + 2, K)
+    fA, fAB, fB = Y[:, 0, :], Y[:, 1:d + 1, :], Y[:, d + 1, :]
+
+    S1, ST = _sobolEstimates(fA, fB, fAB)
+    result = {'S1': S1, 'ST': ST}
+
+    if bootstrap > 0:
+        N = Y.shape[0]
+        rng = np.random.default_rng(seed)
+        S1_boot = np.empty((bootstrap, d, K))
+        ST_boot = np.empty((bootstrap, d, K))
+
+        # Rather than materializing the resampled outputs, which would take
+        # chunkSize * N * d * K values, each replicate is represented by the number
+        # of times each base sample is drawn, so the means in the estimators become
+        # products of these counts with per-sample terms computed once. The outputs
+        # are centered before computing the variance, which doesn't change it.
+        center = np.mean(np.concatenate([fA, fB]), axis=0)
+        a, b = fA - center, fB - center
+        terms = np.hstack([a + b,
+                           a ** 2 + b ** 2,
+                           (fB[:, np.newaxis, :] * (fAB - fA[:, np.newaxis, :])).reshape(N, d * K),
+                           ((fA[:, np.newaxis, :] - fAB) ** 2).reshape(N, d * K)])
+
+        for start in range(0, bootstrap, chunkSize):
+            count = min(chunkSize, bootstrap - start)
+            idx = rng.integers(0, N, size=(count, N)) + N * np.arange(count)[:, np.newaxis]
+            draws = np.bincount(idx.ravel(), minlength=count * N).reshape(count, N)
+            means = draws @ terms / N
+
+            mean = means[:, :K] / 2
+            var = (means[:, K:2 * K] / 2 - mean ** 2)[:, np.newaxis, :]
+
+            with np.errstate(divide='ignore', invalid='ignore'):
+                S1_boot[start:start + count] = means[:, 2 * K:(d + 2) * K].reshape(count, d, K) / var
+                ST_boot[start:start + count] = 0.5 * means[:, (d + 2) * K:].reshape(count, d, K) / var
+
+        alpha = (1 - confLevel) / 2
+        result['S1_lo'], result['S1_hi'] = np.nanquantile(S1_boot, [alpha, 1 - alpha], axis=0)
+        result['ST_lo'], result['ST_hi'] = np.nanquantile(ST_boot, [alpha, 1 - alpha], axis=0)
+
+    return result
+
+
+def sobolIndicesDF(Y, paramNames, outputNames, **kwargs):
+    """
+    Call sobolIndices() and return the results as a DataFrame with columns
+    'output', 'parameter', and one column per index and confidence bound.
+    """
+    result = sobolIndices(Y, len(paramNames), **kwargs)
+
+    d, K = len(paramNames), len(outputNames)
+    df = DataFrame({'output': np.tile(outputNames, d),
+                    'parameter': np.repeat(paramNames, K)})
+
+    for key, values in result.items():
+        df[key] = values.reshape(d * K)
+
+    return df.sort_values(['output', 'parameter']).reset_index(drop=True)
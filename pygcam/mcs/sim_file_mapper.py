@@ -25,6 +25,8 @@ _logger = getLogger(__name__)
 
 TRIAL_DATA_CSV = 'trial_data.csv'
 ARGS_SAVE_FILE = 'gensim-args.txt'
+SEED_FILE = 'seed.txt'
+SALTELLI_FILE = 'saltelli.json'
 
 class SimFileMapper(AbstractFileMapper):
     """
@@ -89,6 +91,8 @@ class SimFileMapper(AbstractFileMapper):
 
         self.trial_data_file = pathjoin(sim_dir, TRIAL_DATA_CSV)
         self.args_save_file  = pathjoin(sim_dir, ARGS_SAVE_FILE)
+        self.seed_file       = pathjoin(sim_dir, SEED_FILE)
+        self.saltelli_file   = pathjoin(sim_dir, SALTELLI_FILE)
         self.sim_app_xml     = pathjoin(sim_dir, APP_XML_NAME, create=True)
 
         # TBD: still needed? This is a pretty confusing way to transmit info
@@ -145,6 +149,22 @@ class SimFileMapper(AbstractFileMapper):
         # absolute paths. Note that gcam_path requires self.sandbox_exe_dir to be set first.
         self.scenario_gcam_xml_dir = self.gcam_path('../input/gcamdata/xml')
 
+    def set_sim_dir(self, sim_dir):
+        """
+        Relocate the trial-dependent pathnames (sandbox, trial-xml, query results,
+        etc.) of this mapper and its parent mapper below ``sim_dir``. This is used
+        to run a trial in a copy of its sandbox on node-local storage. Pathnames
+        that are not trial-dependent (e.g., the trial data file) are unchanged.
+
+        :param sim_dir: (str) the directory to use in place of the simulation directory
+        :return: nothing
+        """
+        self.sim_dir = sim_dir
+        self._set_trial_dependent_ivars(self.scenario, create_dirs=False)
+
+        if self.parent_mapper:
+            self.parent_mapper.set_sim_dir(sim_dir)
+
     # TBD: might not be useful since ivars are not reset to match context.
     #   Used only in one place and use is questionable.
     def set_context(self, ctx : McsContext):
@@ -474,6 +494,23 @@ class SimFileMapper(AbstractFileMapper):
 
         df.to_csv(data_file, index_label='trialNum')
 
+    def read_seed(self):
+        """
+        Return the random seed saved by write_seed(), or None if there is none.
+        """
+        try:
+            with open(self.seed_file) as f:
+                return int(f.read())
+        except (OSError, ValueError):
+            return None
+
+    def write_seed(self, seed):
+        """
+        Save the random seed used to generate this simulation's trial data.
+        """
+        with open(self.seed_file, 'w') as f:
+            f.write(f"{seed}\n")
+
 def get_mapper(scenario, **kwargs) -> Union[FileMapper, SimFileMapper]:
     tool = GcamTool.getInstance()
 
@@ -5,7 +5,7 @@ import time
 import ipyparallel as ipp
 
 from ..config import (getConfig, getParam, setParam, getParamAsFloat,
-                      getParamAsBoolean)
+                      getParamAsBoolean, pathjoin, mkdirs)
 from ..constants import FileVersions
 from ..error import GcamError, GcamSolverError, FileMissingError
 from ..file_utils import deleteFile
@@ -16,7 +16,8 @@ from .error import PygcamMcsUserError, GcamToolError
 from .database import (RUN_SUCCEEDED, RUN_FAILED, RUN_KILLED, RUN_ABORTED,
                        RUN_UNSOLVED, RUN_GCAMERROR, RUN_RUNNING)
 from .sim_file_mapper import SimFileMapper
-from .XMLParameterFile import XMLParameter, XMLParameterFile, decache
+from .pregenerate import installPregeneratedFiles
+from .XMLParameterFile import XMLParameter, XMLParameterFile, loadTrialData, decache
 
 # Status codes for invoked programs
 RUNNER_SUCCESS = 0
@@ -94,8 +95,6 @@ def _runGcamTool(mapper, argDict):
 
     noSetup = argDict.get('noSetup', False)
     noGCAM = argDict.get('noGCAM', False)
-    noBatchQueries = argDict.get('noBatchQueries', False)
-    noPostProcessor = argDict.get('noPostProcessor', False)
 
     # For running in an ipyparallel engine, forget instances from last run
     decache()
@@ -129,23 +128,38 @@ def _runGcamTool(mapper, argDict):
         # TBD: should have been done by setup_steps above
         # mapper.copy_config_version(FileVersions.LOCAL_XML, FileVersions.TRIAL_XML)
 
-        paramFile = readParameterInfo(mapper)   # TBD: could update config.xml here, or in XMLInputFile.loadFiles()
-
-        df = mapper.read_trial_data_file()
-        columns = df.columns
-
-        # add data for linked columns if not present
-        linkPairs = XMLParameter.getParameterLinks()
-        for linkName, dataCol in linkPairs:
-            if linkName not in columns:
-                df[linkName] = df[dataCol]
-
-        applySingleTrialData(df, mapper, paramFile) # TBD: Or, could update config.xml here, where trial-xml files are written
+        # Use files written by "gensim --pregenerate", if available
+        if not installPregeneratedFiles(mapper):
+            paramFile = readParameterInfo(mapper)   # TBD: could update config.xml here, or in XMLInputFile.loadFiles()
+            df = loadTrialData(mapper)
+            applySingleTrialData(df, mapper, paramFile) # TBD: Or, could update config.xml here, where trial-xml files are written
 
     # TBD: error: overwrites edited config.xml with parent copy without renaming scenario
     # if not isBaseline and not noGCAM:
     #     mapper.copy_config_version(FileVersions.PARENT, FileVersions.TRIAL_XML)
 
+    stager = TrialStager(mapper) if getParamAsBoolean('MCS.StageTrials') and not noGCAM else None
+
+    if stager and stager.stage():
+        try:
+            status = _runGcamAndPostProcess(mapper, argDict)
+        finally:
+            stager.unstage()
+    else:
+        status = _runGcamAndPostProcess(mapper, argDict)
+
+    _logger.info(f"_runGcamTool: exiting with status {status}")
+    return status
+
+def _runGcamAndPostProcess(mapper, argDict):
+    """
+    Run GCAM, the batch queries, and post-processing steps for a trial whose
+    setup is complete, and return the exit status.
+    """
+    noGCAM = argDict.get('noGCAM', False)
+    noBatchQueries = argDict.get('noBatchQueries', False)
+    noPostProcessor = argDict.get('noPostProcessor', False)
+
     if noGCAM:
         _logger.info('_runGcamTool: skipping GCAM')
         gcamStatus = 0
@@ -171,10 +185,136 @@ def _runGcamTool(mapper, argDict):
     else:
         status = RUNNER_FAILURE
 
-    _logger.info(f"_runGcamTool: exiting with status {status}")
     return status
 
 
+def _treeSize(path, followLinks):
+    """
+    Return the total size in bytes of the files below ``path``.
+    """
+    total = 0
+    for dirpath, dirnames, filenames in os.walk(path, followlinks=followLinks):
+        for name in filenames:
+            try:
+                st = os.stat(os.path.join(dirpath, name), follow_symlinks=followLinks)
+                total += st.st_size
+            except OSError:
+                pass    # e.g., broken link
+
+    return total
+
+
+class TrialStager(object):
+    """
+    Copies a trial's sandbox to node-local storage, redirects the mapper to the copy,
+    and, after the trial runs, copies selected results back to the trial directory on
+    the shared file system and deletes the local copy. See MCS.StageTrials.
+    """
+    def __init__(self, mapper):
+        self.mapper = mapper
+        self.shared_sim_dir = mapper.sim_dir
+        self.shared_trial_dir = mapper.trial_dir()
+        self.shared_scenario_dir = mapper.sandbox_scenario_dir
+        self.stage_root = getParam('MCS.StageDir')
+        self.deref_links = getParamAsBoolean('MCS.StageDereferenceLinks')
+        self.stage_dir = None
+
+    def _copyTree(self, src, dst, ignore=None):
+        import shutil
+
+        if os.path.isdir(src):
+            shutil.copytree(src, dst, symlinks=not self.deref_links, ignore=ignore, dirs_exist_ok=True)
+
+    def _sources(self):
+        """
+        Return a list of (src, relpath) tuples identifying the directories to stage,
+        where relpath is relative to the trial directory.
+        """
+        from ..constants import TRIAL_XML_NAME
+
+        mapper = self.mapper
+        trial_dir = self.shared_trial_dir
+        sources = [(pathjoin(trial_dir, TRIAL_XML_NAME), TRIAL_XML_NAME),
+                   (self.shared_scenario_dir, os.path.relpath(self.shared_scenario_dir, trial_dir))]
+
+        # The "diff" step requires the baseline's query results
+        pmapper = mapper.parent_mapper
+        if pmapper:
+            src = pmapper.sandbox_query_results_dir
+            sources.append((src, os.path.relpath(src, trial_dir)))
+
+        return sources
+
+    def stage(self):
+        """
+        Copy the trial sandbox to node-local storage and point the mapper at the copy.
+
+        :return: (bool) True if the trial was staged, False if there was insufficient
+            space, in which case the trial should run in place.
+        """
+        import shutil
+        from tempfile import mkdtemp
+        from ..constants import OUTPUT_DIRNAME
+
+        mapper = self.mapper
+        sources = self._sources()
+
+        required = sum(_treeSize(src, self.deref_links) for src, _ in sources if os.path.isdir(src))
+        reserve = getParamAsFloat('MCS.StageReserveGB') * 1024 ** 3
+
+        mkdirs(self.stage_root)
+        free = shutil.disk_usage(self.stage_root).free
+
+        if required + reserve > free:
+            _logger.warning(f"Insufficient space to stage trial in '{self.stage_root}': need "
+                            f"{required + reserve:,.0f} bytes, {free:,} available. Running trial in place.")
+            return False
+
+        self.stage_dir = mkdtemp(prefix='pygcam-stage-', dir=self.stage_root)
+        stage_trial_dir = os.path.join(self.stage_dir, os.path.relpath(self.shared_trial_dir, self.shared_sim_dir))
+
+        scenario_dir = self.shared_scenario_dir
+
+        def ignore_output(dirname, names):
+            # GCAM's output directory is recreated locally
+            return [OUTPUT_DIRNAME] if dirname == scenario_dir else []
+
+        start = time.time()
+        for src, relpath in sources:
+            self._copyTree(src, pathjoin(stage_trial_dir, relpath), ignore=ignore_output)
+
+        mapper.set_sim_dir(self.stage_dir)
+        mkdirs(mapper.sandbox_output_dir)
+        os.chdir(mapper.sandbox_exe_dir)
+
+        _logger.info(f"Staged {required:,} bytes for trial in '{stage_trial_dir}' in "
+                     f"{_secondsToStr(time.time() - start)}")
+        return True
+
+    def unstage(self):
+        """
+        Copy the directories named in MCS.StageCopyBack to the trial directory on the
+        shared file system, restore the mapper's pathnames, and delete the local copy.
+        """
+        import shutil
+
+        mapper = self.mapper
+        stage_scenario_dir = mapper.sandbox_scenario_dir
+
+        try:
+            for relpath in getParam('MCS.StageCopyBack').split():
+                src = pathjoin(stage_scenario_dir, relpath)
+                if os.path.isdir(src):
+                    _logger.debug(f"Copying '{src}' to shared trial directory")
+                    shutil.copytree(src, pathjoin(self.shared_scenario_dir, relpath), dirs_exist_ok=True)
+        finally:
+            mapper.set_sim_dir(self.shared_sim_dir)
+            os.chdir(mapper.sandbox_exe_dir)   # avoid deleting the current directory
+
+            _logger.debug(f"Removing staged trial '{self.stage_dir}'")
+            shutil.rmtree(self.stage_dir, ignore_errors=True)
+
+
 class WorkerResult(object):
     '''
     Encapsulates the results returned from a worker task.
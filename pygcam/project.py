@@ -15,7 +15,7 @@ import sys
 
 from lxml import etree as ET
 
-from .config import getParam, setParam, getConfigDict, unixPath, pathjoin
+from .config import getParam, setParam, getConfigDict, unixPath, pathjoin, mkdirs
 from .error import PygcamException, CommandlineError, FileFormatError
 from .file_mapper import FileMapper
 from .log import getLogger
@@ -180,6 +180,10 @@ class Step(object):
         self.optional = getBooleanXML(node.get('optional', 0))
         self.command = minWhitespace(node.text)
 
+        # None => use the default dependencies; see Project.buildStepGraph
+        dependsOn = node.get('dependsOn')
+        self.dependsOn = [name.strip() for name in dependsOn.split(',') if name.strip()] if dependsOn else None
+
         if not self.command:
             raise FileFormatError(f"<step name='{self.name}'> is missing command text")
 
@@ -192,13 +196,16 @@ class Step(object):
     def __str__(self):
         return f"<Step name='{self.name}' seq='{self.seq}' runFor='{self.runFor}'>{self.command}</Step>"
 
-    def run(self, mapper : FileMapper, argDict, tool, noRun=False):
+    def runsFor(self, is_baseline):
+        """
+        Return whether this step is run for a baseline (if ``is_baseline``) or policy scenario.
+        """
         runFor = self.runFor
-        is_baseline = mapper.is_baseline
-        is_policy = not is_baseline
+        return runFor == 'all' or runFor == ('baseline' if is_baseline else 'policy')
 
+    def run(self, mapper : FileMapper, argDict, tool, noRun=False):
         # See if this step should be run.
-        if runFor != 'all' and ((is_baseline and runFor != 'baseline') or (is_policy and runFor != 'policy')):
+        if not self.runsFor(mapper.is_baseline):
             return
 
         # User can substitute an empty command to delete a default step
@@ -519,8 +526,6 @@ class Project(XMLFile):
         to create the command to execute in the shell. Variables are defined in
         the <vars> section of the project XML file.
         """
-        from .mcs.sim_file_mapper import get_mapper
-
         projectName = self.projectName
         scenarioGroupName = self.scenarioGroupName
 
@@ -561,7 +566,6 @@ class Project(XMLFile):
         self.validateProjectArgs(scenarios, knownScenarios, 'scenarios')
         self.validateProjectArgs(steps,     knownSteps,     'steps')
 
-        quitProgram = not args.noQuit
         run = not args.noRun
 
         scenarios = self.sortScenarios(scenarios)
@@ -572,6 +576,12 @@ class Project(XMLFile):
         shellArgs = dropArgs(shellArgs, '-D', '--distribute', takesArgs=False)
         shellArgs = dropArgs(shellArgs, '-a', '--allGroups', takesArgs=False)
 
+        # Run the (scenario, step) dependency graph, possibly in parallel local processes
+        if (args.jobs > 1 or args.resume) and not (args.distribute or args.noRun):
+            graph = self.buildStepGraph(scenarios, steps, explicitSteps)
+            self.runStepGraph(graph, shellArgs, args, tool)
+            return
+
         baselineJobId = None
 
         for scenarioName in scenarios:
@@ -593,41 +603,232 @@ class Project(XMLFile):
 
                 continue
 
-            mapper = get_mapper(scenarioName, scenario_group=scenarioGroupName)
-
-            argDict['scenario'] = scenarioName
-            argDict['sandboxDir'] = mapper.sandbox_dir
-            argDict['scenarioDir'] = mapper.sandbox_scenario_dir
-            argDict['batchDir'] = mapper.sandbox_query_results_dir
-            argDict['diffsDir'] = mapper.sandbox_diffs_dir
-
-            # Evaluate dynamic variables and re-generate temporary files, saving paths in
-            # variables indicated in <tmpFile> or <queries> elements. This is in the scenario
-            # loop so run-time variables are handled correctly, though it does result in the
-            # files being written multiple times (though with different values.)
-            Variable.evaluateVars(argDict)
-            _TmpFileBase.writeFiles(argDict)
-
-            try:
-                # Loop over all steps and run those that user has requested
-                for step in self.sortedSteps:
-                    group = step.group
-                    if step.name in steps and (not group or                            # no group specified
-                                               group == scenarioGroupName or           # exact match
-                                               re.match(group, scenarioGroupName)):    # pattern match
-                        # Skip optional steps unless explicitly mentioned
-                        if step.optional and step.name not in explicitSteps:
-                            continue
-
-                        argDict['step'] = step.name
-                        step.run(mapper, argDict, tool, noRun=args.noRun)
-
-            except PygcamException as e:
-                if quitProgram:
-                    raise
-
-                _logger.error(f"Error running step '{step.name}': {e}")
+            self.runScenario(scenarioName, steps, explicitSteps, args, tool)
+
+    def stepsToRun(self, steps, explicitSteps):
+        """
+        Return the steps, in sequence order, to run for the current scenario group.
+
+        :param steps: (set of str) the names of the steps to run
+        :param explicitSteps: (list of str) the steps named on the command-line,
+            which are the only ones for which "optional" steps are run
+        :return: (list of Step)
+        """
+        scenarioGroupName = self.scenarioGroupName
+
+        def selected(step):
+            group = step.group
+            return (step.name in steps and
+                    (not group or                           # no group specified
+                     group == scenarioGroupName or          # exact match
+                     re.match(group, scenarioGroupName)) and    # pattern match
+                    (not step.optional or step.name in explicitSteps))  # skip optional steps unless explicitly mentioned
+
+        return [step for step in self.sortedSteps if selected(step)]
+
+    def prepareScenario(self, scenarioName):
+        """
+        Set the run-time variables for the given scenario and return its FileMapper.
+        """
+        from .mcs.sim_file_mapper import get_mapper
+
+        argDict = self.argDict
+        mapper = get_mapper(scenarioName, scenario_group=self.scenarioGroupName)
+
+        argDict['scenario'] = scenarioName
+        argDict['sandboxDir'] = mapper.sandbox_dir
+        argDict['scenarioDir'] = mapper.sandbox_scenario_dir
+        argDict['batchDir'] = mapper.sandbox_query_results_dir
+        argDict['diffsDir'] = mapper.sandbox_diffs_dir
+
+        # Evaluate dynamic variables and re-generate temporary files, saving paths in
+        # variables indicated in <tmpFile> or <queries> elements. This is in the scenario
+        # loop so run-time variables are handled correctly, though it does result in the
+        # files being written multiple times (though with different values.)
+        Variable.evaluateVars(argDict)
+        _TmpFileBase.writeFiles(argDict)
+
+        return mapper
+
+    def runScenario(self, scenarioName, steps, explicitSteps, args, tool):
+        """
+        Run the requested steps for one scenario in the current process.
+
+        :param scenarioName: (str) the name of the scenario
+        :param steps: (set of str) the names of the steps to run
+        :param explicitSteps: (list of str) the steps named on the command-line,
+            which are the only ones for which "optional" steps are run
+        :param args: (argparse.Namespace) the arguments to the "run" sub-command
+        :param tool: (GcamTool) the tool instance, used to run internal commands
+        :return: none
+        """
+        argDict = self.argDict
+        quitProgram = not args.noQuit
+
+        mapper = self.prepareScenario(scenarioName)
+
+        try:
+            # Loop over all steps and run those that user has requested
+            for step in self.stepsToRun(steps, explicitSteps):
+                argDict['step'] = step.name
+                step.run(mapper, argDict, tool, noRun=args.noRun)
+
+        except PygcamException as e:
+            if quitProgram:
+                raise
+
+            _logger.error(f"Error running step '{step.name}': {e}")
+
+    def buildStepGraph(self, scenarioNames, steps, explicitSteps):
+        """
+        Create the graph of (scenario, step) nodes for the requested scenarios and
+        steps. A step with a "dependsOn" attribute depends on the named steps of the
+        same scenario, or of the baseline for names of the form "baseline:step".
+        Otherwise, a step depends on the prior step run for the same scenario, and
+        for a policy scenario, on the baseline's step of the same name if it's run,
+        or else on the last baseline step with a lower sequence number. Dependencies
+        on steps that aren't being run are ignored.
+
+        :param scenarioNames: (list of str) the scenarios to run, baseline first
+        :param steps: (set of str) the names of the steps to run
+        :param explicitSteps: (list of str) the steps named on the command-line
+        :return: (StepGraph) the graph
+        :raises FileFormatError: if a "dependsOn" attribute names an unknown step
+        """
+        from .step_graph import StepGraph
+
+        knownSteps = set(step.name for step in self.stepsDict.values())
+        stepList = self.stepsToRun(steps, explicitSteps)
+        graph = StepGraph()
+
+        scenarios = [self.scenarioDict[name] for name in scenarioNames]
+        scenarios = [scen for scen in scenarios if scen.isActive]
+        baseline = next((scen.name for scen in scenarios if scen.isBaseline), None)
+
+        for scenario in scenarios:
+            name = scenario.name
+            isBaseline = scenario.isBaseline
+            prior = None
+
+            for step in stepList:
+                if not step.runsFor(isBaseline):
+                    continue
+
+                node = graph.add(name, step)
+                if len(node.steps) > 1:
+                    continue        # another step of the same name, run by the same node
+
+                if step.dependsOn is not None:
+                    for dep in step.dependsOn:
+                        scenName, _, stepName = dep.rpartition(':')
+                        if stepName not in knownSteps:
+                            raise FileFormatError(f"<step name='{step.name}'> depends on unknown step '{stepName}'")
+
+                        if scenName and scenName != 'baseline':
+                            raise FileFormatError(f"<step name='{step.name}'>: dependency '{dep}' must be "
+                                                  f"a step name or 'baseline:' followed by a step name")
+
+                        graph.addDependency(node.key, (baseline if scenName else name, stepName))
+
+                else:
+                    if prior:
+                        graph.addDependency(node.key, prior.key)
+
+                    if baseline and not isBaseline:
+                        if (baseline, step.name) in graph:
+                            graph.addDependency(node.key, (baseline, step.name))
+                        else:
+                            earlier = [key for key, other in graph.nodes.items()
+                                       if other.scenario == baseline and other.seq < step.seq]
+                            if earlier:
+                                graph.addDependency(node.key, earlier[-1])
+
+                prior = node
+
+        return graph
+
+    def runStepGraph(self, graph, shellArgs, args, tool):
+        """
+        Run the nodes of the step graph. If ``args.jobs`` is greater than 1, up to that
+        many steps are run at once, each in a separate "gt run" process whose output is
+        written to "{group}-{scenario}-{step}.log" in the directory given by config
+        variable GCAM.BatchLogDir. Otherwise, steps are run in the current process.
+
+        Each completed step is recorded in the file "{group}-completed-steps.txt" in
+        the same directory. If ``args.resume`` is set, steps recorded there are not
+        run again; otherwise the file is reset before running.
+
+        :param graph: (StepGraph) the graph to run
+        :param shellArgs: (list of str) the command-line arguments to the "run"
+            sub-command, without the scenario and distribute options.
+        :param args: (argparse.Namespace) the arguments to the "run" sub-command
+        :param tool: (GcamTool) the tool instance, used to run internal commands, and
+            which holds the config variables set on the command-line with "+s", which
+            are passed to each process
+        :return: none
+        :raises PygcamException: if any step fails, unless args.noQuit is True
+        """
+        import subprocess
+
+        groupName = self.scenarioGroupName
+        quitProgram = not args.noQuit
+
+        logDir = getParam('GCAM.BatchLogDir')
+        mkdirs(logDir)
+
+        stateFile = pathjoin(logDir, f"{groupName}-completed-steps.txt")
+        completed = set()
+
+        if args.resume and os.path.exists(stateFile):
+            with open(stateFile) as f:
+                completed = set(tuple(line.rstrip('\n').split('\t')) for line in f if '\t' in line)
+        else:
+            open(stateFile, 'w').close()
+
+        # Pass along config variables set on the command-line
+        setArgs = flatten([['+s', configVar] for configVar in tool.configVars])
+        for short, long, takesArgs in (('-j', '--jobs', True), ('-g', '--group', True), ('-s', '--step', True),
+                                       ('-k', '--skipStep', True), ('-r', '--resume', False)):
+            shellArgs = dropArgs(shellArgs, short, long, takesArgs=takesArgs)
+
+        command = ['gt', '+P', self.projectName] + setArgs + shellArgs
+
+        def runProcess(node):
+            logFile = pathjoin(logDir, f"{groupName}-{node.scenario}-{node.name}.log")
+            nodeCommand = command + ['-S', node.scenario, '-s', node.name, '-g', groupName]
+            _logger.info("Running '%s', logging to '%s'", ' '.join(nodeCommand), logFile)
+
+            with open(logFile, 'w') as f:
+                status = subprocess.call(nodeCommand, stdout=f, stderr=subprocess.STDOUT)
+
+            if status:
+                raise PygcamException(f"Exit status {status}; see '{logFile}'")
+
+        def runInProcess(node):
+            mapper = self.prepareScenario(node.scenario)
+            self.argDict['step'] = node.name
+            for step in node.steps:
+                step.run(mapper, self.argDict, tool)
+
+        def recordCompletion(node):
+            with open(stateFile, 'a') as f:
+                f.write(f"{node.scenario}\t{node.name}\n")
+
+        _logger.info("Running %d steps with up to %d parallel jobs", len(graph), args.jobs)
+
+        failed, notRun = graph.run(runProcess if args.jobs > 1 else runInProcess,
+                                   jobs=args.jobs, completed=completed,
+                                   onComplete=recordCompletion, quitOnError=quitProgram)
+        if failed:
+            msg = f"Steps failed: {', '.join(map(str, failed))}"
+            if notRun:
+                msg += f"; not run: {', '.join(map(str, notRun))}"
+            msg += ". Use --resume to skip completed steps when re-running."
+
+            if quitProgram:
+                raise PygcamException(msg)
 
+            _logger.error(msg)
 
     def dump(self, steps, scenarios):
         print("Scenario group:", self.scenarioGroupName)
@@ -2,12 +2,13 @@
 .. Copyright (c) 2016 Richard Plevin
    See the https://opensource.org/licenses/MIT for license details.
 '''
+from copy import deepcopy
 from lxml import etree as ET
 
 from .config import pathjoin
 from .error import PygcamException
 from .log import getLogger
-from .xmlEditor import XMLEditor, xmlEdit, callableMethod, ENERGY_TRANSFORMATION_TAG
+from .xmlEditor import XMLEditor, CachedFile, xmlEdit, callableMethod, ENERGY_TRANSFORMATION_TAG
 
 _logger = getLogger(__name__)
 
@@ -60,16 +61,16 @@ def extractStubTechnology(region, srcFile, dstFile, sector, subsector, technolog
     else:
         xpath = f"//global-technology-database/location-info[@sector-name='{sector}' and @subsector-name='{subsector}']/technology[@name='{technology}']"
 
-    # Read the srcFile to extract the required elements
-    parser = ET.XMLParser(remove_blank_text=True)
-    tree = ET.parse(srcFile, parser)
+    # Read the srcFile to extract the required elements. The parsed file is cached,
+    # so we copy the element rather than modifying the cached tree.
+    tree = CachedFile.getFile(srcFile).tree
 
     # Rename technology => stub-technology (for global-tech-db case)
     elts = tree.xpath(xpath)
     if len(elts) != 1:
         raise PygcamException(f'XPath "{xpath}" failed')
 
-    technologyElt = elts[0]
+    technologyElt = deepcopy(elts[0])
     technologyElt.tag = 'stub-technology'       # no-op if fromRegion == True
 
     # Surround the extracted XML with the necessary hierarchy
@@ -0,0 +1,168 @@
+"""
+.. Dependency graph of (scenario, step) pairs for the "run" sub-command, and a
+   scheduler that runs each node once all of the nodes it depends on have
+   completed, running up to a given number of nodes at once.
+
+.. Copyright (c) 2023 Richard Plevin
+   See the https://opensource.org/licenses/MIT for license details.
+"""
+from collections import OrderedDict
+
+from .error import PygcamException
+from .log import getLogger
+
+_logger = getLogger(__name__)
+
+
+class StepNode(object):
+    """
+    One named step to run for one scenario. Since steps are identified on the
+    command-line by name, all steps with the same name are run by one node.
+    """
+    def __init__(self, scenario, step):
+        self.scenario = scenario
+        self.name = step.name
+        self.seq = step.seq
+        self.steps = [step]         # the project.Step instances, in sequence order
+        self.deps = set()           # keys of the nodes this node depends on
+
+    @property
+    def key(self):
+        return (self.scenario, self.name)
+
+    def __str__(self):
+        return f"{self.scenario}:{self.name}"
+
+
+class StepGraph(object):
+    """
+    A directed acyclic graph of StepNode instances, keyed by (scenario, stepName).
+    Nodes are kept in the order they're added, which is the order in which nodes
+    that are ready at the same time are started.
+    """
+    def __init__(self):
+        self.nodes = OrderedDict()
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __contains__(self, key):
+        return key in self.nodes
+
+    def add(self, scenario, step):
+        """
+        Add a node for the given scenario and step, or add the step to the existing
+        node for a step of the same name, and return the node.
+        """
+        node = self.nodes.get((scenario, step.name))
+        if node:
+            node.steps.append(step)
+        else:
+            node = StepNode(scenario, step)
+            self.nodes[node.key] = node
+
+        return node
+
+    def addDependency(self, key, depKey):
+        """
+        Declare that the node ``key`` cannot start until node ``depKey`` completes.
+        Dependencies on nodes that aren't in the graph, e.g., steps that weren't
+        requested, are ignored.
+        """
+        if depKey in self.nodes and depKey != key:
+            self.nodes[key].deps.add(depKey)
+
+    def checkCycles(self):
+        """
+        :raises PygcamException: if the graph contains a cycle
+        """
+        visiting, done = set(), set()
+
+        def visit(key, path):
+            if key in done:
+                return
+            if key in visiting:
+                cycle = path[path.index(key):] + [key]
+                raise PygcamException("Step dependencies form a cycle: " +
+                                      ' -> '.join(str(self.nodes[k]) for k in cycle))
+            visiting.add(key)
+            for dep in sorted(self.nodes[key].deps):
+                visit(dep, path + [key])
+            visiting.remove(key)
+            done.add(key)
+
+        for key in self.nodes:
+            visit(key, [])
+
+    def run(self, runNode, jobs=1, completed=(), onComplete=None, quitOnError=True):
+        """
+        Run the nodes of the graph, each after the nodes it depends on have completed.
+
+        :param runNode: (callable) called with a StepNode to run it; it should raise
+            an exception if the step fails.
+        :param jobs: (int) the maximum number of nodes to run at once. If 1, nodes
+            are run in the calling thread; otherwise each is run in a worker thread,
+            so ``runNode`` should run the step in a separate process.
+        :param completed: (iterable of keys) nodes completed by a previous run, which
+            are treated as complete and not run again.
+        :param onComplete: (callable or None) called with each StepNode that completes
+        :param quitOnError: (bool) if True, no further nodes are started after a node fails.
+        :return: (tuple of lists of StepNode) the nodes that failed, and those that were
+            not run because a node they depend on failed or ``quitOnError`` stopped the run.
+        """
+        from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+        self.checkCycles()
+
+        done = set(key for key in completed if key in self.nodes)
+        pending = [key for key in self.nodes if key not in done]
+        failed = []
+
+        if done:
+            _logger.info("Skipping %d steps completed previously", len(done))
+
+        def ready():
+            return [key for key in pending if self.nodes[key].deps <= done]
+
+        def finished(key, exc):
+            node = self.nodes[key]
+            if exc is None:
+                done.add(key)
+                _logger.info("Completed %s", node)
+                if onComplete:
+                    onComplete(node)
+            else:
+                failed.append(node)
+                _logger.error("Failed %s: %s", node, exc)
+
+        if jobs <= 1:
+            while pending and not (failed and quitOnError):
+                keys = ready()
+                if not keys:
+                    break
+
+                key = keys[0]
+                pending.remove(key)
+                try:
+                    runNode(self.nodes[key])
+                    finished(key, None)
+                except Exception as e:
+                    finished(key, e)
+        else:
+            running = {}
+            with ThreadPoolExecutor(max_workers=jobs) as pool:
+                while True:
+                    if not (failed and quitOnError):
+                        for key in ready()[:jobs - len(running)]:
+                            pending.remove(key)
+                            running[pool.submit(runNode, self.nodes[key])] = key
+
+                    if not running:
+                        break
+
+                    completedFutures, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in completedFutures:
+                        finished(running.pop(future), future.exception())
+
+        notRun = [self.nodes[key] for key in pending]
+        return failed, notRun
@@ -107,6 +107,7 @@ class GcamTool(object):
         decacheVariables()
 
         self.shellArgs = None
+        self.configVars = []
 
         self.parser = self.subparsers = None
         self.addParsers()
@@ -557,6 +558,7 @@ def _main(argv, mapper):
         tool.runBatch(otherArgs, run=run)
     else:
         tool.shellArgs = otherArgs  # save for project run method to use in "distribute" mode
+        tool.configVars = ns.configVars     # passed to sub-processes run with "run --jobs"
         args = tool.parser.parse_args(args=otherArgs)
         tool.run(args=args)
 
@@ -34,7 +34,8 @@ from .policy import (policyMarketXml, policyConstraintsXml, DEFAULT_MARKET_TYPE,
                      DEFAULT_POLICY_ELT, DEFAULT_POLICY_TYPE)
 from .gcam_path import GcamPath, gcam_path
 from .utils import (coercible, printSeries, splitAndStrip, getRegionList)
-from .xml_edit import CachedFile, xmlSel, xmlIns, xmlEdit, expandYearRanges
+from .xml_cache import getDocumentCache
+from .xml_edit import CachedFile, compiledXPath, xmlSel, xmlIns, xmlEdit, xmlFind, expandYearRanges
 
 _logger = getLogger(__name__)
 
@@ -228,13 +229,14 @@ class XMLEditor(object):
             self.setupDynamic(args)
 
         CachedFile.save_all_edits()
+        getDocumentCache().report()
 
     def cachedConfig(self, edited=None):
         # item = XMLConfigFile.get_instance(self.config_path)
         item = CachedFile.getFile(self.config_path)
 
-        if edited is not None:
-            item.edited = edited
+        if edited:
+            item.set_edited()
 
         return item
 
@@ -1116,44 +1118,45 @@ class XMLEditor(object):
         # convert to a list; if no regions given, get list of regions in this file
         regionList = splitAndStrip(regions, ',') if regions else tree.xpath('//region/@name')
 
-        args = []
+        # /scenario/world/region[@name='USA']/supplysector[@name='refining']/subsector[@name='biomass liquids']/interpolation-rule
+        # The xpaths use a variable for the region, so each is compiled only once.
+        subsect = f'//region[@name=$region]/{supplysectorTag}[@name="{supplysector}"]/{subsectorTag}[@name="{subsector}"]'
 
-        for region in regionList:
-            regionElt = f'//region[@name="{region}"]'
+        if stubTechnology:
+            rule_parent = subsect + f'/{technologyTag}[@name="{stubTechnology}"]'
+        else:
+            rule_parent = subsect
 
-            # /scenario/world/region[@name='USA']/supplysector[@name='refining']/subsector[@name='biomass liquids']/interpolation-rule
-            subsect = f'{regionElt}/{supplysectorTag}[@name="{supplysector}"]/{subsectorTag}[@name="{subsector}"]'
+        interp_rule = rule_parent + f'/interpolation-rule[@apply-to="{applyTo}"]'
 
-            if stubTechnology:
-                rule_parent = subsect + f'/{technologyTag}[@name="{stubTechnology}"]'
-            else:
-                rule_parent = subsect
+        args = []
 
-            interp_rule = rule_parent + f'/interpolation-rule[@apply-to="{applyTo}"]'
+        for region in regionList:
+            bindings = {'region': region}
 
-            args += [(interp_rule + '/@from-year', fromYear),
-                     (interp_rule + '/@to-year', toYear),
-                     (interp_rule + '/interpolation-function/@name', funcName)]
+            args += [(interp_rule + '/@from-year', fromYear, bindings),
+                     (interp_rule + '/@to-year', toYear, bindings),
+                     (interp_rule + '/interpolation-function/@name', funcName, bindings)]
 
             def set_or_insert_value(to_or_from_tag, value):
                 # insert interpolation-rule if not present
-                if not xmlSel(item, interp_rule):
+                if not xmlSel(item, interp_rule, bindings=bindings):
                     elt = ET.Element('interpolation-rule', attrib={'apply-to' : applyTo})
-                    xmlIns(item, rule_parent, elt)
+                    xmlIns(item, rule_parent, elt, bindings=bindings)
 
                 # insert interpolation-function if not present
                 interp_func = interp_rule + '/interpolation-function'
-                if not xmlSel(item, interp_func):
+                if not xmlSel(item, interp_func, bindings=bindings):
                     elt = ET.Element('interpolation-function', attrib={'name' : funcName})
-                    xmlIns(item, interp_rule, elt)
+                    xmlIns(item, interp_rule, elt, bindings=bindings)
 
                 xpath = interp_rule + '/' + to_or_from_tag
-                if xmlSel(item, xpath):               # if element exists, edit it in place
-                    args.append((xpath, value))
+                if xmlSel(item, xpath, bindings=bindings):  # if element exists, edit it in place
+                    args.append((xpath, value, bindings))
                 else:                                       # otherwise, insert the element
                     elt = ET.Element(to_or_from_tag)
                     elt.text = value
-                    xmlIns(item, interp_rule, elt)
+                    xmlIns(item, interp_rule, elt, bindings=bindings)
 
             if fromValue is not None:
                 fromValue = str(fromValue)
@@ -1175,25 +1178,25 @@ class XMLEditor(object):
                     share_parent = rule_parent
                     share_weight = share_parent + f'/share-weight[@year="{toYear}"]'
 
-                share_elt = tree.find(share_weight)
+                share_elt = xmlFind(item, share_weight, bindings=bindings)
 
                 if share_elt is None:
-                    interp_rule_elt = tree.find(interp_rule)
-                    rule_parent_elt = tree.find(rule_parent)
+                    interp_rule_elt = xmlFind(item, interp_rule, bindings=bindings)
+                    rule_parent_elt = xmlFind(item, rule_parent, bindings=bindings)
                     index = rule_parent_elt.index(interp_rule_elt)
 
                     attrib = {} if stubTechnology else {'year' : toYear}
                     share_elt = ET.Element('share-weight', attrib=attrib)
 
                     # insert <share-weight> before <interpolation-rule>
-                    share_parent_elt = tree.find(share_parent)
+                    share_parent_elt = xmlFind(item, share_parent, bindings=bindings)
                     share_parent_elt.insert(index, share_elt)
 
                 # Set the value for the toYear
                 share_elt.text = toValue
 
             if delete:
-                args.append((interp_rule + '/@delete', "1"))        # TBD: not sure this is correct
+                args.append((interp_rule + '/@delete', "1", bindings))        # TBD: not sure this is correct
 
         xmlEdit(item, args)
         self.updateScenarioComponent(configFileTag, xml_file)
@@ -1326,26 +1329,29 @@ class XMLEditor(object):
         # convert to a list; if no region given, get list of regions in this file
         regionList = splitAndStrip(regions, ',') if regions else tree.xpath('//region/@name')
 
-        args = []
-
-        for region in regionList:
-            regionElt = f'//region[@name="{region}"]'
+        # Find each <period> in the index, and the parameter element relative to it
+        index = item.structural_index(supplysectorTag, subsectorTag, technologyTag)
+        query, _ = compiledXPath(f'{nodeName}[@{attributeName}="{attributeValue}"]')
 
-            # /scenario/world/region[@name='USA']/supplysector[@name='refining']/subsector[@name='biomass liquids']/share-weight
-            subsect = f'{regionElt}/{supplysectorTag}[@name="{supplysector}"]/{subsectorTag}[@name="{subsector}"]'
-            for year, value in expandYearRanges(nodeValues):
+        yearValues = expandYearRanges(nodeValues)
 
-                stubTech = subsect + f'/{technologyTag}[@name="{stubTechnology}"]'
-                param_parent = stubTech + f'/period[@year="{year}"]'
-                parameter = param_parent + f'/{nodeName}[@{attributeName}="{attributeValue}"]'
-
-                if not xmlSel(item, parameter):
-                    parameterElement = ET.Element(str(nodeName), {str(attributeName): str(attributeValue)})
-                    xmlIns(item, param_parent, parameterElement)
+        for region in regionList:
+            for year, value in yearValues:
+                period = index.get(region, supplysector, subsector, stubTechnology, year)
+                if period is None:
+                    raise SetupException(f"insertStubTechParameter: period {year} of ({region}, {supplysector}, "
+                                         f"{subsector}, {stubTechnology}) not found in {item.filename}")
+
+                elts = query(period)
+                if not elts:
+                    elts = [ET.SubElement(period, str(nodeName), {str(attributeName): str(attributeValue)})]
+
+                value = str(coercible(value, float))
+                for elt in elts:
+                    elt.text = value
 
-                args.append((parameter, coercible(value, float)))
+                item.set_edited()
 
-        xmlEdit(item, args)
         self.updateScenarioComponent(configFileTag, xml_file)
 
     @callableMethod
@@ -1387,20 +1393,20 @@ class XMLEditor(object):
         # convert to a list; if no region given, get list of regions in this file
         regionList = splitAndStrip(regions, ',') if regions else tree.xpath('//region/@name')
 
+        # /scenario/world/region[@name='USA']/supplysector[@name='refining']/subsector[@name='biomass liquids']/share-weight
+        subsect = f'//region[@name=$region]/{supplysectorTag}[@name="{supplysector}"]/{subsectorTag}[@name="{subsector}"]'
+        parameter = subsect + f'/{nodeName}[@{attributeName}="{attributeValue}"]'
+
         args = []
 
         for region in regionList:
-            regionElt = f'//region[@name="{region}"]'
-
-            # /scenario/world/region[@name='USA']/supplysector[@name='refining']/subsector[@name='biomass liquids']/share-weight
-            subsect = f'{regionElt}/{supplysectorTag}[@name="{supplysector}"]/{subsectorTag}[@name="{subsector}"]'
-            parameter = subsect + f'/{nodeName}[@{attributeName}="{attributeValue}"]'
+            bindings = {'region': region}
 
-            if not xmlSel(item, parameter):
+            if not xmlSel(item, parameter, bindings=bindings):
                 parameterElement = ET.Element(str(nodeName), {str(attributeName): str(attributeValue)})
-                xmlIns(item, subsect, parameterElement)
+                xmlIns(item, subsect, parameterElement, bindings=bindings)
 
-            args.append((parameter, coercible(nodeValue, float)))
+            args.append((parameter, coercible(nodeValue, float), bindings))
 
         xmlEdit(item, args)
         self.updateScenarioComponent(configFileTag, xml_file)
@@ -1450,35 +1456,35 @@ class XMLEditor(object):
         # convert to a list; if no regions given, get list of regions in this file
         regionList = splitAndStrip(regions, ',') if regions else tree.xpath('//region/@name')
 
-        args = []
-
-        for region in regionList:
-            regionElt = f'//region[@name="{region}"]'
-
-            # /scenario/world/region[@name='USA']/supplysector[@name='refining']/subsector[@name='biomass liquids']/share-weight
-            subsect = f'{regionElt}/{supplysectorTag}[@name="{sector}"]/{subsectorTag}[@name="{subsector}"]'
+        # /scenario/world/region[@name='USA']/supplysector[@name='refining']/subsector[@name='biomass liquids']/share-weight
+        # The xpaths use variables for region and year, so each is compiled only once.
+        subsect = f'//region[@name=$region]/{supplysectorTag}[@name="{sector}"]/{subsectorTag}[@name="{subsector}"]'
 
-            for year, value in expandYearRanges(values):
+        if stubTechnology:
+            stubTech = subsect + f'/{technologyTag}[@name="{stubTechnology}"]'
+            sw_parent = stubTech + '/period[@year=$year]'
+            share_weight = sw_parent + '/share-weight'
+        else:  # subsector level
+            sw_parent = subsect
+            share_weight = sw_parent + '/share-weight[@year=$year]'
 
-                if stubTechnology:
-                    stubTech = subsect + f'/{technologyTag}[@name="{stubTechnology}"]'
-                    sw_parent = stubTech + f'/period[@year="{year}"]'
-                    share_weight = sw_parent + '/share-weight'
+        yearValues = expandYearRanges(values)
+        args = []
 
-                    if not xmlSel(item, sw_parent):
-                        elt = ET.Element('period', attrib={'year': str(year)})
-                        xmlIns(item, stubTech, elt)
+        for region in regionList:
+            for year, value in yearValues:
+                bindings = {'region': region, 'year': str(year)}
 
-                else:  # subsector level
-                    sw_parent = subsect
-                    share_weight = sw_parent + f'/share-weight[@year="{year}"]'
+                if stubTechnology and not xmlSel(item, sw_parent, bindings=bindings):
+                    elt = ET.Element('period', attrib={'year': str(year)})
+                    xmlIns(item, stubTech, elt, bindings=bindings)
 
-                if not xmlSel(item, share_weight):
+                if not xmlSel(item, share_weight, bindings=bindings):
                     attrib = {} if stubTechnology else {'year': str(year)}
                     elt = ET.Element('share-weight', attrib=attrib)
-                    xmlIns(item, sw_parent, elt)
+                    xmlIns(item, sw_parent, elt, bindings=bindings)
 
-                args.append((share_weight, coercible(value, float)))
+                args.append((share_weight, coercible(value, float), bindings))
 
         xmlEdit(item, args)
         self.updateScenarioComponent(configFileTag, xml_file)
@@ -1651,10 +1657,10 @@ class XMLEditor(object):
         xml_file = self.getLocalCopy(configFileTag)
 
         # //region[@name='USA']/supplysector[@name='N fertilizer']/subsector[@name='gas']/stub-technology[@name='gas']/period[@year='2005']/Non-CO2[@name='CH4']/input-emissions
-        # NOTE: the following uses '%s' since the list comprehension immediately below substitutes in the year.
-        xpath = f"//region[@name='{region}']/supplysector[@name='{sector}']/subsector[@name='{subsector}']/stub-technology[@name='{stubTechnology}']/period[@year='%s']/Non-CO2[@name='{species}']/input-emissions"
+        # NOTE: the following uses '$year' since the list comprehension immediately below binds the year.
+        xpath = f"//region[@name='{region}']/supplysector[@name='{sector}']/subsector[@name='{subsector}']/stub-technology[@name='{stubTechnology}']/period[@year=$year]/Non-CO2[@name='{species}']/input-emissions"
 
-        pairs = [(xpath % year, coercible(value, float)) for year, value in expandYearRanges(values)]
+        pairs = [(xpath, coercible(value, float), {'year': str(year)}) for year, value in expandYearRanges(values)]
 
         xmlEdit(xml_file, pairs)
         self.updateScenarioComponent(configFileTag, xml_file)
@@ -1672,29 +1678,28 @@ class XMLEditor(object):
 
         xml_file = self.getLocalCopy(xmlTag)
         item = CachedFile.getFile(xml_file)
-        tree = item.tree
 
-        xml_template = "//region[@name='{region}']/supplysector[@name='{sector}']/tranSubsector[@name='{subsector}']/stub-technology[@name='{technology}']/"
+        # Find each period element in the index, and the coefficient relative to it
+        index = item.structural_index(subsectorTag='tranSubsector')
+        query, _ = compiledXPath('minicam-energy-input[@name=$input]/coefficient')
 
-        pairs = []
+        edits = []
 
         for (idx, row) in df.iterrows():
-            xpath_prefix = xml_template.format(**row)
-            input = row['input']
+            key = [str(row[name]) for name in ('region', 'sector', 'subsector', 'technology')]
+            input = str(row['input'])
 
             for year in year_cols:
                 improvement = row[year]
                 if improvement == 0:
                     continue
 
-                xpath = xpath_prefix + f"period[@year='{year}']/minicam-energy-input[@name='{input}']/coefficient"
-                elts = tree.xpath(xpath)
-
-                if elts is None:
-                    raise SetupException(f'XPath query {xpath} on file "{xml_file.abs}" failed to find an element')
+                period = index.get(*key, year=year)
+                elts = [] if period is None else query(period, input=input)
 
                 if len(elts) != 1:
-                    raise SetupException(f'XPath query {xpath} on file "{xml_file.abs}" returned multiple elements')
+                    raise SetupException(f'Found {len(elts)} coefficients for {key}, year {year}, input "{input}" '
+                                         f'in file "{xml_file.abs}"; expected 1')
 
                 elt = elts[0]
                 old_value = float(elt.text)
@@ -1702,9 +1707,15 @@ class XMLEditor(object):
                 # A value of 1 in the CSV template, which indicates a 100% improvement (a doubling) of fuel economy,
                 # should drop the coefficient value by 50%. Thus the following calculation:
                 new_value = old_value / (1 + improvement)
-                pairs.append((xpath, new_value))
+                edits.append((elt, new_value))
+
+        # Apply edits only after computing all new values from the original ones
+        for elt, value in edits:
+            elt.text = str(value)
+
+        if edits:
+            item.set_edited()
 
-        xmlEdit(xml_file, pairs)
         self.updateScenarioComponent(xmlTag, xml_file)
 
     @callableMethod
@@ -1757,18 +1768,22 @@ class XMLEditor(object):
         def runForFile(tag, which):
             xml_file = self.getLocalCopy(tag)
             item = CachedFile.getFile(xml_file)
-            tree = item.tree
 
+            # Find each period element in the index, and the efficiency relative to it.
+            # GCAM-USA technologies are in the global technology database (region None).
             if which == 'GCAM-USA':
-                xml_template = "//global-technology-database/location-info[@sector-name='{sector}' and @subsector-name='{subsector}']/technology[@name='{technology}']/"
+                index = item.structural_index(technologyTag='technology')
             else:
-                xml_template = "//region[@name='{region}']/supplysector[@name='{sector}']/subsector[@name='{subsector}']/stub-technology[@name='{technology}']/"
+                index = item.structural_index()
+
+            query, _ = compiledXPath('minicam-energy-input[@name=$input]/efficiency')
 
             subdf = df.query(f'which == "{which}"')
 
             for (idx, row) in subdf.iterrows():
-                xpath_prefix = xml_template.format(**row)
-                input = row['input']
+                region = None if which == 'GCAM-USA' else str(row['region'])
+                key = [region] + [str(row[name]) for name in ('sector', 'subsector', 'technology')]
+                input = str(row['input'])
                 subsector = row['subsector']
                 pairs = []
 
@@ -1777,14 +1792,12 @@ class XMLEditor(object):
                     if improvement == 0:
                         continue
 
-                    xpath = xpath_prefix + f"period[@year='{year}']/minicam-energy-input[@name='{input}']/efficiency"
-                    elts = tree.xpath(xpath)
-
-                    if elts is None:
-                        raise SetupException(f'XPath query "{xpath}" on file "{xml_file.abs}" failed to find an element')
+                    period = index.get(*key, year=year)
+                    elts = [] if period is None else query(period, input=input)
 
                     if len(elts) != 1:
-                        raise SetupException(f'XPath query "{xpath}" on file "{xml_file.abs}" returned multiple elements')
+                        raise SetupException(f'Found {len(elts)} efficiencies for {key}, year {year}, input "{input}" '
+                                             f'in file "{xml_file.abs}"; expected 1')
 
                     elt = elts[0]
                     old_value = float(elt.text)
@@ -1926,9 +1939,11 @@ class XMLEditor(object):
         def runForFile(tag, which):
             xml_file = self.getLocalCopy(tag)
             item = CachedFile.getFile(xml_file)
-            tree = item.tree
 
-            xml_template = "//global-technology-database/location-info[@sector-name='{sector}' and @subsector-name='{subsector}']/technology[@name='{technology}']/"
+            # Find each period element of the global technology database (region None)
+            # in the index, and the efficiency relative to it.
+            index = item.structural_index(technologyTag='technology')
+            query, _ = compiledXPath('minicam-energy-input[@name=$input]/efficiency')
 #            if which == 'GCAM-USA':
 #                xml_template = "//global-technology-database/location-info[@sector-name='{sector}' and @subsector-name='{subsector}']/technology[@name='{technology}']/"
 #            else:
@@ -1937,8 +1952,8 @@ class XMLEditor(object):
             subdf = df.query(f'which == "{which}"')
 
             for (idx, row) in subdf.iterrows():
-                xpath_prefix = xml_template.format(**row)
-                input = row['input']
+                key = [None] + [str(row[name]) for name in ('sector', 'subsector', 'technology')]
+                input = str(row['input'])
                 subsector  = row['subsector']
                 pairs = []
 
@@ -1947,17 +1962,14 @@ class XMLEditor(object):
                     if improvement == 0:
                         continue
 
-                    xpath = xpath_prefix + f"period[@year='{year}']/minicam-energy-input[@name='{input}']/efficiency"
-                    elts = tree.xpath(xpath)
-
-                    if elts is None:
-                        raise SetupException(f'XPath query {xpath} on file "{xml_file.abs}" failed to find an element')
+                    period = index.get(*key, year=year)
+                    elts = [] if period is None else query(period, input=input)
 
                     if len(elts) == 0:
-                        raise SetupException(f'XPath query {xpath} on file "{xml_file.abs}" returned zero elements')
+                        raise SetupException(f'Found no efficiency for {key}, year {year}, input "{input}" in file "{xml_file.abs}"')
 
                     if len(elts) != 1:
-                        raise SetupException(f'XPath query {xpath} on file "{xml_file.abs}" returned multiple elements')
+                        raise SetupException(f'Found multiple efficiencies for {key}, year {year}, input "{input}" in file "{xml_file.abs}"')
 
                     elt = elts[0]
                     old_value = float(elt.text)
@@ -9,6 +9,7 @@
 """
 from collections import OrderedDict
 import os
+import re
 import sys
 
 from .config import getParam, getParamAsPath, pathjoin
@@ -350,6 +351,13 @@ class Scenario(object):
         for action in self.actions:
             action.formatContent(templateDict)
 
+    def hasDynamicActions(self):
+        def dynamic(actions):
+            return any(action.dynamic or (isinstance(action, If) and dynamic(action.actions))
+                       for action in actions)
+
+        return dynamic(self.actions)
+
     def writeXML(self, stream, indent=0):
         text = f'<scenario name="{self.name}" baseline="{int(self.isBaseline)}">\n'
         stream.write(_tab * indent + text)
@@ -651,6 +659,92 @@ def createXmlEditorSubclass(setupFile):
 
     return XmlEditorSubclass
 
+# Pathnames of XML and CSV files in the text of scenario actions
+_InputFilePattern = re.compile(r"""[^\s'",()=<>]+\.(?:xml|csv)\b""")
+
+def setupFingerprint(mapper, editorClass, args):
+    """
+    Compute a fingerprint of the inputs to the setup of the current scenario: the
+    scenario's actions (after iterator expansion by ``Scenario.formatContent``), the
+    files they reference, all files in the project's etc and xmlsrc directories, the
+    files named by config variables, the sandbox workspace manifest, the source files
+    of custom setup classes, the project's config variables, the setup options, and
+    the pygcam version. For policy scenarios, the baseline's fingerprint is
+    included, so re-running the baseline's setup invalidates its policies.
+
+    :param mapper: (FileMapper) the scenario's file mapper
+    :param editorClass: (class) the XMLEditor subclass that runs the setup
+    :param args: (argparse.Namespace) the arguments to the "setup" sub-command
+    :return: (str or None) the fingerprint, or None if the scenario's setup can't be
+        skipped, i.e., in MCS mode, if the scenario has dynamic actions (which depend
+        on baseline results), or if a policy's baseline has no fingerprint.
+    """
+    import inspect
+    from io import StringIO
+    from .config import getConfigDict, getSection
+    from .manifest import (fingerprint, fileStamps, readFingerprint, fileHash, FileManifest,
+                           MANIFEST_FILE, SETUP_FINGERPRINT_FILE)
+    from .version import VERSION
+
+    if mapper.mcs_mode:
+        return None
+
+    setupFile = getParamAsPath('GCAM.ScenariosFile')
+    group = XMLScenario.get_instance(setupFile).getGroup(mapper.scenario_group)
+    scenario = group.getFinalScenario(mapper.scenario or mapper.baseline)
+
+    if scenario.hasDynamicActions() and not args.static_only:
+        return None
+
+    baselineFingerprint = None
+    if mapper.sandbox_baseline_xml:
+        baselineFingerprint = readFingerprint(pathjoin(mapper.sandbox_baseline_xml, SETUP_FINGERPRINT_FILE))
+        if not baselineFingerprint:
+            return None
+
+    # writeXML writes only the active actions within <if> elements
+    stream = StringIO()
+    scenario.writeXML(stream)
+    actions = stream.getvalue()
+
+    exeDir = mapper.sandbox_exe_dir
+    referenced = [pathjoin(exeDir, name, normpath=True) for name in _InputFilePattern.findall(actions)
+                  if '{' not in name]     # skip generated files, e.g., in {scenarioDir}
+
+    # Setup code may read any file in these trees, e.g., static XML files in xmlsrc
+    # subdirectories or data files in etc, which aren't named in the actions.
+    trees = {path: FileManifest.from_tree(path, ['.']).entries
+             for path in sorted({mapper.project_etc_dir, mapper.project_xml_src}) if path}
+
+    config = getConfigDict(section=getSection())
+    configFiles = [value for value in config.values() if isinstance(value, str) and os.path.isfile(value)]
+
+    classFiles = []
+    for cls in inspect.getmro(editorClass):
+        if cls.__module__.split('.')[0] != 'pygcam':
+            try:
+                classFiles.append(inspect.getsourcefile(cls))
+            except TypeError:
+                pass    # e.g., builtins
+
+    manifestPath = pathjoin(mapper.sandbox_workspace, MANIFEST_FILE)
+
+    data = {'version'   : VERSION,
+            'scenario'  : mapper.scenario,
+            'group'     : mapper.scenario_group,
+            'actions'   : actions,
+            'baseline'  : baselineFingerprint,
+            'files'     : fileStamps(sorted(set(referenced + configFiles + classFiles))),
+            'trees'     : trees,
+            'workspace' : fileHash(manifestPath) if os.path.exists(manifestPath) else None,
+            'config'    : config,
+            'args'      : {name: getattr(args, name, None) for name in
+                           ('dynamic_only', 'static_only', 'run_config_setup', 'run_non_config_setup',
+                            'stopYear', 'years', 'moduleSpec', 'modulePath')},
+            }
+
+    return fingerprint(data)
+
 # TBD: used only by ZEVPolicy.py
 def scenarioEditor(mapper):
     setupXml = getParam('GCAM.ScenariosFile')
@@ -0,0 +1,184 @@
+"""
+.. A process-wide cache of parsed XML documents.
+
+.. Copyright (c) 2023 Richard Plevin
+   See the https://opensource.org/licenses/MIT for license details.
+"""
+import os
+from collections import OrderedDict
+
+from .config import getParamAsInt
+from .error import PygcamException
+from .log import getLogger
+
+_logger = getLogger(__name__)
+
+def fileStamp(filename):
+    """
+    Return a value that changes when the file is modified or replaced, or None
+    if the file doesn't exist.
+    """
+    try:
+        st = os.stat(filename)
+    except OSError:
+        return None
+
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+class XMLDocument(object):
+    """
+    A parsed XML file that is shared by read-only users. Objects stored in the
+    DocumentCache must provide the attributes ``tree`` and ``dirty`` and the
+    method ``write()``, as do CachedFile and XMLConfigFile.
+    """
+    def __init__(self, filename, tree):
+        self.filename = filename
+        self.tree = tree
+        self.dirty = False
+
+    def write(self):
+        raise PygcamException(f"XMLDocument '{self.filename}' is read-only")
+
+
+class DocumentCache(object):
+    """
+    Caches parsed XML documents keyed by the real path of the file and a "kind"
+    that identifies the type of object wrapping the parsed tree (and thus how the
+    file was parsed). A cached document is reused as long as the file's mtime,
+    size, and inode are unchanged, or if the document has unsaved edits. The least
+    recently used documents are dropped when there are more than ``maxDocs`` of
+    them. Documents with unsaved edits are never dropped (or written) by the cache,
+    and don't count against ``maxDocs``; they remain until saved or cleared.
+    """
+    def __init__(self, maxDocs=0):
+        self.maxDocs = maxDocs
+        self.entries = OrderedDict()    # (realpath, kind) => [stamp, document]
+        self.parses  = 0
+        self.avoided = 0
+
+    @staticmethod
+    def _key(filename, kind):
+        return (os.path.realpath(filename), kind)
+
+    def get(self, filename, kind, load):
+        """
+        Return the cached document for `filename` and `kind`, or call `load` to
+        create it if it's not cached or the file has changed since it was loaded.
+
+        :param filename: (str) the pathname of an XML file
+        :param kind: (hashable) identifies the type of document
+        :param load: (callable) called with the real path of the file to create
+            the document
+        :return: the document
+        """
+        key = self._key(filename, kind)
+        realpath = key[0]
+        stamp = fileStamp(realpath)
+        entry = self.entries.get(key)
+
+        if entry is not None:
+            oldStamp, doc = entry
+
+            if oldStamp == stamp or doc.dirty:
+                if oldStamp != stamp:
+                    _logger.warning("DocumentCache: '%s' changed on disk but has unsaved edits; using cached version",
+                                    realpath)
+                self.avoided += 1
+                self.entries.move_to_end(key)
+                return doc
+
+            _logger.debug("DocumentCache: '%s' changed on disk; reloading", realpath)
+
+        doc = load(realpath)
+        self.parses += 1
+        self.entries[key] = [stamp, doc]
+        self._evict()
+        return doc
+
+    def peek(self, filename, kind):
+        """
+        Return the cached document for `filename` and `kind`, or None.
+        """
+        entry = self.entries.get(self._key(filename, kind))
+        return entry[1] if entry else None
+
+    def add(self, filename, kind, doc):
+        """
+        Add a document, e.g., one that was dropped from the cache but then edited.
+        """
+        key = self._key(filename, kind)
+        self.entries[key] = [fileStamp(key[0]), doc]
+        self._evict()
+
+    def written(self, filename, kind, doc):
+        """
+        Record that `doc` was written to `filename`, so the file's new stamp doesn't
+        cause it to be reloaded.
+        """
+        self.remove(doc=doc)
+        self.entries[self._key(filename, kind)] = [fileStamp(filename), doc]
+        self._evict()
+
+    def remove(self, filename=None, kind=None, doc=None):
+        """
+        Drop the document for `filename` and `kind`, or if `doc` is given, all
+        entries holding `doc`. Unsaved edits are discarded.
+        """
+        if doc is None:
+            self.entries.pop(self._key(filename, kind), None)
+        else:
+            for key in [key for key, (_, d) in self.entries.items() if d is doc]:
+                del self.entries[key]
+
+    def documents(self, kind):
+        """
+        Return a list of the cached documents of the given kind.
+        """
+        return [doc for (_, k), (_, doc) in self.entries.items() if k == kind]
+
+    def save(self, kind):
+        """
+        Write all documents of the given kind that have unsaved edits.
+        """
+        for doc in self.documents(kind):
+            if doc.dirty:
+                doc.write()
+
+    def clear(self, kind, save=True):
+        """
+        Drop all documents of the given kind, first writing unsaved edits if `save`.
+        """
+        if save:
+            self.save(kind)
+
+        for key in [key for key in self.entries if key[1] == kind]:
+            del self.entries[key]
+
+    def _evict(self):
+        if not self.maxDocs:
+            return
+
+        clean = [key for key, (_, doc) in self.entries.items() if not doc.dirty]
+
+        for key in clean[:max(0, len(clean) - self.maxDocs)]:
+            _logger.debug("DocumentCache: evicting '%s'", key[0])
+            del self.entries[key]
+
+    def report(self):
+        _logger.info("DocumentCache: %d documents cached; %d parses, %d parses avoided",
+                      len(self.entries), self.parses, self.avoided)
+
+
+_documentCache = None
+
+def getDocumentCache() -> DocumentCache:
+    """
+    Return the process-wide DocumentCache, creating it on first use.
+    """
+    global _documentCache
+
+    if _documentCache is None:
+        _documentCache = DocumentCache(maxDocs=getParamAsInt('GCAM.XmlCacheSize'))
+
+    return _documentCache
@@ -3,6 +3,7 @@
 
    See the https://opensource.org/licenses/MIT for license details.
 """
+from functools import lru_cache
 from io import BytesIO
 import os
 import re
@@ -13,6 +14,7 @@ from .error import SetupException, PygcamException
 from .gcam_path import GcamPath
 from .log import getLogger
 from .utils import splitAndStrip
+from .xml_cache import getDocumentCache
 
 AttributePattern = re.compile(r'(.*)/@([-\w]*)$')
 
@@ -59,11 +61,117 @@ def expandYearRanges(seq):
     return result
 
 
+def _tagTuple(tags):
+    return (tags,) if isinstance(tags, str) else tuple(tags)
+
+class StructuralIndex(object):
+    """
+    An index of the region / sector / subsector / technology / period hierarchy
+    of a GCAM input XML tree, mapping tuples of (region, sector, subsector,
+    technology, year), or any leading part thereof, to the corresponding element.
+    For example, ``index.get('USA', 'refining', 'biomass liquids')`` returns the
+    subsector element. Technologies in the global technology database are indexed
+    with region None, and their sector and subsector names taken from the attributes
+    of <location-info>, which is the element indexed as the "subsector".
+
+    The index is built with one pass over the tree, after which each lookup is O(1).
+    Elements inserted with xmlIns() are added to the index; other structural edits
+    require a call to CachedFile.invalidate_indexes().
+    """
+    # attributes that identify indexed elements; edits to these invalidate the index
+    KEY_ATTRIBUTES = ('name', 'year', 'sector-name', 'subsector-name')
+
+    def __init__(self, tree, sectorTag='supplysector', subsectorTag='subsector',
+                 technologyTag='stub-technology'):
+        """
+        :param tree: (lxml ElementTree or Element) the tree to index
+        :param sectorTag: (str or tuple of str) the tag(s) of sector elements
+        :param subsectorTag: (str or tuple of str) the tag(s) of subsector elements
+        :param technologyTag: (str or tuple of str) the tag(s) of technology elements
+        """
+        # (tags, identifying attribute) of each level below region
+        self.levels = [(_tagTuple(sectorTag), 'name'),
+                       (_tagTuple(subsectorTag), 'name'),
+                       (_tagTuple(technologyTag), 'name'),
+                       (('period',), 'year')]
+
+        self.elements = {}      # key tuple => element
+        self.keys = {}          # element => key tuple, to index inserted elements
+        self.children = {}      # key tuple => dict (used as ordered set) of child names
+
+        root = tree.getroot() if hasattr(tree, 'getroot') else tree
+
+        for region in root.iter('region'):
+            self._add(region, (region.get('name'),))
+
+        for location in root.iter('location-info'):
+            sector, subsector = location.get('sector-name'), location.get('subsector-name')
+            self.children.setdefault((None,), {})[sector] = True
+            self._add(location, (None, sector, subsector))
+
+    def _add(self, elt, key):
+        self.elements.setdefault(key, elt)      # like find(), the first match wins
+        self.keys[elt] = key
+        self.children.setdefault(key[:-1], {})[key[-1]] = True
+
+        depth = len(key) - 1
+        if depth < len(self.levels):
+            tags, attr = self.levels[depth]
+            for child in elt.iterchildren(*tags):
+                self._add(child, key + (child.get(attr),))
+
+    def inserted(self, parent, elt):
+        """
+        Add `elt`, which was just appended to `parent`, to the index if `parent`
+        is indexed and `elt` is at the next level of the hierarchy.
+        """
+        key = self.keys.get(parent)
+        if key is None:
+            return
+
+        depth = len(key) - 1
+        if depth < len(self.levels):
+            tags, attr = self.levels[depth]
+            if elt.tag in tags:
+                self._add(elt, key + (elt.get(attr),))
+
+    @staticmethod
+    def _key(args):
+        key = list(args)
+        while key and key[-1] is None:      # drop trailing Nones
+            key.pop()
+
+        if len(key) == 5 and key[4] is not None:
+            key[4] = str(key[4])            # years are matched as strings
+
+        return tuple(key)
+
+    def get(self, region, sector=None, subsector=None, technology=None, year=None):
+        """
+        Return the element identified by the arguments, or None if not found.
+        Use region=None for technologies in the global technology database.
+        """
+        return self.elements.get(self._key((region, sector, subsector, technology, year)))
+
+    def names(self, *key):
+        """
+        Return the names of the elements one level below the element identified by
+        `key` (a leading part of a (region, sector, subsector, technology) tuple), e.g.,
+        ``index.names('USA', 'refining')`` returns the names of the subsectors of
+        'refining' in 'USA', ``index.names()`` returns the region names, and
+        ``index.names(None)`` the sectors in the global technology database.
+
+        :return: (list of str) the names, in document order
+        """
+        return list(self.children.get(tuple(key), ()))
+
+
 class CachedFile(object):
     parser = ET.XMLParser(remove_blank_text=True)
 
-    # Store parsed XML trees here and use with xmlSel/xmlEdit if useCache is True
-    cache: dict[str, 'CachedFile']  = {}
+    # CachedFile instances are stored in the process-wide DocumentCache (see xml_cache.py)
+    # under this kind, and used with xmlSel/xmlEdit if useCache is True
+    kind = 'CachedFile'
 
     # Some files (e.g., cal_broyden_config.xml) have incorrect entities that don't
     # parse correctly in lxml, so we change "&&" to "&amp;&amp;" on reading, and
@@ -74,6 +182,7 @@ class CachedFile(object):
         self.filename = filename = os.path.realpath(os.path.abspath(filename))
         self.edited = False
         self.corrected = False  # if "&amp;" entities were corrected on reading
+        self.indexes = {}       # StructuralIndex instances, keyed by tags; see structural_index()
 
         _logger.debug("CachedFile: reading '%s'", filename)
 
@@ -90,30 +199,59 @@ class CachedFile(object):
             self.corrected = True
 
         self.tree = ET.parse(corrected or filename, self.parser)
-        self.cache[filename] = self
 
     @classmethod
     def getFile(cls, obj) -> 'CachedFile':
         if isinstance(obj, CachedFile):     # TBD: pretty unexpected behavior
             return obj
 
-        # realpath => operate on canonical pathnames
-        filename = os.path.realpath(obj.abs if isinstance(obj, GcamPath) else obj)
+        # The cache operates on canonical pathnames, and reloads the file if it has changed
+        filename = obj.abs if isinstance(obj, GcamPath) else obj
+        return getDocumentCache().get(filename, cls.kind, CachedFile)
 
-        try:
-            item = cls.cache[filename]
-        except KeyError:
-            item = CachedFile(filename)
-
-        return item
+    @property
+    def dirty(self):
+        # the name used by DocumentCache
+        return self.edited
 
     def set_edited(self):
         self.edited = True
 
+        # Re-add the file if it was evicted from the cache so the edits are saved
+        cache = getDocumentCache()
+        if cache.peek(self.filename, self.kind) is not self:
+            cache.add(self.filename, self.kind, self)
+
+    def structural_index(self, sectorTag='supplysector', subsectorTag='subsector',
+                         technologyTag='stub-technology') -> StructuralIndex:
+        """
+        Return a StructuralIndex of this file's tree for the given tags, building
+        it on first use. See StructuralIndex for the meaning of the arguments.
+        """
+        tags = (_tagTuple(sectorTag), _tagTuple(subsectorTag), _tagTuple(technologyTag))
+        index = self.indexes.get(tags)
+        if index is None:
+            _logger.debug("CachedFile: indexing '%s' for tags %s", self.filename, tags)
+            index = self.indexes[tags] = StructuralIndex(self.tree, *tags)
+
+        return index
+
+    def invalidate_indexes(self):
+        """
+        Discard structural indexes, which must be done after removing or renaming
+        elements other than by using xmlEdit().
+        """
+        self.indexes.clear()
+
     def write(self):
         filename = self.filename
         _logger.info("CachedFile: writing '%s'", filename)
 
+        # Trial XML files may be hard links shared by several trials (see
+        # MCS.TrialXmlReuse), so break the link rather than writing through it.
+        if os.path.isfile(filename) and os.stat(filename).st_nlink > 1:
+            os.unlink(filename)
+
         corrected = self.corrected
         out = BytesIO() if corrected else filename
 
@@ -128,6 +266,7 @@ class CachedFile(object):
                 f.write(s)
 
         self.edited = False
+        getDocumentCache().written(filename, self.kind, self)
 
     def save_edits(self):
         if self.edited:
@@ -135,20 +274,77 @@ class CachedFile(object):
 
     @classmethod
     def save_all_edits(cls):
-        for item in cls.cache.values():
-            item.save_edits()
+        getDocumentCache().save(cls.kind)
 
     @classmethod
     def decache(cls):
-        cls.save_all_edits()
-        cls.cache.clear()
+        getDocumentCache().clear(cls.kind, save=True)
 
     def __str__(self):
         return f"<CachedFile '{self.filename}' edited:{self.edited}>"
 
+#
+# Editors often apply the same xpath to many regions or years. Rather than
+# formatting a new xpath string for each, they can use XPath variables, e.g.,
+# '//region[@name=$region]/.../period[@year=$year]', and pass the values as
+# "bindings" to xmlSel, xmlIns, xmlFind, and xmlEdit. Each distinct xpath is
+# then parsed and compiled only once. Callers that still format literal values
+# into xpaths produce many distinct strings, so the cache is bounded.
+#
+XPATH_CACHE_SIZE = 1024
+
+@lru_cache(maxsize=XPATH_CACHE_SIZE)
+def compiledXPath(xpath):
+    """
+    Return a compiled version of `xpath` and the name of the attribute it
+    selects, if any. If `xpath` ends in "/@attr", the compiled expression
+    selects the elements holding the attribute. Results for the most recently
+    used xpaths are cached.
+
+    :param xpath: (str) an xpath, which may refer to XPath variables (e.g., $region)
+    :return: (ET.XPath, str or None) the compiled xpath and the attribute name
+    """
+    attr = None
+    eltPath = xpath
+
+    match = AttributePattern.match(xpath)
+    if match:
+        eltPath, attr = match.group(1), match.group(2)
+
+    try:
+        compiled = ET.XPath(eltPath)
+    except ET.XPathSyntaxError as e:
+        raise SetupException(f"Invalid xpath '{xpath}': {e}")
+
+    return compiled, attr
+
+def _evalXPath(tree, xpath, bindings):
+    compiled, attr = compiledXPath(xpath)
+    return compiled(tree, **bindings), attr
+
+def _findElement(tree, xpath, bindings):
+    # ElementPath's find() doesn't support variables, so use XPath if there are bindings
+    if bindings is None:
+        return tree.find(xpath)
+
+    elts, _ = _evalXPath(tree, xpath, bindings)
+    return elts[0] if len(elts) else None
+
 # TBD: make xmlSel, xmlIns, xmlEdit methods of CachedFile (rename that CachedXml)
 
-def xmlSel(obj, xpath, asText=False):
+def xmlFind(obj, xpath, bindings=None):
+    """
+    Return the first element matching `xpath`, or None if there are no matches.
+
+    :param obj: (CachedFile, GcamPath, or str) the file to search
+    :param xpath: (str) the xml element(s) to search for
+    :param bindings: (dict) values for XPath variables in `xpath`, if any
+    :return: (etree.Element or None) the element, if found
+    """
+    item = CachedFile.getFile(obj)
+    return _findElement(item.tree, xpath, bindings)
+
+def xmlSel(obj, xpath, asText=False, bindings=None):
     """
     Return True if the XML component identified by the xpath argument
     exists in `filename`. Useful for deciding whether to edit or
@@ -157,34 +353,38 @@ def xmlSel(obj, xpath, asText=False):
     :param obj: (CachedFile, GcamPath, or str) the file to edit
     :param xpath: (str) the xml element(s) to search for
     :param asText: (str) if True, return the text of the node, if found, else None
+    :param bindings: (dict) values for XPath variables in `xpath`, if any
     :return: (bool) True if found, False otherwise. (see asText)
     """
-    item = CachedFile.getFile(obj)
-
-    result = item.tree.find(xpath)
+    result = xmlFind(obj, xpath, bindings=bindings)
     if asText:
         return result.text if result is not None else None
 
     return (result is not None)
 
-def xmlIns(obj, xpath, elt):
+def xmlIns(obj, xpath, elt, bindings=None):
     """
     Insert the element `elt` as a child to the node found with `xpath`.
 
     :param obj: (CachedFile, GcamPath, or str) the file to edit
     :param xpath: (str) the xml element(s) to search for
     :param elt: (etree.Element) the node to insert
+    :param bindings: (dict) values for XPath variables in `xpath`, if any
     :return: none
     """
     item = CachedFile.getFile(obj)
     item.set_edited()
 
-    parentElt = item.tree.find(xpath)
+    parentElt = _findElement(item.tree, xpath, bindings)
     if parentElt is None:
-        raise SetupException(f"xmlIns: failed to find parent element at {xpath} in {item.filename}")
+        where = f"{xpath} {bindings}" if bindings else xpath
+        raise SetupException(f"xmlIns: failed to find parent element at {where} in {item.filename}")
 
     parentElt.append(elt)
 
+    for index in item.indexes.values():
+        index.inserted(parentElt, elt)
+
 #
 # xmlEdit can set a value, multiply a value in the XML by a constant,
 # or add a constant to the value in the XML. These funcs handle each
@@ -212,7 +412,11 @@ def xmlEdit(obj, pairs, op='set', useCache=True):
 
     :param obj: (CachedFile, GcamPath, or str) the file to edit
     :param pairs: (iterable of (xpath, value) pairs) In each pair, the xpath selects
-      elements or attributes to update with the given values.
+      elements or attributes to update with the given values. An item may also be a
+      triple of (xpath, value, bindings), where bindings is a dict of values for XPath
+      variables in the xpath, e.g., ('//region[@name=$region]/...', 1.5, {'region': 'USA'}).
+      Each xpath is compiled once, so an xpath with variables can be used efficiently
+      with many different bindings.
     :param op: (str) Operation to perform. Must be in ('set', 'multiply', 'add').
       Note that 'multiply' and 'add' are *not* available for xpaths selecting
       attributes rather than node values. For 'multiply'  and 'add', the value
@@ -235,23 +439,19 @@ def xmlEdit(obj, pairs, op='set', useCache=True):
     updated = False
 
     # if at least one xpath is found, update and write file
-    for xpath, value in pairs:
-        attr = None
-
-        # If it's an attribute update, extract the attribute
-        # and use the rest of the xpath to select the elements.
-        match = re.match(AttributePattern, xpath)
-        if match:
-            attr = match.group(2)
-            xpath = match.group(1)
-
-        elts = tree.xpath(xpath)
+    for xpath, value, *bindings in pairs:
+        # If it's an attribute update, the compiled xpath selects the elements
+        # holding the attribute, and attr is the name of the attribute.
+        elts, attr = _evalXPath(tree, xpath, bindings[0] if bindings else {})
         if len(elts):
             updated = True
             if attr:                # conditional outside loop since there may be many elements
                 value = str(value)
                 for elt in elts:
                     elt.set(attr, value)
+
+                if attr in StructuralIndex.KEY_ATTRIBUTES:
+                    item.invalidate_indexes()
             else:
                 for elt in elts:
                     modFunc(elt, value)
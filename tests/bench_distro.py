@@ -0,0 +1,23 @@
+#!/usr/bin/env python
+#
+# Time the ppf function of every distribution type registered by
+# pygcam.mcs.distro.DistroGen, and of DiscreteDist, over 1e6 percentiles.
+# Usage: python bench_distro.py [percentiles]
+#
+import sys
+import time
+
+import numpy as np
+
+from utils_for_testing import makeRVs
+
+def main(n=1000000):
+    q = np.random.default_rng(0).uniform(1e-9, 1 - 1e-9, size=n)
+
+    for label, rv in makeRVs(n):
+        start = time.perf_counter()
+        rv.ppf(q)
+        print(f"{label:32s} {time.perf_counter() - start:8.4f} sec")
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+#
+# Compare the vectorized rank correlation code in pygcam.mcs.LHS to the
+# original implementation, which looped over columns and column pairs.
+# Usage: python bench_lhs.py [params [trials]]
+#
+import sys
+import time
+
+import numpy as np
+from scipy import stats
+
+from pygcam.mcs.LHS import rankCorrCoef, genRankValues
+
+def loopRankCorrCoef(m):
+    dummy, cols = m.shape
+    corrCoef = np.zeros((cols, cols))
+
+    for i in range(cols):
+        corrCoef[i, i] = 1.
+        for j in range(i + 1, cols):
+            corr = stats.spearmanr(m[:, i], m[:, j])[0]
+            corrCoef[i, j] = corrCoef[j, i] = corr
+
+    return corrCoef
+
+def loopGenRankValues(params, trials, corrMat):
+    strata = np.arange(1.0, trials + 1) / (trials + 1)
+    vdwScores = stats.norm().ppf(strata)
+
+    S = np.zeros((trials, params))
+    for i in range(params):
+        np.random.shuffle(vdwScores)
+        S[:, i] = vdwScores
+
+    P = np.linalg.cholesky(corrMat)
+
+    E = loopRankCorrCoef(S)
+    Q = np.array(np.linalg.cholesky(E))
+    final = np.dot(np.dot(S, np.linalg.inv(Q).T), P.T)
+
+    ranks = np.zeros((trials, params), dtype='i')
+    for i in range(params):
+        ranks[:, i] = stats.rankdata(final[:, i])
+
+    return ranks
+
+def timeit(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+def main(params=200, trials=1000):
+    np.random.seed(0)
+    corrMat = np.eye(params)
+    corrMat[0, 1] = corrMat[1, 0] = 0.6
+
+    m = np.random.normal(size=(trials, params))
+    old_secs, old = timeit(loopRankCorrCoef, m)
+    new_secs, new = timeit(rankCorrCoef, m)
+    print(f"rankCorrCoef  ({params} params, {trials} trials): loop {old_secs:8.3f}s  vectorized {new_secs:8.3f}s  "
+          f"speedup {old_secs / new_secs:6.0f}x  max diff {np.abs(old - new).max():.2g}")
+
+    old_secs, _ = timeit(loopGenRankValues, params, trials, corrMat)
+    new_secs, ranks = timeit(genRankValues, params, trials, corrMat)
+    print(f"genRankValues ({params} params, {trials} trials): loop {old_secs:8.3f}s  vectorized {new_secs:8.3f}s  "
+          f"speedup {old_secs / new_secs:6.0f}x  corr[0,1] {rankCorrCoef(ranks[:, :2])[0, 1]:.3f}")
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
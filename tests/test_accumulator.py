@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+from pygcam.mcs.accumulator import ResultAccumulator, updateAccumulators
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(2)
+    trials = 2000
+    inputs = pd.DataFrame(rng.uniform(size=(trials, 3)), columns=['a', 'b', 'c'])
+    output = np.exp(3 * inputs.a) + inputs.b + 0.1 * rng.normal(size=trials)
+    return inputs, output
+
+def accumulate(inputs, output, batchSize):
+    acc = ResultAccumulator(inputs.columns)
+    ranks = inputs.rank(pct=True)
+    for start in range(0, len(output), batchSize):
+        batch = output.iloc[start:start + batchSize]
+        acc.update(batch.index, batch.values, inputs, ranks)
+    return acc
+
+@pytest.mark.parametrize("batchSize", [1, 7, 500, 2000])
+def test_accumulated_moments(data, batchSize):
+    inputs, output = data
+    acc = accumulate(inputs, output, batchSize)
+
+    s = acc.stats()
+    assert s['count'] == len(output)
+    assert s['mean'] == pytest.approx(output.mean())
+    assert s['std'] == pytest.approx(output.std())
+
+    corr = acc.correlations()
+    expected = [stats.pearsonr(inputs[col], output)[0] for col in inputs.columns]
+    assert np.allclose(corr.pearson, expected)
+
+    # approximate rank correlation preserves the ordering and is close to the exact value
+    exact = np.array([stats.spearmanr(inputs[col], output)[0] for col in inputs.columns])
+    assert np.abs(corr.spearman.values - exact).max() < 0.1
+    assert list(corr.spearman.abs().sort_values().index) == ['c', 'b', 'a']
+
+def test_accumulator_reruns_and_json(data):
+    inputs, output = data
+    ranks = inputs.rank(pct=True)
+
+    acc = accumulate(inputs, output.iloc[:100], 10)
+    assert acc.update(output.index[:50], output.values[:50], inputs, ranks) == 0    # already counted
+    assert acc.update([100, 101], [np.nan, output[101]], inputs, ranks) == 1       # missing value skipped
+
+    copy = ResultAccumulator.fromJSON(acc.toJSON())
+    assert copy.count == acc.count == 101
+    assert list(np.flatnonzero(~copy.includes(range(110)))) == [100] + list(range(102, 110))
+    assert np.allclose(copy.correlations(), acc.correlations())
+
+class FakeDatabase(object):
+    def __init__(self):
+        self.results = {}
+        self.states = {}
+
+    def getAccumulatorState(self, simId, expName, outputName):
+        return self.states.get((expName, outputName))
+
+    def saveAccumulatorState(self, simId, expName, outputName, state):
+        self.states[(expName, outputName)] = state
+
+    def getOutValuesWide(self, simId, expName, outputNames):
+        return pd.DataFrame({outputNames[0]: pd.Series(self.results)})
+
+def test_update_accumulators_reruns(data):
+    inputs, output = data
+    ranks = inputs.rank(pct=True)
+    db = FakeDatabase()
+
+    def saveBatch(trialNums, values):
+        db.results.update(zip(trialNums, values))
+        updateAccumulators(db, 1, {('base', 'out'): list(zip(trialNums, values))}, inputs, ranks)
+        return ResultAccumulator.fromJSON(db.states[('base', 'out')])
+
+    saveBatch(range(0, 50), output.values[:50])
+    acc = saveBatch(range(50, 100), output.values[50:100])
+    assert acc.stats()['mean'] == pytest.approx(output.values[:100].mean())
+
+    # re-running trials replaces their results rather than ignoring them
+    rerun = output.values[:10] + 100
+    acc = saveBatch(range(10), rerun)
+    expected = np.concatenate([rerun, output.values[10:100]])
+    assert acc.count == 100
+    assert acc.stats()['mean'] == pytest.approx(expected.mean())
+    assert acc.stats()['std'] == pytest.approx(expected.std(ddof=1))
@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pygcam.mcs.convergence import runningEstimates, ConvergenceMonitor
+from pygcam.mcs.error import PygcamMcsUserError
+
+def make_data(trials, seed=0):
+    rng = np.random.default_rng(seed)
+    inputs = pd.DataFrame(rng.uniform(size=(trials, 4)), columns=['a', 'b', 'c', 'd'])
+    y = 5 * inputs.a + 2 * inputs.b + 0.1 * rng.normal(size=trials)
+    outputs = pd.DataFrame({'y': y, 'z': -inputs.c})
+    return inputs, outputs
+
+def test_running_estimates():
+    inputs, outputs = make_data(500)
+    est = runningEstimates(inputs, outputs, percentiles=[50], topK=2)
+
+    assert est['y']['top'] == {'a', 'b'}
+    assert est['z']['top'] >= {'c'}
+    assert est['y']['mean'] == pytest.approx(outputs.y.mean())
+    assert est['y']['percentiles'][0] == pytest.approx(outputs.y.median())
+
+def test_convergence_monitor():
+    inputs, outputs = make_data(20000)
+    monitor = ConvergenceMonitor(['y'], tolerance=0.05, topK=2, stableChecks=2, minTrials=100)
+
+    # few trials: estimates move between checks
+    assert not monitor.update(inputs, outputs.iloc[:10])
+    assert not monitor.update(inputs, outputs.iloc[:20])
+
+    results = [monitor.update(inputs, outputs.iloc[:n]) for n in (5000, 10000, 20000)]
+    assert results[-1]
+    assert monitor.stableCount >= 2
+
+def test_convergence_monitor_missing_output():
+    inputs, outputs = make_data(100)
+    monitor = ConvergenceMonitor(['w'])
+    assert not monitor.update(inputs, outputs)
+    assert not monitor.update(inputs, None)
+
+    with pytest.raises(PygcamMcsUserError):
+        ConvergenceMonitor([])
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+from scipy.stats import rv_discrete
+
+from pygcam.mcs.distro import DiscreteRV, Empirical, GridRV, sequence, constant, binary, integers
+from pygcam.mcs.built_ins.discrete_plugin import DiscreteDist, DistributionSpecError
+
+from .utils_for_testing import makeRVs
+
+q = np.random.default_rng(3).uniform(1e-6, 1 - 1e-6, size=2000)
+
+@pytest.mark.parametrize("values, probs", [([0, 1], [0.5, 0.5]),
+                                           ([2, 3, 4, 5], [0.1, 0.2, 0.3, 0.4]),
+                                           ([-1, 7, 10], [0.25, 0.25, 0.5])])
+def test_discrete_rv(values, probs):
+    expected = rv_discrete(values=(values, probs)).ppf(q)
+    assert np.array_equal(DiscreteRV(values, probs).ppf(q), expected)
+
+def test_binary_integers():
+    assert set(binary().ppf(q)) == {0, 1}
+    values = integers(3, 7).ppf(q)
+    assert set(values) == {3, 4, 5, 6, 7}
+    assert np.array_equal(values, rv_discrete(values=(range(3, 8), [0.2] * 5)).ppf(q))
+
+def test_sequence_constant():
+    assert sequence('1,2,3').ppf(range(7)).tolist() == [1, 2, 3, 1, 2, 3, 1]
+    assert constant(4).ppf(range(3)).tolist() == [4, 4, 4]
+
+def test_empirical():
+    obs = [5.0, 1.0, 3.0, 2.0]
+    values = Empirical(obs).ppf([0.0, 0.24, 0.25, 0.99, 1.0])
+    assert values.tolist() == [1.0, 1.0, 2.0, 5.0, 5.0]
+
+def test_grid():
+    values = GridRV(0, 1, 5).ppf(range(12))
+    assert len(values) == 12
+    assert sorted(values)[::5] == [0, 0.25, 1]
+
+def test_discrete_dist():
+    dist = DiscreteDist([('b', 0.3), ('a', 0.2), ('c', 0.5)])
+    assert dist.ppf([0.1, 0.2, 0.25, 0.5, 0.51, 0.99]).tolist() == ['a', 'a', 'b', 'b', 'c', 'c']
+
+    with pytest.raises(DistributionSpecError):
+        dist.ppf([0.5, 1.0])
+
+def test_all_distros_vectorized():
+    for label, rv in makeRVs(len(q)):
+        values = rv.ppf(q)
+        assert isinstance(values, np.ndarray) and values.shape == q.shape, label
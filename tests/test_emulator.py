@@ -0,0 +1,58 @@
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from pygcam.error import PygcamException
+from pygcam.mcs.emulator import Emulator
+from pygcam.mcs.error import PygcamMcsUserError
+
+try:
+    import sklearn
+except ImportError:
+    sklearn = None
+
+requires_sklearn = pytest.mark.skipif(sklearn is None, reason="requires scikit-learn")
+
+def make_data(trials, seed=0):
+    rng = np.random.default_rng(seed)
+    inputs = pd.DataFrame(rng.uniform(-1, 1, size=(trials, 3)), columns=['a', 'b', 'c'])
+    output = np.sin(np.pi * inputs.a) + 0.5 * inputs.b ** 2
+    return inputs, output.rename('y')
+
+@requires_sklearn
+@pytest.mark.parametrize("kind", ['gp', 'gbt'])
+def test_emulator(kind):
+    inputs, output = make_data(300)
+    emulator = Emulator(kind=kind, seed=1)
+
+    err = emulator.crossValidate(inputs, output, folds=3)
+    assert err['r2'] > 0.9
+    assert err['nrmse'] == pytest.approx(np.sqrt(1 - err['r2']))
+
+    emulator.fit(inputs, output)
+    test_inputs, expected = make_data(200, seed=5)
+    predicted = emulator.predict(test_inputs[['c', 'b', 'a']])    # columns are matched by name
+    assert np.sqrt(np.mean((predicted - expected) ** 2)) < 0.3 * expected.std()
+
+@requires_sklearn
+def test_emulator_incomplete():
+    inputs, output = make_data(50)
+    output.iloc[:48] = np.nan
+
+    with pytest.raises(PygcamMcsUserError):
+        Emulator(kind='gbt').fit(inputs, output.iloc[:49])
+
+    with pytest.raises(PygcamMcsUserError):
+        Emulator(kind='xyz').fit(*make_data(50))
+
+def test_emulator_without_sklearn(monkeypatch):
+    monkeypatch.setitem(sys.modules, 'sklearn', None)     # makes "import sklearn" fail
+    inputs, output = make_data(50)
+
+    with pytest.raises(PygcamException, match='scikit-learn'):
+        Emulator(kind='gbt').crossValidate(inputs, output)
+
+    with pytest.raises(PygcamException, match='scikit-learn'):
+        Emulator(kind='gbt').fit(inputs, output)
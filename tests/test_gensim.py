@@ -0,0 +1,120 @@
+import json
+import os
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+from pygcam.mcs import pregenerate
+from pygcam.mcs.built_ins import gensim_plugin
+from pygcam.mcs.XMLParameterFile import XMLParameter, decache
+
+ParameterXML = """<ParameterList>
+  <InputFile name="socioeconomics">
+    <Parameter name="p1">
+      <Query>//region/value</Query>
+      <Distribution apply="mult"><Uniform min="0.5" max="1.5"/></Distribution>
+    </Parameter>
+    <Parameter name="p2">
+      <Query>//region/other</Query>
+      <Distribution apply="direct"><Uniform min="0" max="1"/></Distribution>
+    </Parameter>
+  </InputFile>
+</ParameterList>"""
+
+
+@pytest.fixture
+def simulation(tmp_path, monkeypatch):
+    paramFile = tmp_path / 'parameters.xml'
+    paramFile.write_text(ParameterXML)
+
+    argsFile = tmp_path / 'gensim-args.txt'
+    argsFile.write_text('method=sobol\ntrials=8\nseed=123\n')
+
+    state = SimpleNamespace(trials=8, saved=[])
+
+    def readTrialData():
+        return pd.DataFrame(index=range(state.trials))
+
+    def genTrialData(mapper, paramFileObj, method, seed=None, start=0, jobs=1):
+        assert method == 'sobol'
+        names = [param.getName() for param in XMLParameter.getInstances()]
+        return pd.DataFrame(0.5, index=range(start, start + mapper.trial_count), columns=names)
+
+    def saveTrialData(mapper, df, start=0):
+        state.trials = start + df.shape[0]
+        state.saved.append(list(df.index))
+
+    db = SimpleNamespace(addExperiments=lambda *args: None, saveParameterNames=lambda tuples: None,
+                         getTrialCount=lambda simId: state.trials)
+    xmlScenario = SimpleNamespace(scenariosInGroup=lambda group: ['base', 'policy'],
+                                  baselineForGroup=lambda group: 'base')
+
+    monkeypatch.setattr(gensim_plugin, 'SimFileMapper',
+                        lambda **kwargs: SimpleNamespace(project_name='test', scenario_group='group',
+                                                         trial_count=kwargs['trial_count'], sim_dir=str(tmp_path),
+                                                         args_save_file=str(argsFile),
+                                                         get_app_xml_param_file=lambda: str(paramFile),
+                                                         get_scenarios_file=lambda: 'scenarios.xml',
+                                                         read_trial_data_file=readTrialData))
+    monkeypatch.setattr(gensim_plugin.Project, 'readProjectFile',
+                        lambda *args, **kwargs: SimpleNamespace(scenarioSetup=SimpleNamespace(defaultGroup='group')))
+    monkeypatch.setattr('pygcam.xmlScenario.XMLScenario.get_instance', lambda path: xmlScenario)
+    monkeypatch.setattr('pygcam.mcs.database.getDatabase', lambda: db)
+    monkeypatch.setattr('pygcam.mcs.XMLParameterFile.getDatabase', lambda: db)
+    monkeypatch.setattr(gensim_plugin, '_simulationSeed', lambda mapper, seed, append: 123)
+    monkeypatch.setattr(gensim_plugin, 'genTrialData', genTrialData)
+    monkeypatch.setattr(gensim_plugin, 'saveTrialData', saveTrialData)
+
+    decache()
+    yield SimpleNamespace(state=state, argsFile=argsFile, simDir=tmp_path)
+    decache()
+
+def test_extend_simulation_twice(simulation):
+    pregenDir = simulation.simDir / 'pregen-xml'
+    pregenDir.mkdir()
+
+    cacheDir = simulation.simDir / 'trial-xml-cache'
+    cacheDir.mkdir()
+    (cacheDir / 'unused.xml').write_text('<scenario/>')
+    (cacheDir / 'used.xml').write_text('<scenario/>')
+    os.link(cacheDir / 'used.xml', simulation.simDir / 'trial.xml')
+
+    # Parameters are still loaded from the first extension when the second runs
+    assert gensim_plugin.extendSimulation(1, 4) == [8, 9, 10, 11]
+    assert gensim_plugin.extendSimulation(1, 4) == [12, 13, 14, 15]
+    assert simulation.state.saved == [[8, 9, 10, 11], [12, 13, 14, 15]]
+
+    # Only the trial count is updated in the saved arguments
+    assert simulation.argsFile.read_text() == 'method=sobol\ntrials=16\nseed=123\n'
+
+    # Files pre-generated from the old trial data, and cached files no trial uses, are removed
+    assert not pregenDir.exists()
+    assert sorted(os.listdir(cacheDir)) == ['used.xml']
+
+def test_pregenerated_files_digest(tmp_path, monkeypatch):
+    dataFile = tmp_path / 'trialData.csv'
+    dataFile.write_text('trialNum,p1\n0,0.5\n')
+    paramFile = tmp_path / 'parameters.xml'
+    paramFile.write_text(ParameterXML)
+
+    mapper = SimpleNamespace(sim_dir=str(tmp_path), trial_data_file=str(dataFile),
+                             get_app_xml_param_file=lambda: str(paramFile),
+                             context=SimpleNamespace(trialNum=0))
+
+    trialDir = tmp_path / 'pregen-xml' / '000'
+    trialDir.mkdir(parents=True)
+    (trialDir / 'socioeconomics.xml').write_text('<scenario/>')
+    monkeypatch.setattr(pregenerate, 'pregenTrialDir', lambda mapper, trialNum: str(trialDir))
+
+    manifest = tmp_path / 'pregen-xml' / pregenerate.PREGEN_MANIFEST
+
+    # The old format, which has no digest, is rejected
+    manifest.write_text(json.dumps({'socioeconomics': 'socioeconomics.xml'}))
+    assert pregenerate.installPregeneratedFiles(mapper) is False
+
+    # Files generated from other trial data are rejected before any are installed
+    manifest.write_text(json.dumps({'digest': pregenerate._inputDigest(mapper),
+                                    'components': {'socioeconomics': 'socioeconomics.xml'}}))
+    dataFile.write_text('trialNum,p1\n0,0.7\n')
+    assert pregenerate.installPregeneratedFiles(mapper) is False
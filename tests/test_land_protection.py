@@ -1,9 +1,63 @@
 import unittest
 import os
 import subprocess
-from pygcam.landProtection import _makeLandClassXpath, _makeRegionXpath, protectLand, runProtectionScenario
+import tempfile
+from lxml import etree as ET
+from pygcam.landProtection import (_makeLandClassXpath, _makeRegionXpath, protectLand, runProtectionScenario,
+                                   runProtectionScenarios, LandProtection, protectLandTree, protectLandStreaming)
 from pygcam.windows import IsWindows
 
+ProtectionXML = """<landProtection>
+    <group name="Test">
+        <region>USA</region>
+        <region>Brazil</region>
+    </group>
+    <scenario name="streaming-test">
+        <protectedRegion name="Test">
+            <protection>
+                <fraction>0.5</fraction>
+                <landClass>Shrubland</landClass>
+            </protection>
+        </protectedRegion>
+        <protectedRegion name="USA">
+            <protection basin="Basin2">
+                <fraction>0.9</fraction>
+                <landClass>Grassland</landClass>
+            </protection>
+        </protectedRegion>
+    </scenario>
+    <scenario name="parallel-test">
+        <protectedRegion name="Canada">
+            <protection>
+                <fraction>0.25</fraction>
+                <landClass>Grassland</landClass>
+            </protection>
+        </protectedRegion>
+    </scenario>
+</landProtection>"""
+
+def _landLeaf(name, scale):
+    history = ''.join(f'<allocation year="{y}">{scale * (i + 1)}</allocation>'
+                      for i, y in enumerate((1700, 1850, 1950, 1975)))
+    allocs = ''.join(f'<landAllocation year="{y}">{scale * (i + 5)}</landAllocation>'
+                     for i, y in enumerate((1975, 1990, 2005, 2010)))
+    return (f'<UnmanagedLandLeaf name="{name}"><land-use-history>{history}</land-use-history>'
+            f'{allocs}<minAboveGroundCDensity>0</minAboveGroundCDensity></UnmanagedLandLeaf>')
+
+def _landFile(path):
+    regions = []
+    for reg, scale in (('USA', 1.5), ('Canada', 2.0), ('Brazil', 3.25)):
+        leaves = ''.join(_landLeaf(f'{prot}{land}_{basin}', scale * (j + 1))
+                         for j, (prot, land, basin) in enumerate(
+                            (p, l, b) for p in ('', 'Protected') for l in ('Shrubland', 'Grassland')
+                            for b in ('Basin1', 'Basin2')))
+        regions.append(f'<region name="{reg}"><LandAllocatorRoot name="root">'
+                       f'<LandNode name="AllUnmanaged">{leaves}</LandNode></LandAllocatorRoot></region>')
+
+    with open(path, 'w') as f:
+        f.write(f'<?xml version="1.0" encoding="UTF-8"?><scenario name="x"><world>{"".join(regions)}'
+                f'<global-info name="keep">1</global-info></world></scenario>')
+
 class TestLandProtection(unittest.TestCase):
     def setUp(self):
         pass
@@ -55,6 +109,133 @@ class TestLandProtection(unittest.TestCase):
     #         protectLand(infile, outfile, protectedFraction, landClasses=classes, regions=regions)
     #         self.assertFilesEqual(outfile, testfile)
 
+    def test_protect_land_streaming(self):
+        LandProtection(ET.fromstring(ProtectionXML))
+
+        with tempfile.TemporaryDirectory() as tmpDir:
+            infile = os.path.join(tmpDir, 'land_input_2.xml')
+            outfile = os.path.join(tmpDir, 'streamed.xml')
+            _landFile(infile)
+
+            parser = ET.XMLParser(remove_blank_text=True)
+            tree = ET.parse(infile, parser)
+            original = ET.tostring(tree)
+            protectLandTree(tree, 'streaming-test')
+            self.assertNotEqual(ET.tostring(tree), original)
+
+            protectLandStreaming(infile, outfile, 'streaming-test')
+            streamed = ET.parse(outfile, parser)
+            self.assertEqual(ET.tostring(streamed), ET.tostring(tree))
+
+    def test_transform_regions(self):
+        from pygcam.landProtection import transformRegions
+
+        xml = '''<?xml version="1.0" encoding="UTF-8"?>
+<!-- header -->
+<scenario xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:noNamespaceSchemaLocation="x.xsd">
+  <!-- root comment -->
+  <world>
+    <!-- world comment -->
+    <region name="A"><!-- inner --><x>1</x></region>
+    <?pi data?>
+    <region name="B"/>
+  </world>
+</scenario>
+<!-- trailer -->
+'''
+        def renameRegion(tree, regionName):
+            tree.getroot().set('name', regionName.lower())
+
+        with tempfile.TemporaryDirectory() as tmpDir:
+            infile = os.path.join(tmpDir, 'in.xml')
+            outfile = os.path.join(tmpDir, 'out.xml')
+            with open(infile, 'w') as f:
+                f.write(xml)
+
+            transformRegions(infile, outfile, renameRegion)
+
+            parser = ET.XMLParser(remove_blank_text=True)
+            expected = ET.tostring(ET.parse(infile, parser))
+            expected = expected.replace(b'name="A"', b'name="a"').replace(b'name="B"', b'name="b"')
+            self.assertEqual(ET.tostring(ET.parse(outfile, parser)), expected)
+
+    def test_protect_land_fractions(self):
+        from pygcam.landProtection import _protect_land
+
+        with tempfile.TemporaryDirectory() as tmpDir:
+            infile = os.path.join(tmpDir, 'land_input_2.xml')
+            _landFile(infile)
+            tree = ET.parse(infile)
+
+        # protections are applied in order, so Basin2's fraction replaces the one for all basins
+        _protect_land(tree, {'USA': [('Shrubland', None, 0.3), ('Shrubland', 'Basin2', 0.5)]})
+
+        def values(leafName, tag='landAllocation', region='USA'):
+            xpath = f'//region[@name="{region}"]//UnmanagedLandLeaf[@name="{leafName}"]//{tag}'
+            return {node.get('year'): float(node.text) for node in tree.xpath(xpath)}
+
+        prot, unprot = values('ProtectedShrubland_Basin1'), values('Shrubland_Basin1')
+        self.assertAlmostEqual(prot['1975'], 13.5)      # (7.5 + 37.5) * 0.3
+        self.assertAlmostEqual(unprot['1975'], 31.5)
+
+        prot, unprot = values('ProtectedShrubland_Basin1', 'allocation'), values('Shrubland_Basin1', 'allocation')
+        self.assertAlmostEqual(prot['1700'], 2.7)       # (1.5 + 7.5) * 0.3
+        self.assertAlmostEqual(unprot['1700'], 6.3)
+        self.assertAlmostEqual(prot['1975'], 13.5)      # from landAllocation in 1975
+
+        prot, unprot = values('ProtectedShrubland_Basin2'), values('Shrubland_Basin2')
+        self.assertAlmostEqual(prot['2010'], 48.0)      # (24 + 72) * 0.5
+        self.assertAlmostEqual(unprot['2010'], 48.0)
+
+        self.assertEqual(values('Grassland_Basin1')['2010'], 36.0)
+        self.assertEqual(values('Shrubland_Basin1', region='Canada')['2010'], 16.0)
+
+    def test_protect_land_missing_unprotected(self):
+        from pygcam.error import FileFormatError
+        from pygcam.landProtection import _protect_land
+
+        tree = ET.ElementTree(ET.fromstring(f'<scenario><world><region name="USA"><LandNode name="AllUnmanaged">'
+                                            f'{_landLeaf("ProtectedForest_B1", 1.0)}</LandNode></region>'
+                                            f'</world></scenario>'))
+        original = ET.tostring(tree)
+
+        with self.assertRaisesRegex(FileFormatError, "'Forest_B1' was not found"):
+            _protect_land(tree, {'USA': [('Forest', None, 0.5)]})
+
+        self.assertEqual(ET.tostring(tree), original)
+
+    def test_protection_scenarios_parallel(self):
+        scenarios = ['streaming-test', 'parallel-test']
+
+        with tempfile.TemporaryDirectory() as tmpDir:
+            scenarioFile = os.path.join(tmpDir, 'protection.xml')
+            with open(scenarioFile, 'w') as f:
+                f.write(ProtectionXML)
+
+            xmlFiles = [os.path.join(tmpDir, f'land_input_{num}.xml') for num in (2, 3)]
+            for path in xmlFiles:
+                _landFile(path)
+
+            parallelDir = os.path.join(tmpDir, 'parallel')
+            results = runProtectionScenarios(scenarios, outputDir=parallelDir, scenarioFile=scenarioFile,
+                                             xmlFiles=xmlFiles, jobs=0)
+
+            expected = [os.path.join(parallelDir, scen, os.path.basename(path))
+                        for scen in scenarios for path in xmlFiles]
+            self.assertEqual([outFile for outFile, seconds in results], expected)
+
+            for scen in scenarios:
+                seqDir = os.path.join(tmpDir, 'sequential', scen)
+                os.makedirs(seqDir)
+                runProtectionScenario(scen, outputDir=seqDir, scenarioFile=scenarioFile,
+                                      xmlFiles=xmlFiles, jobs=1)
+
+                for path in xmlFiles:
+                    basename = os.path.basename(path)
+                    with open(os.path.join(seqDir, basename)) as f1, \
+                         open(os.path.join(parallelDir, scen, basename)) as f2:
+                        self.assertEqual(f1.read(), f2.read())
+
     # TBD: needs to be updated
     # deprecated post v5.0
     def _test_protection_scenario(self):
@@ -0,0 +1,160 @@
+import numpy as np
+import pytest
+from scipy import stats
+
+from pygcam.mcs.LHS import (rankColumns, rankCorrCoef, genRankValues, correlationBlocks,
+                            repairCorrMatrix, lhs, randomStreams)
+
+def loop_rank_corr(m):
+    cols = m.shape[1]
+    corrCoef = np.eye(cols)
+    for i in range(cols):
+        for j in range(i + 1, cols):
+            corrCoef[i, j] = corrCoef[j, i] = stats.spearmanr(m[:, i], m[:, j])[0]
+    return corrCoef
+
+def test_rank_columns():
+    m = np.array([[3.0, 0.1], [1.0, 0.3], [2.0, 0.2]])
+    assert rankColumns(m).tolist() == [[3, 1], [1, 3], [2, 2]]
+
+@pytest.mark.parametrize("ties", [False, True])
+def test_rank_corr_coef(ties):
+    rng = np.random.default_rng(7)
+    m = rng.normal(size=(200, 6))
+    if ties:
+        m = np.round(m)
+
+    assert np.allclose(rankCorrCoef(m), loop_rank_corr(m))
+
+def test_gen_rank_values():
+    np.random.seed(11)
+    params, trials = 4, 1000
+    corrMat = np.eye(params)
+    corrMat[0, 1] = corrMat[1, 0] = 0.8
+    corrMat[2, 3] = corrMat[3, 2] = -0.5
+
+    ranks = genRankValues(params, trials, corrMat)
+    assert ranks.shape == (trials, params)
+
+    # each column is a permutation of 1..trials
+    assert all(sorted(ranks[:, i]) == list(range(1, trials + 1)) for i in range(params))
+    assert np.allclose(rankCorrCoef(ranks), corrMat, atol=0.05)
+
+def test_correlation_blocks():
+    corrMat = np.eye(6)
+    corrMat[0, 3] = corrMat[3, 0] = 0.5
+    corrMat[3, 5] = corrMat[5, 3] = 0.2
+    corrMat[1, 2] = corrMat[2, 1] = -0.4
+
+    blocks = correlationBlocks(corrMat)
+    assert [block.tolist() for block in blocks] == [[0, 3, 5], [1, 2]]
+
+def test_repair_corr_matrix():
+    # pairwise valid, but not jointly positive definite
+    corrMat = np.array([[1.0, 0.9, -0.9],
+                        [0.9, 1.0, 0.9],
+                        [-0.9, 0.9, 1.0]])
+
+    with pytest.raises(np.linalg.LinAlgError):
+        np.linalg.cholesky(corrMat)
+
+    repaired = repairCorrMatrix(corrMat)
+    np.linalg.cholesky(repaired)
+    assert np.allclose(np.diag(repaired), 1.0)
+    assert np.allclose(repaired, repaired.T)
+    assert np.all(np.sign(repaired) == np.sign(corrMat))
+
+    identity = np.eye(3)
+    assert repairCorrMatrix(identity) is identity
+
+class RV(object):
+    class param:
+        class dataSrc:
+            distroName = 'uniform'
+
+    def ppf(self, q):
+        return stats.norm.ppf(q)
+
+def test_lhs_blocks():
+    np.random.seed(3)
+    params, trials = 8, 2000
+    corrMat = np.eye(params)
+    corrMat[1, 6] = corrMat[6, 1] = 0.7
+    corrMat[2, 4] = corrMat[4, 2] = -0.6
+
+    samples = lhs([RV() for _ in range(params)], trials, corrMat=corrMat)
+    assert np.allclose(rankCorrCoef(samples), corrMat, atol=0.06)
+
+def test_lhs_seed():
+    params, trials = 5, 100
+    corrMat = np.eye(params)
+    corrMat[0, 2] = corrMat[2, 0] = 0.5
+    columns = [f"p{i}" for i in range(params)]
+    rvs = [RV() for _ in range(params)]
+
+    df1 = lhs(rvs, trials, corrMat=corrMat, columns=columns, seed=42)
+    df2 = lhs(rvs, trials, corrMat=corrMat, columns=columns, seed=42, jobs=4)
+    assert df1.equals(df2)
+
+    # Streams are identified by name, not position, so other parameters
+    # are unaffected by adding one.
+    df3 = lhs(rvs[:4] + [RV()], trials, columns=columns[:4] + ['new'], seed=42)
+    df4 = lhs(rvs[:4], trials, columns=columns[:4], seed=42)
+    assert df3[columns[:4]].equals(df4)
+
+    # A different starting trial gets different streams
+    df5 = lhs(rvs, trials, corrMat=corrMat, columns=columns, seed=42, start=trials)
+    assert not np.allclose(df1.values, df5.values)
+
+class GridParam(object):
+    class param:
+        class dataSrc:
+            distroName = 'grid'
+
+    def __init__(self):
+        from pygcam.mcs.distro import GridRV
+        self.rv = GridRV(0, 1, 5)
+
+    def ppf(self, q):
+        return self.rv.ppf(q)
+
+def test_lhs_seed_grid():
+    trials = 100
+    corrMat = np.array([[1.0, 0.5, 0.0], [0.5, 1.0, 0.0], [0.0, 0.0, 1.0]])
+    rvs = [GridParam(), RV(), GridParam()]     # correlated and independent grid columns
+
+    np.random.seed(1)
+    df1 = lhs(rvs, trials, corrMat=corrMat, columns=['a', 'b', 'c'], seed=42)
+    np.random.seed(2)
+    df2 = lhs(rvs, trials, corrMat=corrMat, columns=['a', 'b', 'c'], seed=42)
+    assert df1.equals(df2)
+    assert sorted(df1.c) == sorted(np.resize(np.linspace(0, 1, 5), trials))
+
+def test_random_streams():
+    a, b, c = randomStreams(1, ['x', 'y', 'x'])
+    x = a.random(5)
+    assert not np.allclose(x, b.random(5))
+    assert not np.allclose(x, c.random(5))      # repeated names get distinct streams
+    assert np.allclose(x, randomStreams(1, ['x'])[0].random(5))
+
+def test_qmc_sample():
+    from pygcam.mcs.QMC import qmcSample
+
+    params, trials = 4, 256
+    rvs = [RV() for _ in range(params)]
+    corrMat = np.eye(params)
+    corrMat[0, 3] = corrMat[3, 0] = 0.7
+
+    for method in ('sobol', 'halton'):
+        samples = qmcSample(rvs, trials, method=method, corrMat=corrMat, seed=5)
+        assert np.all(np.isfinite(samples))
+        assert np.allclose(samples.mean(axis=0), 0, atol=0.02)
+        corr = rankCorrCoef(samples)
+        assert abs(corr[0, 3] - 0.7) < 0.05
+        assert abs(corr[1, 2]) < 0.02       # jointly low-discrepancy columns
+
+    # appending continues the sequence
+    whole = qmcSample(rvs[1:3], 2 * trials, method='sobol', seed=5)
+    first = qmcSample(rvs[1:3], trials, method='sobol', seed=5)
+    rest = qmcSample(rvs[1:3], trials, method='sobol', seed=5, start=trials)
+    assert np.allclose(whole, np.vstack([first, rest]))
@@ -0,0 +1,117 @@
+import os
+import pytest
+
+from pygcam.manifest import FileManifest
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(text)
+
+@pytest.mark.parametrize("use_hash", [False, True])
+def test_manifest_diff(tmp_path, use_hash):
+    root = str(tmp_path)
+    write(f'{root}/input/xml/a.xml', 'aaa')
+    write(f'{root}/input/xml/b.xml', 'bbb')
+    write(f'{root}/exe/log_conf.xml', 'log')
+
+    relpaths = ['input/xml', 'exe/log_conf.xml', 'exe/missing']
+    old = FileManifest.from_tree(root, relpaths, use_hash=use_hash)
+    assert sorted(old.entries) == ['exe/log_conf.xml', 'input/xml/a.xml', 'input/xml/b.xml']
+
+    path = f'{root}/manifest.json'
+    old.save(path)
+    old = FileManifest.load(path)
+
+    write(f'{root}/input/xml/a.xml', 'changed')
+    write(f'{root}/input/xml/c.xml', 'ccc')
+    os.remove(f'{root}/input/xml/b.xml')
+
+    new = FileManifest.from_tree(root, relpaths, use_hash=use_hash)
+    changed, removed = new.diff(old)
+    assert changed == ['input/xml/a.xml', 'input/xml/c.xml']
+    assert removed == ['input/xml/b.xml']
+
+    assert new.diff(new) == ([], [])
+
+def test_manifest_load_missing(tmp_path):
+    assert FileManifest.load(str(tmp_path / 'no-such-file.json')) is None
+
+def test_setup_fingerprint(tmp_path):
+    from types import SimpleNamespace
+    from pygcam.config import getParam, setParam, pathjoin
+    from pygcam.manifest import readFingerprint, writeFingerprint
+    from pygcam.xmlEditor import XMLEditor
+    from pygcam.xmlScenario import setupFingerprint
+
+    root = str(tmp_path)
+    write(f'{root}/input/policy/carbon_tax_10_5.xml', '<tax/>')
+    write(f'{root}/project/xmlsrc/tax-10/sub/static.xml', '<static/>')
+    write(f'{root}/project/etc/data.csv', 'a,b')
+    write(f'{root}/other/named.csv', 'a,b')
+
+    scenariosFile = getParam('GCAM.ScenariosFile')
+    setParam('GCAM.ScenariosFile', pathjoin(os.path.dirname(__file__), 'data/test-project/etc/scenarios.xml'))
+    setParam('GCAM.TestNamedFile', f'{root}/other/named.csv')
+
+    try:
+        mapper = SimpleNamespace(mcs_mode=None, scenario='tax-10', baseline='base', scenario_group='group1',
+                                 sandbox_baseline_xml=f'{root}/local-xml/base', sandbox_exe_dir=f'{root}/exe',
+                                 project_etc_dir=f'{root}/project/etc', project_xml_src=f'{root}/project/xmlsrc',
+                                 sandbox_workspace=root)
+        args = SimpleNamespace(dynamic_only=False, static_only=False, run_config_setup=True,
+                               run_non_config_setup=True, stopYear=None, years='2015-2100')
+
+        # policy can't be skipped until the baseline has a fingerprint
+        assert setupFingerprint(mapper, XMLEditor, args) is None
+
+        os.makedirs(f'{root}/local-xml/base')
+        writeFingerprint(f'{root}/local-xml/base/.setup_fingerprint', 'abc')
+        assert readFingerprint(f'{root}/local-xml/base/.setup_fingerprint') == 'abc'
+
+        fp1 = setupFingerprint(mapper, XMLEditor, args)
+        assert fp1 and fp1 == setupFingerprint(mapper, XMLEditor, args)
+
+        # changing a referenced file, an argument, or the baseline changes the fingerprint
+        write(f'{root}/input/policy/carbon_tax_10_5.xml', '<tax value="10"/>')
+        fp2 = setupFingerprint(mapper, XMLEditor, args)
+        assert fp2 != fp1
+
+        args.stopYear = 2050
+        fp3 = setupFingerprint(mapper, XMLEditor, args)
+        assert fp3 != fp2
+
+        # as does changing any file in the project's etc or xmlsrc trees, or named by a config variable
+        for path in ('project/xmlsrc/tax-10/sub/static.xml', 'project/etc/data.csv', 'other/named.csv'):
+            write(f'{root}/{path}', 'changed')
+            fp4 = setupFingerprint(mapper, XMLEditor, args)
+            assert fp4 != fp3
+            fp3 = fp4
+
+        writeFingerprint(f'{root}/local-xml/base/.setup_fingerprint', 'def')
+        assert setupFingerprint(mapper, XMLEditor, args) != fp3
+
+        mapper.mcs_mode = 'trial'
+        assert setupFingerprint(mapper, XMLEditor, args) is None
+    finally:
+        setParam('GCAM.ScenariosFile', scenariosFile)
+
+@pytest.mark.skipif(os.name == 'nt', reason="no file locking on Windows")
+def test_lock_file(tmp_path):
+    import threading
+    from pygcam.file_utils import lockFile
+
+    path = str(tmp_path / '.update_lock')
+    acquired = threading.Event()
+
+    def waiter():
+        with lockFile(path):
+            acquired.set()
+
+    with lockFile(path):
+        thread = threading.Thread(target=waiter)
+        thread.start()
+        assert not acquired.wait(0.2)   # blocked while the lock is held
+
+    thread.join(5)
+    assert acquired.is_set()
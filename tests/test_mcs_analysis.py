@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pygcam.mcs.analysis import spearmanCorrelation, rankCorrelationMatrix, cumulativeRankCorrelation
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(1)
+    trials = 500
+    inputs = pd.DataFrame(rng.normal(size=(trials, 4)), columns=['a', 'b', 'c', 'd'])
+    inputs['d'] = np.round(inputs['d'])     # include ties
+    outputs = pd.DataFrame({'y1': inputs.a + 0.5 * inputs.b ** 3 + rng.normal(size=trials),
+                            'y2': -inputs.c + rng.normal(size=trials)})
+    return inputs, outputs
+
+def test_spearman_correlation(data):
+    inputs, outputs = data
+    y = outputs.y1
+    expected = [y.corr(inputs[col], method='spearman') for col in inputs.columns]
+
+    spearman = spearmanCorrelation(inputs, y)
+    assert spearman.name == 'spearman'
+    assert np.allclose(spearman.values, expected)
+
+    corr = rankCorrelationMatrix(inputs, outputs)
+    assert corr.shape == (4, 2)
+    assert np.allclose(corr.y1, expected)
+    assert corr.loc['c', 'y2'] == pytest.approx(outputs.y2.corr(inputs.c, method='spearman'))
+
+def test_spearman_missing_results(data):
+    inputs, outputs = data
+    y = outputs.y1.copy()
+    y.iloc[[3, 50, 70]] = np.nan
+    expected = [y.corr(inputs[col], method='spearman') for col in inputs.columns]
+    assert np.allclose(spearmanCorrelation(inputs, y).values, expected)
+
+def test_cumulative_rank_correlation(data):
+    inputs, outputs = data
+    y = outputs.y1
+    counts = [100, 200, 500]
+
+    df = cumulativeRankCorrelation(inputs, y, counts)
+    assert list(df.columns) == ['paramName', 'spearman', 'abs', 'count']
+    assert len(df) == len(counts) * inputs.shape[1]
+
+    final = df[df['count'] == 500].set_index('paramName').spearman
+    assert np.allclose(final.values, spearmanCorrelation(inputs, y).values)
+
+    early = df[df['count'] == 100].set_index('paramName').spearman
+    assert np.allclose(early.values, spearmanCorrelation(inputs[:100], y[:100]).values, atol=0.05)
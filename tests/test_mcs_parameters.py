@@ -0,0 +1,44 @@
+import pandas as pd
+import pytest
+from lxml import etree as ET
+
+from pygcam.mcs.XMLParameterFile import XMLParameter, decache
+
+input_xml = """<scenario>
+  <region name="USA"><value>1.0</value><value>2.0</value><value>4.0</value></region>
+</scenario>"""
+
+def make_param(name, apply, bounds=''):
+    text = f"""<Parameter name="{name}">
+      <Query>//region/value</Query>
+      <Distribution apply="{apply}" {bounds}><Uniform min="0.5" max="1.5"/></Distribution>
+    </Parameter>"""
+    param = XMLParameter(ET.fromstring(text))
+    return param
+
+@pytest.fixture
+def tree():
+    decache()
+    yield ET.ElementTree(ET.fromstring(input_xml))
+    decache()
+
+@pytest.mark.parametrize("apply, bounds, expected",
+                         [('mult',   '', [1.5, 3.0, 6.0]),
+                          ('add',    '', [2.5, 3.5, 5.5]),
+                          ('direct', '', [1.5, 1.5, 1.5]),
+                          ('mult',   'highbound="4.0"', [1.5, 3.0, 4.0]),
+                          ('add',    'lowbound="3.0"',  [3.0, 3.5, 5.5]),
+                          ])
+def test_update_elements(tree, apply, bounds, expected):
+    param = make_param('p1', apply, bounds)
+    param.runQuery(tree)
+
+    df = pd.DataFrame({'p1': [0.5, 1.5]}, index=[0, 1])
+    XMLParameter.applyTrial(1, 1, df)
+
+    values = [float(elt.text) for elt in tree.xpath('//region/value')]
+    assert values == expected
+
+    # Plan applies to original values, not those set by the prior trial
+    XMLParameter.applyTrial(1, 1, df)
+    assert [float(elt.text) for elt in tree.xpath('//region/value')] == expected
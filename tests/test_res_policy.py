@@ -0,0 +1,56 @@
+from lxml import etree as ET
+
+from pygcam.RESPolicy import ElementIndex, merge_elements, write_xml
+
+Base = """<scenario>
+  <world>
+    <region name="A">
+      <supplysector name="electricity">
+        <subsector name="solar"><period year="2020"><x>1</x></period></subsector>
+      </supplysector>
+    </region>
+  </world>
+</scenario>"""
+
+Update = """<scenario>
+  <world>
+    <region name="A">
+      <supplysector name="electricity">
+        <subsector name="solar"><period year="2020"><y>2</y></period><period year="2025"/></subsector>
+        <subsector name="wind"/>
+      </supplysector>
+    </region>
+    <region name="B"/>
+  </world>
+</scenario>"""
+
+Expected = """<scenario><world><region name="A"><supplysector name="electricity">\
+<subsector name="solar"><period year="2020"><x>1</x><y>2</y></period><period year="2025"/></subsector>\
+<subsector name="wind"/></supplysector></region><region name="B"/></world></scenario>"""
+
+
+def parse(xml):
+    return ET.fromstring(xml, ET.XMLParser(remove_blank_text=True))
+
+def test_merge_elements():
+    root = parse(Base)
+    merge_elements(root, parse(Update))
+    assert ET.tostring(root).decode() == Expected
+
+    # merging again with a persistent index changes nothing
+    index = ElementIndex(root)
+    index.merge_elements(parse(Update))
+    assert ET.tostring(root).decode() == Expected
+
+    world = index.child('world')
+    assert world.elt is root[0]
+    assert world.child('region', name='C').elt is root[0][2]
+
+def test_write_xml_streaming(tmp_path):
+    paths = [str(tmp_path / f'{name}.xml') for name in ('full', 'streamed')]
+    for path, streaming in zip(paths, (False, True)):
+        root = ET.fromstring(Update)
+        write_xml(ET.ElementTree(root), path, streaming=streaming)
+
+    with open(paths[0]) as f1, open(paths[1]) as f2:
+        assert f1.read() == f2.read()
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+from scipy import stats
+
+from pygcam.mcs.sensitivity import saltelliDesign, sobolIndices, sobolIndicesDF
+
+class Uniform(object):
+    def __init__(self, low, high):
+        self.rv = stats.uniform(loc=low, scale=high - low)
+
+    def ppf(self, q):
+        return self.rv.ppf(q)
+
+def ishigami(X, a=7, b=0.1):
+    return np.sin(X[:, 0]) + a * np.sin(X[:, 1]) ** 2 + b * X[:, 2] ** 4 * np.sin(X[:, 0])
+
+def test_saltelli_design():
+    rvs = [Uniform(0, 1) for _ in range(3)]
+    X, active = saltelliDesign(rvs, 8, seed=1)
+    assert X.shape == (8 * 5, 3)
+    assert active == [0, 1, 2]
+
+    blocks = X.reshape(8, 5, 3)
+    A, B = blocks[:, 0, :], blocks[:, 4, :]
+    for i in range(3):
+        AB = blocks[:, 1 + i, :]
+        assert np.all(AB[:, i] == B[:, i])
+        others = [j for j in range(3) if j != i]
+        assert np.all(AB[:, others] == A[:, others])
+
+def test_sobol_indices_ishigami():
+    rvs = [Uniform(-np.pi, np.pi) for _ in range(3)]
+    X, _ = saltelliDesign(rvs, 4096, seed=2)
+    y = ishigami(X)
+
+    # Second output is a scaled copy, which has the same indices
+    Y = np.column_stack([y, 3 * y])
+    result = sobolIndices(Y, 3, bootstrap=200, seed=3)
+
+    S1 = [0.314, 0.442, 0.0]
+    ST = [0.558, 0.442, 0.244]
+    for k in range(2):
+        assert np.allclose(result['S1'][:, k], S1, atol=0.04)
+        assert np.allclose(result['ST'][:, k], ST, atol=0.04)
+
+    assert np.all(result['S1_lo'] <= result['S1']) and np.all(result['S1'] <= result['S1_hi'])
+    assert np.all(result['ST_lo'] <= result['ST']) and np.all(result['ST'] <= result['ST_hi'])
+
+    df = sobolIndicesDF(Y, ['x1', 'x2', 'x3'], ['y', 'y3'], bootstrap=0)
+    assert list(df.columns) == ['output', 'parameter', 'S1', 'ST']
+    assert df.shape == (6, 4)
+    assert df.loc[0, 'S1'] == pytest.approx(result['S1'][0, 0])
@@ -0,0 +1,110 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+from lxml import etree as ET
+
+from pygcam.error import PygcamException
+from pygcam.project import Project, Step
+from pygcam.step_graph import StepGraph
+
+StepsXML = """<steps>
+    <step seq="1" name="setup">setup {scenario}</step>
+    <step seq="2" name="gcam">gcam {scenario}</step>
+    <step seq="3" name="query">query {scenario}</step>
+    <step seq="4" name="diff" runFor="policy" dependsOn="query,baseline:query">diff {scenario}</step>
+    <step seq="5" name="plot" optional="1">plot {scenario}</step>
+</steps>"""
+
+
+def fakeProject():
+    steps = [Step(node) for node in ET.fromstring(StepsXML)]
+    scenarios = {'base': SimpleNamespace(name='base', isBaseline=True,  isActive=True),
+                 'pol1': SimpleNamespace(name='pol1', isBaseline=False, isActive=True),
+                 'pol2': SimpleNamespace(name='pol2', isBaseline=False, isActive=True)}
+
+    project = SimpleNamespace(stepsDict={f"{s.name}-{s.seq}": s for s in steps},
+                              sortedSteps=steps, scenarioDict=scenarios, scenarioGroupName='group')
+    project.stepsToRun = lambda steps, explicit: Project.stepsToRun(project, steps, explicit)
+    return project
+
+
+def buildGraph(scenarios=('base', 'pol1', 'pol2'), steps=('setup', 'gcam', 'query', 'diff', 'plot'), explicit=()):
+    project = fakeProject()
+    return Project.buildStepGraph(project, list(scenarios), set(steps), list(explicit))
+
+
+def test_default_dependencies():
+    graph = buildGraph()
+
+    assert ('base', 'diff') not in graph            # runFor="policy"
+    assert ('pol1', 'plot') not in graph            # optional, not explicit
+
+    assert graph.nodes[('base', 'gcam')].deps == {('base', 'setup')}
+    assert graph.nodes[('pol1', 'gcam')].deps == {('pol1', 'setup'), ('base', 'gcam')}
+    assert graph.nodes[('pol2', 'diff')].deps == {('pol2', 'query'), ('base', 'query')}
+
+
+def test_explicit_optional_and_missing_baseline():
+    graph = buildGraph(scenarios=['pol1'], steps=['gcam', 'plot'], explicit=['plot'])
+
+    assert list(graph.nodes) == [('pol1', 'gcam'), ('pol1', 'plot')]
+    assert graph.nodes[('pol1', 'gcam')].deps == set()
+    assert graph.nodes[('pol1', 'plot')].deps == {('pol1', 'gcam')}
+
+
+def test_run_order_and_resume():
+    graph = buildGraph()
+    order = []
+
+    failed, notRun = graph.run(lambda node: order.append(str(node)))
+    assert not (failed or notRun)
+    assert order[:3] == ['base:setup', 'base:gcam', 'base:query']
+    assert order.index('pol1:diff') > order.index('pol1:query')
+
+    # resume after a failure in pol1's query
+    def fail(node):
+        if str(node) == 'pol1:query':
+            raise PygcamException('query failed')
+        order.append(str(node))
+
+    order = []
+    completed = []
+    failed, notRun = graph.run(fail, completed=[], onComplete=lambda node: completed.append(node.key))
+    assert [str(node) for node in failed] == ['pol1:query']
+    assert 'pol1:diff' in map(str, notRun)
+
+    order = []
+    failed, notRun = graph.run(lambda node: order.append(str(node)), completed=completed)
+    assert not failed
+    assert 'pol1:query' in order and 'base:setup' not in order
+
+
+def test_parallel_limit():
+    graph = buildGraph()
+    lock = threading.Lock()
+    state = {'running': 0, 'max': 0}
+
+    def runNode(node):
+        with lock:
+            state['running'] += 1
+            state['max'] = max(state['max'], state['running'])
+        time.sleep(0.01)
+        with lock:
+            state['running'] -= 1
+
+    failed, notRun = graph.run(runNode, jobs=2)
+    assert not (failed or notRun)
+    assert state['max'] == 2
+
+
+def test_cycle():
+    graph = StepGraph()
+    a = graph.add('s', SimpleNamespace(name='a', seq=1))
+    b = graph.add('s', SimpleNamespace(name='b', seq=2))
+    graph.addDependency(a.key, b.key)
+    graph.addDependency(b.key, a.key)
+
+    with pytest.raises(PygcamException, match='cycle'):
+        graph.checkCycles()
@@ -1,6 +1,7 @@
 import pytest
 from pygcam.mcs.error import PygcamMcsUserError
 from pygcam.sectorEditors import extractStubTechnology
+from pygcam.xml_cache import getDocumentCache, DocumentCache
 from pygcam.xml_edit import xmlSel, xmlEdit
 from pygcam.XMLConfigFile import XMLConfigFile, INTS_GROUP
 
@@ -76,3 +77,146 @@ def test_xml_config_file():
     cfg_file.update_config_element(int_arg, INTS_GROUP, newName=new_name)
     # old elt should have been edited in place
     assert elt.attrib['name'] == new_name
+
+
+def test_edit_with_bindings(tmp_path):
+    from pygcam.xml_edit import CachedFile, compiledXPath, xmlFind, xmlIns, XPATH_CACHE_SIZE
+    from lxml import etree as ET
+
+    path = tmp_path / 'share_weights.xml'
+    path.write_text('''<scenario><world>
+      <region name="USA"><supplysector name="refining"><subsector name="biomass liquids">
+        <share-weight year="2020">1</share-weight><share-weight year="2025">1</share-weight>
+      </subsector></supplysector></region>
+      <region name="EU-12"><supplysector name="refining"><subsector name="biomass liquids">
+        <share-weight year="2020">1</share-weight><share-weight year="2025">1</share-weight>
+      </subsector></supplysector></region>
+    </world></scenario>''')
+
+    subsect = '//region[@name=$region]/supplysector[@name="refining"]/subsector[@name="biomass liquids"]'
+    xpath = subsect + '/share-weight[@year=$year]'
+
+    pairs = [(xpath, i, {'region': region, 'year': year})
+             for i, (region, year) in enumerate([('USA', '2020'), ('USA', '2025'), ('EU-12', '2025')])]
+    pairs.append((subsect + '/@name', 'ethanol', {'region': 'EU-12'}))
+
+    item = CachedFile.getFile(str(path))
+    assert xmlEdit(item, pairs)
+
+    # each distinct xpath is compiled once, and the cache is bounded
+    assert compiledXPath(xpath) is compiledXPath(xpath)
+    for i in range(XPATH_CACHE_SIZE + 10):
+        compiledXPath(f'//region[@name="r{i}"]')
+    assert compiledXPath.cache_info().currsize == XPATH_CACHE_SIZE
+
+    values = {(elt.getparent().getparent().getparent().get('name'), elt.get('year')): elt.text
+              for elt in item.tree.iter('share-weight')}
+    assert values == {('USA', '2020'): '0', ('USA', '2025'): '1', ('EU-12', '2020'): '1', ('EU-12', '2025'): '2'}
+
+    assert xmlSel(item, subsect, bindings={'region': 'USA'})
+    assert not xmlSel(item, subsect, bindings={'region': 'EU-12'})      # subsector was renamed
+    assert xmlFind(item, xpath, bindings={'region': 'China', 'year': '2020'}) is None
+
+    xmlIns(item, subsect, ET.Element('share-weight', year='2030'), bindings={'region': 'USA'})
+    assert xmlSel(item, xpath, bindings={'region': 'USA', 'year': '2030'})
+
+    getDocumentCache().remove(item.filename, CachedFile.kind)
+
+
+def test_structural_index(tmp_path):
+    from pygcam.xml_edit import CachedFile, xmlIns
+    from lxml import etree as ET
+
+    path = tmp_path / 'techs.xml'
+    path.write_text('''<scenario><world>
+      <region name="USA"><supplysector name="refining"><subsector name="biomass liquids">
+        <stub-technology name="corn ethanol"><period year="2020"/><period year="2025"/></stub-technology>
+        <stub-technology name="cellulosic ethanol"><period year="2020"/></stub-technology>
+      </subsector></supplysector></region>
+      <global-technology-database>
+        <location-info sector-name="electricity" subsector-name="wind">
+          <intermittent-technology name="wind"><period year="2020"/></intermittent-technology>
+        </location-info>
+      </global-technology-database>
+    </world></scenario>''')
+
+    item = CachedFile.getFile(str(path))
+    index = item.structural_index()
+    assert item.structural_index() is index
+
+    period = index.get('USA', 'refining', 'biomass liquids', 'corn ethanol', 2025)
+    assert period.tag == 'period' and period.get('year') == '2025'
+    assert index.get('USA', 'refining', 'biomass liquids').tag == 'subsector'
+    assert index.get('USA', 'refining', 'biomass liquids', 'corn ethanol', 2030) is None
+    assert index.names('USA', 'refining', 'biomass liquids') == ['corn ethanol', 'cellulosic ethanol']
+    assert index.names() == ['USA']
+
+    # global technology database is indexed with region None
+    gtdb = item.structural_index(technologyTag='intermittent-technology')
+    assert gtdb.get(None, 'electricity', 'wind', 'wind', 2020).tag == 'period'
+    assert gtdb.names(None) == ['electricity']
+
+    # inserted elements are indexed
+    techXpath = '//stub-technology[@name="cellulosic ethanol"]'
+    xmlIns(item, techXpath, ET.Element('period', year='2025'))
+    assert index.get('USA', 'refining', 'biomass liquids', 'cellulosic ethanol', 2025) is not None
+
+    # renaming invalidates the indexes
+    xmlEdit(item, [(techXpath + '/@name', 'switchgrass ethanol')])
+    index = item.structural_index()
+    assert index.names('USA', 'refining', 'biomass liquids') == ['corn ethanol', 'switchgrass ethanol']
+
+    getDocumentCache().remove(item.filename, CachedFile.kind)
+
+
+def test_document_cache(tmp_path):
+    from pygcam.xml_edit import CachedFile
+    from pygcam.XMLFile import XMLFile
+
+    cache = getDocumentCache()
+    paths = []
+    for i in range(3):
+        path = tmp_path / f'doc{i}.xml'
+        path.write_text(f'<scenario><world><region name="R{i}"/></world></scenario>')
+        paths.append(str(path))
+
+    avoided = cache.avoided
+    item = CachedFile.getFile(paths[0])
+    assert CachedFile.getFile(paths[0]) is item
+    assert cache.avoided == avoided + 1
+
+    # read-only XMLFile users share one parse, separate from CachedFile's
+    tree = XMLFile(paths[0], useCache=True).getTree()
+    assert XMLFile(paths[0], useCache=True).getTree() is tree
+    assert tree is not item.tree
+
+    # edits are written back, and the file isn't reloaded because of our own write
+    xmlEdit(item, [('//region/@name', 'USA')])
+    item.save_edits()
+    assert CachedFile.getFile(paths[0]) is item
+    assert XMLFile(paths[0], useCache=True).getTree() is not tree     # file changed on disk
+
+    # a file changed on disk is reloaded
+    with open(paths[0], 'w') as f:
+        f.write('<scenario><world><region name="China"/></world></scenario>')
+    item2 = CachedFile.getFile(paths[0])
+    assert item2 is not item and xmlSel(item2, '//region[@name="China"]')
+
+    # least recently used documents are evicted, but those with unsaved edits are
+    # kept (and not written) and don't count against the limit
+    small = DocumentCache(maxDocs=1)
+    doc = small.get(paths[0], CachedFile.kind, CachedFile)
+    doc.edited = True
+    doc.tree.getroot().set('edited', '1')
+    for path in paths[1:3]:
+        small.get(path, CachedFile.kind, CachedFile)
+    assert small.peek(paths[0], CachedFile.kind) is doc
+    assert small.peek(paths[1], CachedFile.kind) is None
+    assert small.peek(paths[2], CachedFile.kind) is not None
+    assert 'edited="1"' not in open(paths[0]).read()
+
+    small.save(CachedFile.kind)
+    assert 'edited="1"' in open(paths[0]).read()
+
+    for path in paths:
+        cache.remove(path, CachedFile.kind)
@@ -5,3 +5,54 @@ def load_config_from_string(text):
     stream = StringIO(text)
     readConfigFile(stream)
 
+# Arguments for each registered DistroGen signature
+DISTRO_ARGS = [
+    ('uniform',    dict(min=0.5, max=1.5)),
+    ('uniform',    dict(range=0.2)),
+    ('uniform',    dict(factor=0.2)),
+    ('uniform',    dict(logfactor=3)),
+    ('loguniform', dict(factor=3)),
+    ('normal',     dict(mean=1, std=0.1)),
+    ('normal',     dict(mean=1, stdev=0.1)),
+    ('lognormal',  dict(mean=1, std=0.1)),
+    ('lognormal',  dict(low95=0.5, high95=2)),
+    ('lognormal',  dict(factor=3)),
+    ('triangle',   dict(range=0.2)),
+    ('triangle',   dict(factor=0.2)),
+    ('triangle',   dict(logfactor=3)),
+    ('triangle',   dict(min=0.5, mode=1, max=2)),
+    ('binary',     dict()),
+    ('integers',   dict(min=1, max=10)),
+    ('grid',       dict(min=0, max=1, count=11)),
+    ('constant',   dict(value=1)),
+    ('sequence',   dict(values='1,2,3,4')),
+    ('linked',     dict(parameter='p1')),
+]
+
+def distroGenerators():
+    """
+    Return a list of (name, DistroGen, argDict) for every registered DistroGen.
+    """
+    from pygcam.mcs.distro import DistroGen
+
+    DistroGen.genDistros()
+    gens = [(name, DistroGen.generator(DistroGen.signature(name, args)), args) for name, args in DISTRO_ARGS]
+
+    missing = set(DistroGen.instances) - {gen.sig for _, gen, _ in gens}
+    assert not missing, f"No benchmark arguments for DistroGen signatures {missing}"
+    return gens
+
+def makeRVs(n):
+    """
+    Return a list of (label, rv) for all distribution types, for ``n`` percentiles.
+    """
+    import numpy as np
+    import pandas as pd
+    from pygcam.mcs.distro import linkedDistro
+    from pygcam.mcs.built_ins.discrete_plugin import DiscreteDist
+
+    linkedDistro.storeTrialData(pd.DataFrame({'p1': np.arange(n, dtype=float)}))
+
+    rvs = [(f"{name}({', '.join(args)})", gen.makeRV(args)) for name, gen, args in distroGenerators()]
+    rvs.append(('DiscreteDist', DiscreteDist([(v, 0.1) for v in range(10)])))
+    return rvs